@@ -1,5 +1,5 @@
-from datetime import datetime
 from models import Whitelist
+from whois_lookup import parse_whois_date
 
 
 def alert_conditions(domains_info, last_scan_date):
@@ -17,22 +17,24 @@ def alert_conditions(domains_info, last_scan_date):
 
         whois_info = entry.get("whois_info", {})
         vt_data = entry.get("vt_data", {})
-        reputation = vt_data.get("reputation", 0)
+        reputation = vt_data.get("reputation") or 0
+        listed = entry.get("reputation_verdict", {}).get("listed", False)
         score = entry.get("score", 0)
+        dns_info = entry.get("dns", {})
 
         # Condition 1: creation_date > last_scan_date ---
-        creation_date_str = whois_info.get("creation_date", "")
-        if creation_date_str not in ("", "---"):
-            try:
-                creation_date_obj = datetime.strptime(creation_date_str, "%Y-%m-%d")
-                if creation_date_obj > last_scan_date:
-                    alerted_domains.append(domain_name)
-                    continue
-            except ValueError:
-                pass
-
-        # Condition 2: (score <= 2) or (reputation > 2) ---
-        if score <= 2 or reputation > 0:
+        creation_date = parse_whois_date(whois_info.get("creation_date"))
+        if creation_date is not None and creation_date > last_scan_date:
+            alerted_domains.append(domain_name)
+            continue
+
+        # Condition 2: (score <= 2) or (reputation > 2) or listed by a reputation provider ---
+        if score <= 2 or reputation > 0 or listed:
+            alerted_domains.append(domain_name)
+            continue
+
+        # Condition 3: mail-only domain (MX records, no web address) ---
+        if dns_info.get("mx") and not dns_info.get("addresses") and not dns_info.get("addresses6"):
             alerted_domains.append(domain_name)
 
     return alerted_domains
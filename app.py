@@ -2,9 +2,11 @@ import os
 from flask import Flask, request, render_template, redirect, url_for, flash, make_response
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager, login_user, login_required, logout_user, current_user
-from models import db, User, Domain, ScanHistory, ScanSettings, ScanDetails, Whitelist
+from models import db, User, Domain, ScanHistory, ScanSettings, ScanDetails, Whitelist, upgrade_schema
 from forms import LoginForm, RegisterForm, ScanSettingsForm, AlertForm
+from registration_queries import backfill_registration_dates
 from scanner import quick_scan_domain, full_scan_domain
+from vt_queue import start_vt_worker
 from flask_mail import Mail
 from reportlab.lib.pagesizes import letter
 from reportlab.pdfgen import canvas
@@ -446,4 +448,9 @@ def scan_view(scan_id):
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()
+        upgrade_schema()
+        backfill_registration_dates()
+    # The debug reloader runs this twice; only its serving child processes queued VirusTotal lookups
+    if os.environ.get("WERKZEUG_RUN_MAIN") == "true":
+        start_vt_worker(app)
     app.run(debug=True)
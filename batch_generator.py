@@ -0,0 +1,150 @@
+import csv
+import multiprocessing
+import os
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from domain_generator import iter_typo_candidates
+from public_suffix import get_public_suffix_list
+from wordlists import LISTS_DIR, get_wordlists
+
+
+class BrandCandidate(NamedTuple):
+    # One generated typo domain of a brand in a batch run
+    brand: str
+    domain: str
+    technique: str
+
+
+@dataclass
+class WorkerStats:
+    # Generation throughput of one pool worker
+    brands: int = 0
+    candidates: int = 0
+    seconds: float = 0.0
+
+    @property
+    def candidates_per_second(self) -> float:
+        return self.candidates / self.seconds if self.seconds else 0.0
+
+
+# Settings of the current pool worker, set by _init_worker
+_worker_base_dir = LISTS_DIR
+_worker_techniques: Optional[Tuple[str, ...]] = None
+
+
+def _init_worker(base_dir: str, techniques: Optional[Tuple[str, ...]]):
+    # With the fork start method the parent's word list bundle and Public Suffix List are inherited and
+    # get_wordlists() only stats the files; with spawn each worker parses them once instead of once per task
+    global _worker_base_dir, _worker_techniques
+    _worker_base_dir = base_dir
+    _worker_techniques = techniques
+    get_wordlists(base_dir)
+    get_public_suffix_list()
+
+
+def _generate_chunk(brands: Sequence[str]) -> Tuple[int, int, List[Tuple[str, str, str]], float]:
+    # Pool task: generates candidates for a chunk of brands, returns (worker pid, brands, records, seconds)
+    started = time.perf_counter()
+    lists = get_wordlists(_worker_base_dir)
+    records = []
+    for brand in brands:
+        for candidate in iter_typo_candidates(brand, lists.tlds, lists.similar_chars, lists.keyboard_map,
+                                              lists.subdomains, lists.entries, _worker_techniques):
+            records.append((brand, candidate.domain, candidate.technique))
+    return os.getpid(), len(brands), records, time.perf_counter() - started
+
+
+def _chunks(brands: Iterable[str], chunk_size: int) -> Iterator[List[str]]:
+    chunk = []
+    for brand in brands:
+        chunk.append(brand)
+        if len(chunk) >= chunk_size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _pool_context():
+    # Prefer fork so workers share the already loaded tables copy-on-write
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return multiprocessing.get_context()
+
+
+def iter_batch_candidates(brands: Iterable[str], processes: Optional[int] = None, chunk_size: int = 8,
+                          techniques=None, base_dir: str = LISTS_DIR,
+                          stats: Optional[Dict[int, WorkerStats]] = None) -> Iterator[BrandCandidate]:
+    """ Generates typo candidates for many brand domains on a process pool.
+    Yields BrandCandidate records as soon as a chunk of brands is done, in completion order.
+    If stats is given it is filled with per-worker throughput keyed by worker pid. """
+    brands = list(dict.fromkeys(brand.strip().lower() for brand in brands if brand and brand.strip()))
+    if not brands:
+        return
+    if stats is None:
+        stats = {}
+
+    # Loaded in the parent before the pool starts, so forked workers inherit the parsed tables
+    get_wordlists(base_dir)
+    get_public_suffix_list()
+    techniques = tuple(techniques) if techniques is not None else None
+
+    processes = processes or os.cpu_count() or 1
+    with _pool_context().Pool(processes, initializer=_init_worker, initargs=(base_dir, techniques)) as pool:
+        for pid, brand_count, records, seconds in pool.imap_unordered(_generate_chunk,
+                                                                       _chunks(brands, chunk_size)):
+            worker = stats.setdefault(pid, WorkerStats())
+            worker.brands += brand_count
+            worker.candidates += len(records)
+            worker.seconds += seconds
+            for record in records:
+                yield BrandCandidate(*record)
+
+
+def report_worker_throughput(stats: Dict[int, WorkerStats]):
+    # Prints generation throughput of each worker and of the whole pool
+    for pid, worker in sorted(stats.items()):
+        print(f"[INFO] Worker {pid}: {worker.brands} brands, {worker.candidates} candidates "
+              f"in {worker.seconds:.2f}s ({worker.candidates_per_second:.0f}/s)")
+    total = sum(worker.candidates for worker in stats.values())
+    print(f"[SUCCESS] {len(stats)} workers generated {total} candidates.")
+
+
+def load_brand_domains(file_path: str) -> List[str]:
+    # Reads brand domains from a .txt (one per line) or .csv (every cell of every row) file
+    domains = []
+    with open(file_path, newline='', encoding='utf-8') as file:
+        if os.path.splitext(file_path)[1].lower() == ".csv":
+            for row in csv.reader(file):
+                domains.extend(cell.strip() for cell in row if cell.strip())
+        else:
+            domains.extend(line.strip() for line in file if line.strip())
+    return domains
+
+
+def main():
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python batch_generator.py <domains.csv|domains.txt> [...]")
+        sys.exit(1)
+
+    brands = []
+    for file_path in sys.argv[1:]:
+        brands.extend(load_brand_domains(file_path))
+
+    stats: Dict[int, WorkerStats] = {}
+    started = time.perf_counter()
+    count = 0
+    for _ in iter_batch_candidates(brands, stats=stats):
+        count += 1
+    elapsed = time.perf_counter() - started
+
+    report_worker_throughput(stats)
+    print(f"[INFO] {len(set(brands))} brands, {count} candidates in {elapsed:.2f}s ({count / elapsed:.0f}/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+import argparse
+import contextlib
+import hashlib
+import io
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from batch_generator import load_brand_domains
+from domain_generator import (
+    split_domain,
+    is_valid_domain,
+    generate_typo_domains,
+    generate_prefix_suffix_domains,
+    generate_tld_replacements,
+    generate_keyboard_proximity_domains,
+    generate_visual_substitutions,
+    generate_removal_and_addition,
+    generate_transposed_domains,
+    generate_subdomain_domains,
+    generate_hyphen_dot_manipulations,
+    generate_soundsquatting_domains,
+    generate_bitsquatting_domains
+)
+from scanner import calculate_damerau_levenshtein_score
+from wordlists import get_wordlists
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+
+# Fixed offline corpus: the first brands of two typoscrap lists
+CORPUS_FILES = (
+    (os.path.join(ROOT_DIR, "typoscrap", "domains", "top100_cyber_domains_list.csv"), 25),
+    (os.path.join(ROOT_DIR, "typoscrap", "domains", "university_domains.csv"), 25),
+)
+
+DEFAULT_THRESHOLD = 0.25  # allowed slowdown against the baseline (25%)
+
+
+def load_corpus() -> List[str]:
+    brands = []
+    for file_path, count in CORPUS_FILES:
+        brands.extend(load_brand_domains(file_path)[:count])
+    return brands
+
+
+def corpus_hash(brands: List[str]) -> str:
+    return hashlib.sha1("\n".join(brands).encode("utf-8")).hexdigest()
+
+
+def calibrate(rounds: int = 5) -> float:
+    # Time of a fixed pure-Python workload; benchmark times are stored relative to it,
+    # so baselines recorded on one machine stay comparable on another
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        total = 0
+        for i in range(300_000):
+            total += len(str(i)) ^ (i & 7)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def build_benchmarks(brands: List[str]) -> Dict[str, Callable[[], int]]:
+    # name -> callable running one pass over the corpus and returning the number of items produced
+    lists = get_wordlists()
+    parts = [p for p in (split_domain(brand) for brand in brands) if p is not None]
+
+    def technique(generate, *tables):
+        return lambda: sum(len(generate(name, tld, *tables)) for name, tld in parts)
+
+    benchmarks = {
+        "generate_typo_domains": lambda: sum(
+            len(generate_typo_domains(brand, lists.tlds, lists.similar_chars, lists.keyboard_map,
+                                      lists.subdomains, lists.entries))
+            for brand in brands),
+        "generate_prefix_suffix_domains": technique(generate_prefix_suffix_domains, lists.entries),
+        "generate_tld_replacements": technique(generate_tld_replacements, lists.tlds),
+        "generate_keyboard_proximity_domains": technique(generate_keyboard_proximity_domains, lists.keyboard_map),
+        "generate_visual_substitutions": technique(generate_visual_substitutions, lists.similar_chars),
+        "generate_removal_and_addition": technique(generate_removal_and_addition),
+        "generate_transposed_domains": technique(generate_transposed_domains),
+        "generate_subdomain_domains": technique(generate_subdomain_domains, lists.subdomains),
+        "generate_hyphen_dot_manipulations": technique(generate_hyphen_dot_manipulations),
+        "generate_soundsquatting_domains": technique(generate_soundsquatting_domains),
+        "generate_bitsquatting_domains": technique(generate_bitsquatting_domains),
+    }
+
+    # Scoring inputs are generated once, outside of the timed functions
+    with contextlib.redirect_stdout(io.StringIO()):
+        pairs = [(brand, typo) for brand in brands
+                 for typo in generate_typo_domains(brand, lists.tlds, lists.similar_chars, lists.keyboard_map,
+                                                   lists.subdomains, lists.entries)]
+    typos = [typo for _, typo in pairs]
+
+    def validate():
+        for typo in typos:
+            is_valid_domain(typo)
+        return len(typos)
+
+    def score():
+        for brand, typo in pairs:
+            calculate_damerau_levenshtein_score(brand, typo)
+        return len(pairs)
+
+    benchmarks["is_valid_domain"] = validate
+    benchmarks["calculate_damerau_levenshtein_score"] = score
+    return benchmarks
+
+
+def run_benchmark(function: Callable[[], int], repeat: int, min_pass_seconds: float = 0.1
+                  ) -> Tuple[float, int, int]:
+    # Returns (best time of one call in seconds, items per call, peak traced memory in bytes).
+    # Fast functions are called several times per timed pass so that timer noise stays small
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        items = function()
+        first = time.perf_counter() - started
+        loops = max(1, math.ceil(min_pass_seconds / first)) if first > 0 else 1000
+
+        best = float("inf")
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(loops):
+                function()
+            best = min(best, (time.perf_counter() - started) / loops)
+
+        # Memory is measured in a separate call, tracing would distort the timings
+        tracemalloc.start()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return best, items, peak
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def run_suite(brands: List[str], repeat: int = 5, only: Optional[List[str]] = None) -> dict:
+    calibration = calibrate()
+    results = {}
+    for name, function in build_benchmarks(brands).items():
+        if only and name not in only:
+            continue
+        seconds, items, peak = run_benchmark(function, repeat)
+        results[name] = {
+            "seconds": seconds,
+            "items": items,
+            "items_per_second": items / seconds if seconds else 0.0,
+            "relative_time": seconds / calibration,
+            "peak_alloc_mb": peak / (1024 * 1024),
+        }
+        print(f"[INFO] {name:<38} {seconds * 1000:9.1f} ms {results[name]['items_per_second']:12.0f} items/s "
+              f"{results[name]['peak_alloc_mb']:8.1f} MB")
+
+    return {
+        "python": platform.python_version(),
+        "corpus": corpus_hash(brands),
+        "brands": len(brands),
+        "calibration_seconds": calibration,
+        "peak_rss_mb": peak_rss_mb(),
+        "benchmarks": results,
+    }
+
+
+def compare_to_baseline(report: dict, baseline: dict, threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    # Returns a message for every benchmark whose calibrated time regressed by more than threshold
+    regressions = []
+    if baseline.get("corpus") != report.get("corpus"):
+        print("[WARNING] Benchmark corpus differs from the baseline corpus, comparison is not meaningful.")
+
+    for name, result in report["benchmarks"].items():
+        reference = baseline.get("benchmarks", {}).get(name)
+        if reference is None:
+            print(f"[WARNING] No baseline for {name}.")
+            continue
+        ratio = result["relative_time"] / reference["relative_time"]
+        if ratio > 1 + threshold:
+            regressions.append(f"{name} is {(ratio - 1) * 100:.0f}% slower than the baseline")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks of the domain generator and scoring")
+    parser.add_argument("--repeat", type=int, default=5, help="timed passes per benchmark (best is kept)")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="allowed slowdown against the baseline, 0.25 = 25%%")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="baseline JSON file")
+    parser.add_argument("--update-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--only", nargs="*", help="run only the named benchmarks")
+    args = parser.parse_args(argv)
+
+    brands = load_corpus()
+    print(f"[INFO] Benchmarking {len(brands)} brands, best of {args.repeat} passes.")
+    report = run_suite(brands, args.repeat, args.only)
+    if report["peak_rss_mb"] is not None:
+        print(f"[INFO] Peak RSS: {report['peak_rss_mb']:.1f} MB")
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, sort_keys=True)
+        print(f"[SUCCESS] Baseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"[WARNING] No baseline at {args.baseline}, run with --update-baseline first.")
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as file:
+        baseline = json.load(file)
+    regressions = compare_to_baseline(report, baseline, args.threshold)
+    for message in regressions:
+        print(f"[ERROR] {message}")
+    if regressions:
+        return 1
+    print("[SUCCESS] No benchmark regressed beyond the threshold.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
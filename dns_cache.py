@@ -0,0 +1,147 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from dns_resolver import ResolutionRecord
+
+# Flask-SQLAlchemy keeps sqlite:///app.db in the instance folder, the cache lives next to it
+DNS_CACHE_PATH = os.getenv("DNS_CACHE_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", "dns_cache.db")
+
+DEFAULT_NEGATIVE_TTL = 300  # NXDOMAIN/NODATA answers without an SOA record
+MAX_TTL = 86400
+_FLUSH_EVERY = 500  # pending disk writes are committed in batches
+
+
+def _encode(record: ResolutionRecord) -> str:
+    return json.dumps(record._asdict())
+
+
+def _decode(data: str) -> ResolutionRecord:
+    fields = json.loads(data)
+    return ResolutionRecord(**{key: tuple(value) if isinstance(value, list) else value
+                               for key, value in fields.items()})
+
+
+class DNSCache:
+    """ Answer cache in front of the resolver: an in-memory LRU backed by a SQLite file.
+    Positive answers live for their TTL, NXDOMAIN/NODATA for the SOA minimum (RFC 2308).
+    Failed resolutions (no rcode) are never cached. Safe to share between threads. """
+
+    def __init__(self, path: Optional[str] = DNS_CACHE_PATH, max_entries: int = 100_000, max_ttl: int = MAX_TTL):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_ttl = max_ttl
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, Tuple[float, ResolutionRecord]]" = OrderedDict()
+        self._pending: Dict[str, Tuple[float, str]] = {}
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=10, check_same_thread=False)
+            self._db.execute("CREATE TABLE IF NOT EXISTS dns_cache "
+                             "(key TEXT PRIMARY KEY, record TEXT NOT NULL, expires REAL NOT NULL)")
+            self._db.execute("DELETE FROM dns_cache WHERE expires <= ?", (time.time(),))
+            self._db.commit()
+
+    @staticmethod
+    def _key(name: str, qtype: str) -> str:
+        return f"{qtype} {name.lower().rstrip('.')}"
+
+    def get(self, name: str, qtype: str = "A", now: Optional[float] = None) -> Optional[ResolutionRecord]:
+        # Cached record with its remaining TTL, None on a miss or when the entry expired
+        now = time.time() if now is None else now
+        key = self._key(name, qtype)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT expires, record FROM dns_cache WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (row[0], _decode(row[1]))
+                    self._remember(key, entry)
+
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    self._memory.pop(key, None)
+                self.misses += 1
+                return None
+
+            self._memory.move_to_end(key)
+            self.hits += 1
+            expires, record = entry
+            return record._replace(ttl=int(expires - now), latency=0.0)
+
+    def put(self, record: ResolutionRecord, qtype: str = "A", now: Optional[float] = None):
+        if record.rcode is None:
+            return
+        ttl = record.ttl if record.ttl is not None else DEFAULT_NEGATIVE_TTL
+        ttl = min(ttl, self.max_ttl)
+        if ttl <= 0:
+            return
+
+        now = time.time() if now is None else now
+        key = self._key(record.name, qtype)
+        entry = (now + ttl, record._replace(latency=0.0))
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._pending[key] = (entry[0], _encode(entry[1]))
+                if len(self._pending) >= _FLUSH_EVERY:
+                    self._flush_locked()
+
+    def _remember(self, key: str, entry: Tuple[float, ResolutionRecord]):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _flush_locked(self):
+        if self._db is None or not self._pending:
+            return
+        self._db.executemany("INSERT OR REPLACE INTO dns_cache (key, record, expires) VALUES (?, ?, ?)",
+                             [(key, record, expires) for key, (expires, record) in self._pending.items()])
+        self._db.commit()
+        self._pending.clear()
+
+    def flush(self):
+        # Writes pending entries to the SQLite file
+        with self._lock:
+            self._flush_locked()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            self._pending.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM dns_cache")
+                self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._memory)}
+
+
+_dns_cache: Optional[DNSCache] = None
+_lock = threading.Lock()
+
+
+def get_dns_cache() -> DNSCache:
+    # Process-wide cache stored in DNS_CACHE_PATH
+    global _dns_cache
+    if _dns_cache is None:
+        with _lock:
+            if _dns_cache is None:
+                _dns_cache = DNSCache()
+    return _dns_cache
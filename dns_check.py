@@ -1,14 +1,50 @@
 import socket
+from typing import Iterable, Iterator, Optional, Tuple
 
+from dns_cache import get_dns_cache
+from dns_resolver import PROFILE_QTYPES, ResolutionRecord, iter_resolve
+from zone_index import get_zone_indexes
 
-def check_domain_exists(domain):
-    try:
-        print(f"Checking DNS records for domain: {domain}")
-        socket.gethostbyname(domain)
-        return True
-    except socket.error:
-        print(f"Domain does not exist: {domain}")
-        return False
+
+def check_domain_exists(domain, use_cache: bool = True, **resolver_options) -> Optional[bool]:
+    # True/False, or None when the resolver failed temporarily and existence is unknown.
+    # Goes through the shared DNS cache and resolver like check_domains_exist
+    print(f"Checking DNS records for domain: {domain}")
+    for _, exists in check_domains_exist([domain], use_cache, **resolver_options):
+        if exists is None:
+            print(f"[WARNING] Temporary DNS failure for {domain}, existence unknown.")
+        elif not exists:
+            print(f"Domain does not exist: {domain}")
+        return exists
+    return None
+
+
+def resolve_domains(domains: Iterable[str], use_cache: bool = True, profile: bool = True, zones=None,
+                    **resolver_options) -> Iterator[ResolutionRecord]:
+    # Resolves domains concurrently and yields one ResolutionRecord (rcode, addresses, CNAMEs, TTL, latency)
+    # per domain as answers arrive. With profile, registered domains also get their AAAA, MX, NS and TXT
+    # records. Domains a local zone index (zone_index.ZoneIndexSet, by default the ones in ZONE_INDEX_DIR)
+    # does not list are answered NXDOMAIN without a query. Answers come from the shared DNS cache while their
+    # TTL lasts, and names under wildcard zones are returned as wildcard records without their own lookup.
+    # resolver_options (nameservers, concurrency, timeout, retries, ...) are passed to dns_resolver.AsyncResolver
+    if use_cache:
+        resolver_options.setdefault("cache", get_dns_cache())
+    if profile:
+        resolver_options.setdefault("profile_qtypes", PROFILE_QTYPES)
+    resolver_options.setdefault("detect_wildcards", True)
+    zones = get_zone_indexes() if zones is None else zones
+    if zones:
+        # Answered inside the resolver, so unlisted names share its bounded result buffer
+        resolver_options.setdefault("local_zones", zones)
+    yield from iter_resolve(domains, **resolver_options)
+
+
+def check_domains_exist(domains: Iterable[str], use_cache: bool = True,
+                        **resolver_options) -> Iterator[Tuple[str, Optional[bool]]]:
+    # Bulk check_domain_exists: yields (domain, exists) as answers arrive, exists is None when no upstream
+    # answered; registered domains without an address (mail-only) count, wildcard-only answers do not
+    for record in resolve_domains(domains, use_cache, profile=False, **resolver_options):
+        yield record.name, None if record.unknown else record.is_live
 
 
 def get_domain_ip(domain_name):  # Fetches the IP address of a given domain.
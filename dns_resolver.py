@@ -0,0 +1,652 @@
+import asyncio
+import ipaddress
+import os
+import queue
+import random
+import string
+import struct
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from public_suffix import get_public_suffix_list
+
+# Record types and response codes used by the scanner
+QTYPES = {"A": 1, "NS": 2, "CNAME": 5, "SOA": 6, "MX": 15, "TXT": 16, "AAAA": 28}
+QTYPE_NAMES = {code: name for name, code in QTYPES.items()}
+_OPT = 41
+
+RCODE_NOERROR = 0
+RCODE_SERVFAIL = 2
+RCODE_NXDOMAIN = 3
+RCODE_REFUSED = 5
+
+FALLBACK_NAMESERVERS = ["8.8.8.8", "1.1.1.1"]
+RESOLV_CONF = "/etc/resolv.conf"
+
+# Record types fetched for registered names next to the A lookup (AsyncResolver profile_qtypes)
+PROFILE_QTYPES = ("AAAA", "MX", "NS", "TXT")
+
+# Per-upstream query rate (queries per second), adapted between MIN and MAX while scanning
+DEFAULT_UPSTREAM_RATE = 300.0
+MIN_UPSTREAM_RATE = 5.0
+MAX_UPSTREAM_RATE = 5000.0
+# Answers iter_resolve holds for a slow consumer before it stops sending new queries
+RESULT_BUFFER = 1024
+
+_HEADER = struct.Struct("!HHHHHH")
+_EDNS_PAYLOAD = 1232  # EDNS0 UDP payload size that avoids IP fragmentation
+
+
+class DNSError(Exception):
+    pass
+
+
+class ResourceRecord(NamedTuple):
+    name: str
+    type: str
+    ttl: int
+    data: object  # str for A/AAAA/CNAME/NS/TXT, (preference, exchange) for MX, tuple for SOA
+
+
+class DNSMessage(NamedTuple):
+    id: int
+    rcode: int
+    truncated: bool
+    question: Optional[Tuple[str, int]]
+    answers: List[ResourceRecord]
+    authority: List[ResourceRecord]
+
+
+class ResolutionRecord(NamedTuple):
+    # Outcome of resolving one name: the A lookup, merged with the profile_qtypes answers when requested
+    name: str
+    rcode: Optional[int]  # None when no upstream answered
+    addresses: Tuple[str, ...] = ()  # A
+    addresses6: Tuple[str, ...] = ()  # AAAA
+    cnames: Tuple[str, ...] = ()  # CNAME chain in answer order
+    ttl: Optional[int] = None  # lowest answer TTL, SOA minimum for NXDOMAIN/NODATA
+    latency: float = 0.0  # seconds until the answer (or the last failure)
+    error: Optional[str] = None  # set when rcode is None: the outcome is unknown, not "does not exist"
+    wildcard: bool = False  # answered by a wildcard record of the parent zone
+    mx: Tuple[str, ...] = ()  # "preference exchange", lowest preference first
+    ns: Tuple[str, ...] = ()
+    txt: Tuple[str, ...] = ()
+
+    @property
+    def exists(self) -> bool:
+        # Same meaning as socket.gethostbyname succeeding
+        return self.rcode == RCODE_NOERROR and bool(self.addresses)
+
+    @property
+    def unknown(self) -> bool:
+        # No upstream gave a usable answer (timeouts, SERVFAIL, REFUSED)
+        return self.rcode is None
+
+    @property
+    def registered(self) -> bool:
+        # The name is in the DNS, with or without an address (e.g. mail-only or parked domains)
+        return self.rcode == RCODE_NOERROR
+
+    @property
+    def is_live(self) -> bool:
+        # Registered on its own rather than only through a wildcard of its parent zone
+        return self.registered and not self.wildcard
+
+    @property
+    def ip_address(self) -> str:
+        return self.addresses[0] if self.addresses else "---"
+
+
+def record_from_message(name: str, message: DNSMessage, latency: float) -> ResolutionRecord:
+    addresses, addresses6, cnames, mx, ns, txt, ttls = [], [], [], [], [], [], []
+    for record in message.answers:
+        ttls.append(record.ttl)
+        if record.type == "A":
+            addresses.append(record.data)
+        elif record.type == "AAAA":
+            addresses6.append(record.data)
+        elif record.type == "CNAME":
+            cnames.append(record.data)
+        elif record.type == "MX":
+            mx.append(record.data)
+        elif record.type == "NS":
+            ns.append(record.data)
+        elif record.type == "TXT":
+            txt.append(record.data)
+
+    if not ttls:
+        # Negative answers are cached for min(SOA TTL, SOA minimum) (RFC 2308)
+        ttls = [min(record.ttl, record.data[-1]) for record in message.authority
+                if record.type == "SOA" and isinstance(record.data, tuple)]
+    return ResolutionRecord(name, message.rcode, tuple(addresses), tuple(addresses6), tuple(cnames),
+                            min(ttls) if ttls else None, latency,
+                            mx=tuple(f"{preference} {exchange}" for preference, exchange in sorted(mx)),
+                            ns=tuple(sorted(ns)), txt=tuple(txt))
+
+
+def merge_profile(record: ResolutionRecord, answers: Dict[str, ResolutionRecord]) -> ResolutionRecord:
+    # Adds the AAAA/MX/NS/TXT data of answers (qtype -> record of the same name) to the A record;
+    # rcode, TTL and CNAME chain stay those of the A lookup, latency becomes the slowest answer
+    merged = {}
+    for qtype, answer in answers.items():
+        field = {"AAAA": "addresses6", "MX": "mx", "NS": "ns", "TXT": "txt"}.get(qtype)
+        if field is not None:
+            merged[field] = getattr(answer, field)
+    latency = max([record.latency] + [answer.latency for answer in answers.values()])
+    return record._replace(latency=latency, **merged)
+
+
+def default_nameservers() -> List[str]:
+    # DNS_NAMESERVERS (comma separated) from the environment, else resolv.conf, else public resolvers
+    configured = os.getenv("DNS_NAMESERVERS")
+    if configured:
+        return [server.strip() for server in configured.split(",") if server.strip()]
+    nameservers = []
+    try:
+        with open(RESOLV_CONF, "r", encoding="utf-8") as file:
+            for line in file:
+                fields = line.split()
+                if len(fields) >= 2 and fields[0] == "nameserver":
+                    nameservers.append(fields[1])
+    except OSError:
+        pass
+    return nameservers or list(FALLBACK_NAMESERVERS)
+
+
+def parse_nameserver(nameserver: str, default_port: int = 53) -> Tuple[str, int]:
+    # "1.1.1.1", "127.0.0.1:5353" or "[::1]:5353" -> (host, port)
+    if nameserver.startswith("["):
+        host, _, port = nameserver[1:].partition("]:")
+        return host.rstrip("]"), int(port) if port else default_port
+    if nameserver.count(":") == 1:
+        host, port = nameserver.split(":")
+        return host, int(port)
+    return nameserver, default_port
+
+
+def to_ascii(name: str) -> str:
+    # Lower-case ASCII form of name, Unicode names are converted to their IDNA (xn--) form
+    try:
+        return name.rstrip(".").encode("idna").decode("ascii").lower()
+    except UnicodeError as e:
+        raise DNSError(f"Cannot encode {name!r}: {e}")
+
+
+def encode_name(name: str) -> bytes:
+    # Domain name in wire format
+    encoded = b""
+    for label in to_ascii(name).encode("ascii").split(b"."):
+        if not label or len(label) > 63:
+            raise DNSError(f"Invalid label in {name!r}")
+        encoded += bytes([len(label)]) + label
+    return encoded + b"\x00"
+
+
+def build_query(name: str, qtype: str, query_id: int) -> bytes:
+    # Recursive query with an EDNS0 OPT record
+    header = _HEADER.pack(query_id, 0x0100, 1, 0, 0, 1)
+    question = encode_name(name) + struct.pack("!HH", QTYPES[qtype], 1)
+    opt = b"\x00" + struct.pack("!HHIH", _OPT, _EDNS_PAYLOAD, 0, 0)
+    return header + question + opt
+
+
+def _read_name(data: bytes, offset: int) -> Tuple[str, int]:
+    # Returns (name, offset after the name), following compression pointers
+    labels = []
+    end = None
+    jumps = 0
+    while True:
+        if offset >= len(data):
+            raise DNSError("Truncated name")
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            jumps += 1
+            if jumps > 64:
+                raise DNSError("Compression loop")
+            continue
+        if length == 0:
+            offset += 1
+            break
+        labels.append(data[offset + 1:offset + 1 + length].decode("ascii", errors="replace"))
+        offset += 1 + length
+    return ".".join(labels).lower(), end if end is not None else offset
+
+
+def _decode_rdata(data: bytes, offset: int, rdlength: int, rtype: int):
+    rdata = data[offset:offset + rdlength]
+    if rtype == QTYPES["A"] and rdlength == 4:
+        return str(ipaddress.IPv4Address(rdata))
+    if rtype == QTYPES["AAAA"] and rdlength == 16:
+        return str(ipaddress.IPv6Address(rdata))
+    if rtype in (QTYPES["CNAME"], QTYPES["NS"]):
+        return _read_name(data, offset)[0]
+    if rtype == QTYPES["MX"]:
+        return struct.unpack("!H", rdata[:2])[0], _read_name(data, offset + 2)[0]
+    if rtype == QTYPES["TXT"]:
+        strings, i = [], 0
+        while i < len(rdata):
+            strings.append(rdata[i + 1:i + 1 + rdata[i]].decode("utf-8", errors="replace"))
+            i += 1 + rdata[i]
+        return "".join(strings)
+    if rtype == QTYPES["SOA"]:
+        mname, position = _read_name(data, offset)
+        rname, position = _read_name(data, position)
+        return (mname, rname) + struct.unpack("!IIIII", data[position:position + 20])
+    return rdata
+
+
+def parse_response(data: bytes) -> DNSMessage:
+    if len(data) < _HEADER.size:
+        raise DNSError("Short response")
+    query_id, flags, qdcount, ancount, nscount, _ = _HEADER.unpack_from(data)
+    offset = _HEADER.size
+
+    question = None
+    for _ in range(qdcount):
+        qname, offset = _read_name(data, offset)
+        qtype, _ = struct.unpack_from("!HH", data, offset)
+        offset += 4
+        question = (qname, qtype)
+
+    sections = ([], [])
+    for section, count in zip(sections, (ancount, nscount)):
+        for _ in range(count):
+            name, offset = _read_name(data, offset)
+            rtype, _, ttl, rdlength = struct.unpack_from("!HHIH", data, offset)
+            offset += 10
+            section.append(ResourceRecord(name, QTYPE_NAMES.get(rtype, str(rtype)), ttl,
+                                          _decode_rdata(data, offset, rdlength, rtype)))
+            offset += rdlength
+
+    return DNSMessage(query_id, flags & 0x000F, bool(flags & 0x0200), question, sections[0], sections[1])
+
+
+class _UDPChannel(asyncio.DatagramProtocol):
+    # One UDP socket per upstream shared by all in-flight queries, responses are matched by query id
+
+    def __init__(self):
+        self.transport = None
+        self.pending: Dict[int, asyncio.Future] = {}
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data, addr):
+        if len(data) >= 2:
+            future = self.pending.get(struct.unpack_from("!H", data)[0])
+            if future is not None and not future.done():
+                future.set_result(data)
+
+    def error_received(self, exc):
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(exc)
+
+    def connection_lost(self, exc):
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(exc or DNSError("Socket closed"))
+
+    def new_query_id(self) -> int:
+        while True:
+            query_id = random.randrange(65536)
+            if query_id not in self.pending:
+                return query_id
+
+
+class UpstreamRate:
+    """ Token bucket of one upstream whose rate adapts AIMD-style: every clean answer adds increase
+    queries per second, a timeout, SERVFAIL or REFUSED multiplies the rate by decrease. Failures of
+    queries sent before the last decrease are not counted again (at most one decrease per cooldown),
+    so a burst of in-flight losses backs off once instead of collapsing the rate. """
+
+    def __init__(self, rate: float = DEFAULT_UPSTREAM_RATE, min_rate: float = MIN_UPSTREAM_RATE,
+                 max_rate: float = MAX_UPSTREAM_RATE, increase: float = 1.0, decrease: float = 0.5,
+                 cooldown: float = 1.0):
+        self.rate = min(max(rate, min_rate), max_rate)
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.decrease = decrease
+        self.cooldown = cooldown
+        self.successes = 0
+        self.failures = 0
+        self._tokens = self._capacity()
+        self._updated = time.monotonic()
+        self._last_decrease = float("-inf")
+
+    def _capacity(self) -> float:
+        # Bursts of up to a tenth of a second worth of queries
+        return max(1.0, self.rate / 10)
+
+    def _refill(self, now: float):
+        self._tokens = min(self._capacity(), self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, now: Optional[float] = None) -> float:
+        # Takes a token and returns 0, or returns the seconds to wait for the next one
+        self._refill(time.monotonic() if now is None else now)
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+    async def acquire(self):
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def on_success(self):
+        self.successes += 1
+        self.rate = min(self.max_rate, self.rate + self.increase)
+
+    def on_failure(self, now: Optional[float] = None):
+        self.failures += 1
+        now = time.monotonic() if now is None else now
+        if now - self._last_decrease >= self.cooldown:
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = min(self._tokens, self._capacity())
+            self._last_decrease = now
+
+
+def _below_registrable_domain(name: str) -> bool:
+    # True for names under a registrable domain ("login.example.com"), False for "example.com" itself
+    # and for names under suffixes missing from the Public Suffix List
+    registrable = get_public_suffix_list().get_registrable_domain(name)
+    return registrable is not None and registrable != name.lower().rstrip(".")
+
+
+class AsyncResolver:
+    """ Stub resolver that talks DNS over UDP (TCP when an answer is truncated) to recursive upstreams.
+    nameservers are "host" or "host:port" strings, queries are spread over them round-robin.
+    concurrency caps in-flight queries, timeout is per attempt and every retry goes to the next upstream.
+    Queries to each upstream are paced by an UpstreamRate starting at rate queries per second (None
+    disables pacing); names no upstream answers come back with rcode None (unknown).
+    With detect_wildcards the parent zone of every name is probed once with a random label; names under
+    a zone that answers everything are returned as wildcard records without a lookup (wildcard_mode "skip")
+    or looked up and flagged when their answer equals the wildcard answer (wildcard_mode "mark").
+    Names at the registrable level, whose parent zone is a public suffix, are always handled as in "mark".
+    profile_qtypes (e.g. PROFILE_QTYPES) are queried concurrently for every name whose A lookup shows it
+    is registered, over the same sockets, and merged into its record.
+    local_zones (e.g. zone_index.ZoneIndexSet) answers names it does not list NXDOMAIN without a query. """
+
+    def __init__(self, nameservers: Optional[List[str]] = None, port: int = 53, concurrency: int = 200,
+                 timeout: float = 2.0, retries: int = 2, use_tcp: bool = False, cache=None,
+                 detect_wildcards: bool = False, wildcard_mode: str = "skip",
+                 profile_qtypes: Iterable[str] = (), rate: Optional[float] = DEFAULT_UPSTREAM_RATE,
+                 local_zones=None):
+        if wildcard_mode not in ("skip", "mark"):
+            raise ValueError(f"Unknown wildcard mode: {wildcard_mode}")
+        self.nameservers = list(nameservers) if nameservers else default_nameservers()
+        self.port = port
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self.retries = retries
+        self.use_tcp = use_tcp
+        self.cache = cache  # optional dns_cache.DNSCache consulted before every lookup
+        self.detect_wildcards = detect_wildcards
+        self.wildcard_mode = wildcard_mode
+        self.profile_qtypes = tuple(qtype for qtype in profile_qtypes if qtype != "A")
+        self.local_zones = local_zones
+        self.local_answers = 0
+        self.rates: Dict[str, UpstreamRate] = {}
+        if rate is not None:
+            self.rates = {nameserver: UpstreamRate(rate, cooldown=timeout) for nameserver in self.nameservers}
+        self._zones: Dict[str, asyncio.Future] = {}
+        self._channels: Dict[str, _UDPChannel] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._next_upstream = 0
+
+    async def _channel(self, nameserver: str) -> _UDPChannel:
+        channel = self._channels.get(nameserver)
+        if channel is None or channel.transport is None or channel.transport.is_closing():
+            _, channel = await asyncio.get_running_loop().create_datagram_endpoint(
+                _UDPChannel, remote_addr=parse_nameserver(nameserver, self.port))
+            self._channels[nameserver] = channel
+        return channel
+
+    async def _exchange_udp(self, nameserver: str, name: str, qtype: str) -> bytes:
+        channel = await self._channel(nameserver)
+        query_id = channel.new_query_id()
+        future = asyncio.get_running_loop().create_future()
+        channel.pending[query_id] = future
+        try:
+            channel.transport.sendto(build_query(name, qtype, query_id))
+            return await asyncio.wait_for(future, self.timeout)
+        finally:
+            channel.pending.pop(query_id, None)
+
+    async def _exchange_tcp(self, nameserver: str, name: str, qtype: str) -> bytes:
+        query = build_query(name, qtype, random.randrange(65536))
+        host, port = parse_nameserver(nameserver, self.port)
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.timeout)
+        try:
+            writer.write(struct.pack("!H", len(query)) + query)
+            await writer.drain()
+            length = struct.unpack("!H", await asyncio.wait_for(reader.readexactly(2), self.timeout))[0]
+            return await asyncio.wait_for(reader.readexactly(length), self.timeout)
+        finally:
+            writer.close()
+
+    async def query(self, name: str, qtype: str = "A") -> DNSMessage:
+        # Returns the first usable answer; SERVFAIL/REFUSED, timeouts and socket errors are retried on the
+        # next upstream and slow down the upstream that caused them
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        expected = to_ascii(name)
+        start = self._next_upstream
+        self._next_upstream = (start + 1) % len(self.nameservers)
+        last_error: Exception = DNSError(f"No answer for {name}")
+
+        async with self._semaphore:
+            for attempt in range(self.retries + 1):
+                nameserver = self.nameservers[(start + attempt) % len(self.nameservers)]
+                rate = self.rates.get(nameserver)
+                if rate is not None:
+                    await rate.acquire()
+                try:
+                    if self.use_tcp:
+                        message = parse_response(await self._exchange_tcp(nameserver, name, qtype))
+                    else:
+                        message = parse_response(await self._exchange_udp(nameserver, name, qtype))
+                        if message.truncated:
+                            message = parse_response(await self._exchange_tcp(nameserver, name, qtype))
+                except (asyncio.TimeoutError, OSError) as e:
+                    last_error = e
+                    if rate is not None:
+                        rate.on_failure()
+                    continue
+                except (DNSError, struct.error) as e:
+                    last_error = e
+                    continue
+
+                if message.question is not None and message.question[0] != expected:
+                    last_error = DNSError(f"Mismatched answer for {name}")
+                    continue
+                if message.rcode in (RCODE_SERVFAIL, RCODE_REFUSED):
+                    last_error = DNSError(f"Upstream {nameserver} answered rcode {message.rcode} for {name}")
+                    if rate is not None:
+                        rate.on_failure()
+                    continue
+                if rate is not None:
+                    rate.on_success()
+                return message
+
+        raise DNSError(f"Resolution of {name} failed: {str(last_error) or type(last_error).__name__}")
+
+    async def zone_wildcard(self, zone: str) -> Optional[ResolutionRecord]:
+        # The wildcard answer of zone, None if zone does not answer random names. Probed once per zone;
+        # concurrent callers wait for the same probe and the verdict is kept in the cache for its TTL
+        future = self._zones.get(zone)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._zones[zone] = future
+        try:
+            verdict = self.cache.get(zone, "WILDCARD") if self.cache is not None else None
+            if verdict is None:
+                label = "".join(random.choices(string.ascii_lowercase + string.digits, k=20))
+                verdict = (await self._lookup(f"{label}.{zone}", "A"))._replace(name=zone)
+                if self.cache is not None:
+                    self.cache.put(verdict, "WILDCARD")
+            result = verdict if verdict.exists else None
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        future.set_result(result)
+        if result is not None:
+            print(f"[INFO] Wildcard zone detected: *.{zone} -> {', '.join(result.addresses)}")
+        return result
+
+    async def resolve(self, name: str, qtype: str = "A") -> ResolutionRecord:
+        # One query for name; A answers include the CNAME chain, so existence and IP come from one lookup.
+        # Only registered names pay for the profile queries, which run side by side after it
+        if self.local_zones is not None and self.local_zones.lookup(name) is False:
+            self.local_answers += 1
+            return ResolutionRecord(name, RCODE_NXDOMAIN)
+        if self.detect_wildcards and qtype == "A" and "." in name:
+            wildcard = await self.zone_wildcard(name.split(".", 1)[1])
+            if wildcard is not None:
+                # A public suffix answering random labels would hide every lookalike registered under it,
+                # so names at the registrable level are always looked up and only flagged
+                if self.wildcard_mode == "skip" and _below_registrable_domain(name):
+                    return wildcard._replace(name=name, latency=0.0, wildcard=True)
+                record = await self._lookup(name, qtype)
+                if record.exists and set(record.addresses) <= set(wildcard.addresses):
+                    return record._replace(wildcard=True)
+                return await self._profile(record) if qtype == "A" else record
+        record = await self._lookup(name, qtype)
+        return await self._profile(record) if qtype == "A" else record
+
+    async def _profile(self, record: ResolutionRecord) -> ResolutionRecord:
+        if not self.profile_qtypes or not record.registered:
+            return record
+        answers = await asyncio.gather(*(self._lookup(record.name, qtype) for qtype in self.profile_qtypes))
+        return merge_profile(record, dict(zip(self.profile_qtypes, answers)))
+
+    async def _lookup(self, name: str, qtype: str = "A") -> ResolutionRecord:
+        if self.cache is not None:
+            cached = self.cache.get(name, qtype)
+            if cached is not None:
+                return cached
+
+        started = time.monotonic()
+        try:
+            message = await self.query(name, qtype)
+        except DNSError as e:
+            return ResolutionRecord(name, None, latency=time.monotonic() - started, error=str(e))
+        record = record_from_message(name, message, time.monotonic() - started)
+        if self.cache is not None:
+            self.cache.put(record, qtype)
+        return record
+
+    async def resolve_many(self, names: Iterable[str]) -> AsyncIterator[ResolutionRecord]:
+        # Streams a ResolutionRecord per name in completion order, keeping at most concurrency names
+        # in flight; names is consumed lazily, so it can be a generator
+        names = iter(names)
+        exhausted = False
+        pending = set()
+        while True:
+            while not exhausted and len(pending) < self.concurrency:
+                try:
+                    pending.add(asyncio.ensure_future(self.resolve(next(names))))
+                except StopIteration:
+                    exhausted = True
+            if not pending:
+                return
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+
+    def upstream_stats(self) -> Dict[str, Dict[str, float]]:
+        return {nameserver: {"rate": round(rate.rate, 1), "successes": rate.successes, "failures": rate.failures}
+                for nameserver, rate in self.rates.items()}
+
+    def close(self):
+        for channel in self._channels.values():
+            if channel.transport is not None:
+                channel.transport.close()
+        self._channels.clear()
+
+
+_DONE = object()
+
+
+def iter_resolve(names: Iterable[str], buffer_size: int = RESULT_BUFFER,
+                 **resolver_options) -> Iterator[ResolutionRecord]:
+    """ Synchronous bulk API: resolves names on an event loop in a background thread and yields
+    a ResolutionRecord per name as answers arrive. At most buffer_size answers wait for the consumer;
+    while the buffer is full no new names are taken. Stopping the iteration early cancels the remaining names. """
+    results: "queue.Queue" = queue.Queue()
+    stop = threading.Event()
+    upstreams = {}
+    local_answers = 0
+
+    def feed():
+        for name in names:
+            if stop.is_set():
+                return
+            yield name
+
+    async def produce():
+        nonlocal local_answers
+        resolver = AsyncResolver(**resolver_options)
+        try:
+            async for item in resolver.resolve_many(feed()):
+                while results.qsize() >= buffer_size and not stop.is_set():
+                    await asyncio.sleep(0.005)
+                results.put(item)
+        finally:
+            upstreams.update(resolver.upstream_stats())
+            local_answers = resolver.local_answers
+            resolver.close()
+            if resolver.cache is not None:
+                resolver.cache.flush()
+
+    def run():
+        try:
+            asyncio.run(produce())
+        except BaseException as e:
+            results.put(e)
+        finally:
+            results.put(_DONE)
+
+    worker = threading.Thread(target=run, name="dns-resolver", daemon=True)
+    started = time.monotonic()
+    worker.start()
+    count = 0
+    unknown = 0
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            count += 1
+            unknown += item.unknown
+            yield item
+    finally:
+        stop.set()
+        worker.join()
+    elapsed = time.monotonic() - started
+    print(f"[INFO] Resolved {count} names in {elapsed:.2f}s.")
+    if local_answers:
+        print(f"[INFO] {local_answers} names answered from local zone indexes.")
+    if unknown:
+        print(f"[WARNING] {unknown} names got no usable answer and are unknown.")
+    for nameserver, stats in upstreams.items():
+        if stats["failures"]:
+            print(f"[INFO] Upstream {nameserver}: {stats['successes']} answers, {stats['failures']} failures, "
+                  f"rate {stats['rate']}/s.")
+    cache = resolver_options.get("cache")
+    if cache is not None:
+        stats = cache.stats()
+        print(f"[INFO] DNS cache: {stats['hits']} hits, {stats['misses']} misses.")
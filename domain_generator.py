@@ -1,12 +1,67 @@
+import itertools
 import regex
-from typing import List, Dict, Set
-import jellyfish
+from typing import List, Dict, Set, Iterable, Iterator, NamedTuple, Optional, Tuple
+
+from bloom_filter import BloomFilter
+from public_suffix import get_public_suffix_list
+from soundsquatting import iter_phonetic_variants
+
+
+class TypoCandidate(NamedTuple):
+    # A generated domain together with the technique that produced it.
+    # position is the index in the brand name that was edited (None for whole-name techniques),
+    # replacement is the inserted/substituted text (None for deletions and swaps)
+    domain: str
+    technique: str
+    position: Optional[int] = None
+    replacement: Optional[str] = None
+
+
+PREFIX_SUFFIX = "prefix/suffix"
+TLD_REPLACEMENT = "tld"
+KEYBOARD = "keyboard"
+VISUAL = "visual"
+REMOVAL_ADDITION = "removal/addition"
+TRANSPOSITION = "transposition"
+SUBDOMAIN = "subdomain"
+HYPHEN_DOT = "hyphen/dot"
+SOUNDSQUATTING = "soundsquatting"
+BITSQUATTING = "bitsquatting"
+
+# Order in which techniques are applied; also decides which technique a duplicate is attributed to
+TECHNIQUES = (
+    PREFIX_SUFFIX, TLD_REPLACEMENT, KEYBOARD, VISUAL, REMOVAL_ADDITION,
+    TRANSPOSITION, SUBDOMAIN, HYPHEN_DOT, SOUNDSQUATTING, BITSQUATTING,
+)
+
+# Techniques composed by the deep mode; prefix/suffix, subdomain and soundsquatting variants of variants
+# multiply the candidate space without producing realistic typos, so they are only applied once
+DEEP_TECHNIQUES = (
+    TLD_REPLACEMENT, KEYBOARD, VISUAL, REMOVAL_ADDITION, TRANSPOSITION, HYPHEN_DOT, BITSQUATTING,
+)
+
+
+# Compiled once; a valid domain has an IDN-friendly first label followed by alphabetic labels
+DOMAIN_REGEX = regex.compile(r"^(?!-)[\p{L}\p{N}\-]{1,63}(?<!-)(\.[A-Za-z]{2,})+$")
 
 
 def is_valid_domain(domain: str) -> bool:
     # Checks if a domain is valid, including Unicode characters for IDN
-    domain_regex = r"^(?!-)[\p{L}\p{N}\-]{1,63}(?<!-)(\.[A-Za-z]{2,})+$"
-    return regex.match(domain_regex, domain) is not None
+    return DOMAIN_REGEX.match(domain) is not None
+
+
+def is_registrable_domain(domain: str) -> bool:
+    # Checks if a domain is valid and sits under a suffix from the Public Suffix List, i.e. can be registered
+    return DOMAIN_REGEX.match(domain) is not None and get_public_suffix_list().is_registrable(domain)
+
+
+def filter_valid_domains(domains: Iterable[str], registrable_only: bool = True) -> List[str]:
+    # Validates a whole batch of domains with the compiled regex (and the Public Suffix List)
+    match = DOMAIN_REGEX.match
+    if not registrable_only:
+        return [d for d in domains if match(d) is not None]
+    is_registrable = get_public_suffix_list().is_registrable
+    return [d for d in domains if match(d) is not None and is_registrable(d)]
 
 
 def load_keyboard_proximity(file_path: str) -> Dict[str, List[str]]:
@@ -80,148 +135,287 @@ def load_similar_chars(file_path: str) -> Dict[str, List[str]]:
     return similar_char_map
 
 
-def generate_soundsquatting_domains(main_name: str, base_tld: str) -> Set[str]:
+def iter_soundsquatting_domains(main_name: str, base_tld: str, mode: str = "metaphone") -> Iterator[TypoCandidate]:
+    # Lazily yields soundsquatting domains, mode selects the phonetic key (metaphone, soundex or nysiis)
+    for variant, position, char in iter_phonetic_variants(main_name, mode):
+        yield TypoCandidate(variant + '.' + base_tld, SOUNDSQUATTING, position, char)
+
+
+def generate_soundsquatting_domains(main_name: str, base_tld: str, mode: str = "metaphone") -> Set[str]:
     # Generates soundsquatting domains (more in \tests\soundsquatting_test.py)
-    typo_domains = set()
-    original_phonetic = jellyfish.metaphone(main_name)
-    alphabet = 'abcdefghijklmnopqrstuvwxyz'
+    return {c.domain for c in iter_soundsquatting_domains(main_name, base_tld, mode)}
 
-    for i in range(len(main_name)):
-        typo_domains.add(main_name[:i] + main_name[i + 1:] + '.' + base_tld)
-    for i in range(len(main_name)):
-        for char in alphabet:
-            typo_domains.add(main_name[:i] + char + main_name[i + 1:] + '.' + base_tld)
-    for i in range(len(main_name) + 1):
-        for char in alphabet:
-            typo_domains.add(main_name[:i] + char + main_name[i:] + '.' + base_tld)
 
-    return {
-        typo for typo in typo_domains
-        if jellyfish.metaphone(typo.split('.')[0]) == original_phonetic
-    }
+def iter_prefix_suffix_domains(main_name: str, base_tld: str, entries: Iterable[str]) -> Iterator[TypoCandidate]:
+    # Lazily yields domains with given prefixes and suffixes
+    for entry in entries:
+        yield TypoCandidate(f"{entry}-{main_name}.{base_tld}", PREFIX_SUFFIX, 0, entry + "-")
+        yield TypoCandidate(f"{main_name}-{entry}.{base_tld}", PREFIX_SUFFIX, len(main_name), "-" + entry)
 
 
 def generate_prefix_suffix_domains(main_name: str, base_tld: str, entries: List[str]) -> Set[str]:
     # Generates domains with given prefixes and suffixes
-    typo_domains = set()
-    for entry in entries:
-        typo_domains.add(f"{entry}-{main_name}.{base_tld}")
-        typo_domains.add(f"{main_name}-{entry}.{base_tld}")
+    return {c.domain for c in iter_prefix_suffix_domains(main_name, base_tld, entries)}
+
 
-    return typo_domains
+def iter_tld_replacements(main_name: str, base_tld: str, tlds: Iterable[str]) -> Iterator[TypoCandidate]:
+    # Lazily yields domains with replaced TLDs
+    for tld in tlds:
+        if tld != base_tld:
+            yield TypoCandidate(f"{main_name}.{tld}", TLD_REPLACEMENT, None, tld)
 
 
 def generate_tld_replacements(main_name: str, base_tld: str, tlds: List[str]) -> Set[str]:
     # Generates domains with replaced TLDs
-    return {f"{main_name}.{tld}" for tld in tlds if tld != base_tld}
+    return {c.domain for c in iter_tld_replacements(main_name, base_tld, tlds)}
 
 
-def generate_keyboard_proximity_domains(main_name: str, base_tld: str, keyboard_map: Dict[str, List[str]]) -> Set[str]:
-    # Generates domains based on keyboard proximity substitutions
-    typo_domains = set()
+def iter_keyboard_proximity_domains(main_name: str, base_tld: str,
+                                    keyboard_map: Dict[str, List[str]]) -> Iterator[TypoCandidate]:
+    # Lazily yields domains based on keyboard proximity substitutions and insertions
     for i, char in enumerate(main_name):
         if char in keyboard_map:
             for replacement in keyboard_map[char]:
-                substituted = list(main_name)
-                substituted[i] = replacement
-                typo_domains.add("".join(substituted) + '.' + base_tld)
+                yield TypoCandidate(main_name[:i] + replacement + main_name[i + 1:] + '.' + base_tld,
+                                    KEYBOARD, i, replacement)
+                yield TypoCandidate(main_name[:i] + replacement + main_name[i:] + '.' + base_tld,
+                                    KEYBOARD, i, replacement)
+                yield TypoCandidate(main_name[:i + 1] + replacement + main_name[i + 1:] + '.' + base_tld,
+                                    KEYBOARD, i + 1, replacement)
 
-                typo_domains.add(main_name[:i] + replacement + main_name[i:] + '.' + base_tld)
-                typo_domains.add(main_name[:i + 1] + replacement + main_name[i + 1:] + '.' + base_tld)
-    return typo_domains
 
+def generate_keyboard_proximity_domains(main_name: str, base_tld: str, keyboard_map: Dict[str, List[str]]) -> Set[str]:
+    # Generates domains based on keyboard proximity substitutions
+    return {c.domain for c in iter_keyboard_proximity_domains(main_name, base_tld, keyboard_map)}
 
-def generate_visual_substitutions(main_name: str, base_tld: str, similar_char_map: Dict[str, List[str]]) -> Set[str]:
-    # Generates domains with visually similar character substitutions
-    typo_domains = set()
+
+def iter_visual_substitutions(main_name: str, base_tld: str,
+                              similar_char_map: Dict[str, List[str]]) -> Iterator[TypoCandidate]:
+    # Lazily yields domains with visually similar character substitutions
     for i, char in enumerate(main_name):
         if char in similar_char_map:
             for replacement in similar_char_map[char]:
-                substituted = list(main_name)
-                substituted[i] = replacement
-                typo_domains.add("".join(substituted) + '.' + base_tld)
-    return typo_domains
+                yield TypoCandidate(main_name[:i] + replacement + main_name[i + 1:] + '.' + base_tld,
+                                    VISUAL, i, replacement)
 
 
-def generate_removal_and_addition(main_name: str, base_tld: str) -> Set[str]:
-    # Generates domains by removing and adding characters
-    typo_domains = set()
+def generate_visual_substitutions(main_name: str, base_tld: str, similar_char_map: Dict[str, List[str]]) -> Set[str]:
+    # Generates domains with visually similar character substitutions
+    return {c.domain for c in iter_visual_substitutions(main_name, base_tld, similar_char_map)}
+
+
+def iter_removal_and_addition(main_name: str, base_tld: str) -> Iterator[TypoCandidate]:
+    # Lazily yields domains by removing and adding characters
     alphabet = "abcdefghijklmnopqrstuvwxyz0123456789"
 
     for i in range(len(main_name)):
-        typo_domains.add(main_name[:i] + main_name[i + 1:] + '.' + base_tld)
+        yield TypoCandidate(main_name[:i] + main_name[i + 1:] + '.' + base_tld, REMOVAL_ADDITION, i, None)
 
     for i in range(len(main_name) + 1):
         for char in alphabet:
-            typo_domains.add(main_name[:i] + char + main_name[i:] + '.' + base_tld)
-    return typo_domains
+            yield TypoCandidate(main_name[:i] + char + main_name[i:] + '.' + base_tld, REMOVAL_ADDITION, i, char)
+
+
+def generate_removal_and_addition(main_name: str, base_tld: str) -> Set[str]:
+    # Generates domains by removing and adding characters
+    return {c.domain for c in iter_removal_and_addition(main_name, base_tld)}
+
+
+def iter_transposed_domains(main_name: str, base_tld: str) -> Iterator[TypoCandidate]:
+    # Lazily yields domains by transposing adjacent characters
+    for i in range(len(main_name) - 1):
+        yield TypoCandidate(main_name[:i] + main_name[i + 1] + main_name[i] + main_name[i + 2:] + '.' + base_tld,
+                            TRANSPOSITION, i, None)
 
 
 def generate_transposed_domains(main_name: str, base_tld: str) -> Set[str]:
     # Generates domains by transposing adjacent characters
-    typo_domains = set()
-    for i in range(len(main_name) - 1):
-        swapped = list(main_name)
-        swapped[i], swapped[i + 1] = swapped[i + 1], swapped[i]
-        typo_domains.add("".join(swapped) + '.' + base_tld)
-    return typo_domains
+    return {c.domain for c in iter_transposed_domains(main_name, base_tld)}
+
+
+def iter_subdomain_domains(main_name: str, base_tld: str, subdomains: Iterable[str]) -> Iterator[TypoCandidate]:
+    # Lazily yields domains with subdomains added
+    for subdomain in subdomains:
+        yield TypoCandidate(f"{main_name}.{subdomain}.{base_tld}", SUBDOMAIN, len(main_name), subdomain)
 
 
 def generate_subdomain_domains(main_name: str, base_tld: str, subdomains: List[str]) -> Set[str]:
     # Generates domains with subdomains added
-    return {f"{main_name}.{subdomain}.{base_tld}" for subdomain in subdomains}
+    return {c.domain for c in iter_subdomain_domains(main_name, base_tld, subdomains)}
 
 
-def generate_hyphen_dot_manipulations(main_name: str, base_tld: str) -> Set[str]:
-    # Generates domains by manipulating hyphens and dots
-    typo_domains = set()
+def iter_hyphen_dot_manipulations(main_name: str, base_tld: str) -> Iterator[TypoCandidate]:
+    # Lazily yields domains by manipulating hyphens and dots
     if '-' in main_name:
-        typo_domains.add(main_name.replace('-', '') + '.' + base_tld)
-        typo_domains.add(main_name.replace('-', '.') + '.' + base_tld)
+        yield TypoCandidate(main_name.replace('-', '') + '.' + base_tld, HYPHEN_DOT, main_name.index('-'), None)
+        yield TypoCandidate(main_name.replace('-', '.') + '.' + base_tld, HYPHEN_DOT, main_name.index('-'), '.')
     if '.' in main_name:
-        typo_domains.add(main_name.replace('.', '-') + '.' + base_tld)
-    return typo_domains
+        yield TypoCandidate(main_name.replace('.', '-') + '.' + base_tld, HYPHEN_DOT, main_name.index('.'), '-')
 
 
-def generate_bitsquatting_domains(main_name: str, base_tld: str) -> set:
-    typo_domains = set()
+def generate_hyphen_dot_manipulations(main_name: str, base_tld: str) -> Set[str]:
+    # Generates domains by manipulating hyphens and dots
+    return {c.domain for c in iter_hyphen_dot_manipulations(main_name, base_tld)}
+
 
+def iter_bitsquatting_domains(main_name: str, base_tld: str) -> Iterator[TypoCandidate]:
+    # Lazily yields domains with a single flipped bit in one character
     for i, char in enumerate(main_name):
         ascii_value = ord(char)
         for bit in range(8):
             flipped_value = ascii_value ^ (1 << bit)
             if 32 <= flipped_value <= 126:
                 flipped_char = chr(flipped_value)
-                new_domain = (main_name[:i] + flipped_char + main_name[i + 1:]).lower() + '.' + base_tld
-                typo_domains.add(new_domain)
+                yield TypoCandidate((main_name[:i] + flipped_char + main_name[i + 1:]).lower() + '.' + base_tld,
+                                    BITSQUATTING, i, flipped_char.lower())
 
-    return typo_domains
 
+def generate_bitsquatting_domains(main_name: str, base_tld: str) -> set:
+    return {c.domain for c in iter_bitsquatting_domains(main_name, base_tld)}
 
-def generate_typo_domains(domain: str, tlds: List[str], similar_char_map: Dict[str, List[str]],
-                          keyboard_map: Dict[str, List[str]], subdomains: List[str],
-                          entries: List[str]) -> List[str]:
-    # Generates all possible typosquatting domains
-    typo_domains = set()
 
+def split_domain(domain: str) -> Optional[Tuple[str, str]]:
+    # Splits a domain into the name part and its public suffix ("ox.ac.uk" -> "ox", "ac.uk"),
+    # falling back to the last label for suffixes missing from the list; None if the format is invalid
     domain_parts = domain.split('.')
     if len(domain_parts) < 2:
-        print(f"Error: Invalid domain format: {domain}")
-        return []
+        return None
+    parts = get_public_suffix_list().split_domain(domain)
+    if parts is not None:
+        return parts
+    return '.'.join(domain_parts[:-1]), domain_parts[-1]
+
+
+def _technique_generators(main_name: str, base_tld: str, tlds: Iterable[str],
+                          similar_char_map: Dict[str, List[str]], keyboard_map: Dict[str, List[str]],
+                          subdomains: Iterable[str], entries: Iterable[str]):
+    # technique -> callable returning that technique's candidate iterator for main_name.base_tld
+    return {
+        PREFIX_SUFFIX: lambda: iter_prefix_suffix_domains(main_name, base_tld, entries),
+        TLD_REPLACEMENT: lambda: iter_tld_replacements(main_name, base_tld, tlds),
+        KEYBOARD: lambda: iter_keyboard_proximity_domains(main_name, base_tld, keyboard_map),
+        VISUAL: lambda: iter_visual_substitutions(main_name, base_tld, similar_char_map),
+        REMOVAL_ADDITION: lambda: iter_removal_and_addition(main_name, base_tld),
+        TRANSPOSITION: lambda: iter_transposed_domains(main_name, base_tld),
+        SUBDOMAIN: lambda: iter_subdomain_domains(main_name, base_tld, subdomains),
+        HYPHEN_DOT: lambda: iter_hyphen_dot_manipulations(main_name, base_tld),
+        SOUNDSQUATTING: lambda: iter_soundsquatting_domains(main_name, base_tld),
+        BITSQUATTING: lambda: iter_bitsquatting_domains(main_name, base_tld),
+    }
+
 
-    main_name, base_tld = '.'.join(domain_parts[:-1]), domain_parts[-1]
+def iter_typo_candidates(domain: str, tlds: Iterable[str], similar_char_map: Dict[str, List[str]],
+                         keyboard_map: Dict[str, List[str]], subdomains: Iterable[str],
+                         entries: Iterable[str], techniques: Optional[Iterable[str]] = None
+                         ) -> Iterator[TypoCandidate]:
+    # Lazily yields deduplicated, valid and registrable TypoCandidate records as soon as each technique
+    # produces them.
+    # When a domain is produced by several techniques, the first one in TECHNIQUES order is kept.
+    # techniques restricts generation to the given technique families (all of them when None)
+    parts = split_domain(domain)
+    if parts is None:
+        print(f"Error: Invalid domain format: {domain}")
+        return
+
+    main_name, base_tld = parts
+    generators = _technique_generators(main_name, base_tld, tlds, similar_char_map, keyboard_map,
+                                       subdomains, entries)
+    selected = TECHNIQUES
+    if techniques is not None:
+        wanted = set(techniques)
+        selected = [t for t in TECHNIQUES if t in wanted]
+
+    is_registrable = get_public_suffix_list().is_registrable
+    seen = set()
+    for candidate in itertools.chain.from_iterable(generators[t]() for t in selected):
+        if candidate.domain in seen:
+            continue
+        seen.add(candidate.domain)
+        if DOMAIN_REGEX.match(candidate.domain) is not None and is_registrable(candidate.domain):
+            yield candidate
+
+
+def iter_deep_typo_candidates(domain: str, tlds: Iterable[str], similar_char_map: Dict[str, List[str]],
+                              keyboard_map: Dict[str, List[str]], subdomains: Iterable[str],
+                              entries: Iterable[str], depth: int = 2,
+                              techniques: Optional[Iterable[str]] = DEEP_TECHNIQUES,
+                              capacity: int = 5_000_000, error_rate: float = 0.001
+                              ) -> Iterator[TypoCandidate]:
+    """ Opt-in deep mode: lazily yields candidates made of up to depth combined edits,
+    e.g. a TLD swap plus a homoglyph or two keyboard slips.
+    The single-edit candidates of iter_typo_candidates (every technique) come first, then every candidate
+    of one level is edited again by each of techniques. Combined candidates carry all techniques joined
+    with "+" ("tld+visual") and the position/replacement of the last edit. Levels are walked breadth first,
+    so a candidate is first reached with its fewest edits and is only edited further from there; this keeps
+    the walk linear in the number of candidates and only the previous level is held in memory.
+    Duplicates are dropped with a Bloom filter sized for capacity candidates, so memory stays fixed
+    (about 9 MB for the defaults); a false positive (rate about error_rate) skips a new candidate. """
+    parts = split_domain(domain)
+    if parts is None:
+        print(f"Error: Invalid domain format: {domain}")
+        return
+
+    techniques = list(techniques) if techniques is not None else list(TECHNIQUES)
+    seen = BloomFilter(capacity, error_rate)
+    seen.add(domain)
+
+    frontier = []
+    for candidate in iter_typo_candidates(domain, tlds, similar_char_map, keyboard_map, subdomains, entries):
+        if candidate.domain == domain:
+            continue  # transposing a double letter gives the domain back
+        seen.add(candidate.domain)
+        if depth > 1:
+            frontier.append(candidate)
+        yield candidate
+
+    is_registrable = get_public_suffix_list().is_registrable
+    selected = [t for t in TECHNIQUES if t in set(techniques)]
+
+    for level in range(2, depth + 1):
+        # The last level is only yielded, never kept
+        next_frontier = []
+        for candidate in frontier:
+            candidate_parts = split_domain(candidate.domain)
+            if candidate_parts is None:
+                continue
+            generators = _technique_generators(candidate_parts[0], candidate_parts[1], tlds, similar_char_map,
+                                               keyboard_map, subdomains, entries)
+            for technique in selected:
+                for edit in generators[technique]():
+                    if DOMAIN_REGEX.match(edit.domain) is None or not is_registrable(edit.domain):
+                        continue
+                    if not seen.add(edit.domain):
+                        continue
+                    combined = edit._replace(technique=candidate.technique + "+" + edit.technique)
+                    if level < depth:
+                        next_frontier.append(combined)
+                    yield combined
+        frontier = next_frontier
+
+
+def iter_typo_domains(domain: str, tlds: Iterable[str], similar_char_map: Dict[str, List[str]],
+                      keyboard_map: Dict[str, List[str]], subdomains: Iterable[str],
+                      entries: Iterable[str]) -> Iterator[str]:
+    # Lazily yields deduplicated, valid typosquatting domains as soon as each technique produces them
+    for candidate in iter_typo_candidates(domain, tlds, similar_char_map, keyboard_map, subdomains, entries):
+        yield candidate.domain
+
+
+def generate_typo_candidates(domain: str, tlds: List[str], similar_char_map: Dict[str, List[str]],
+                             keyboard_map: Dict[str, List[str]], subdomains: List[str],
+                             entries: List[str], techniques: Optional[Iterable[str]] = None
+                             ) -> List[TypoCandidate]:
+    # Generates all possible typosquatting domains together with their technique provenance
+    candidates = list(iter_typo_candidates(domain, tlds, similar_char_map, keyboard_map, subdomains, entries,
+                                           techniques))
+    print(f"Generated {len(candidates)} valid typo domains.")
+    return candidates
 
-    typo_domains |= generate_prefix_suffix_domains(main_name, base_tld, entries)
-    typo_domains |= generate_tld_replacements(main_name, base_tld, tlds)
-    typo_domains |= generate_keyboard_proximity_domains(main_name, base_tld, keyboard_map)
-    typo_domains |= generate_visual_substitutions(main_name, base_tld, similar_char_map)
-    typo_domains |= generate_removal_and_addition(main_name, base_tld)
-    typo_domains |= generate_transposed_domains(main_name, base_tld)
-    typo_domains |= generate_subdomain_domains(main_name, base_tld, subdomains)
-    typo_domains |= generate_hyphen_dot_manipulations(main_name, base_tld)
-    typo_domains |= generate_soundsquatting_domains(main_name, base_tld)
-    typo_domains |= generate_bitsquatting_domains(main_name, base_tld)
 
-    valid_domains = [d for d in typo_domains if is_valid_domain(d)]
+def generate_typo_domains(domain: str, tlds: List[str], similar_char_map: Dict[str, List[str]],
+                          keyboard_map: Dict[str, List[str]], subdomains: List[str],
+                          entries: List[str]) -> List[str]:
+    # Generates all possible typosquatting domains
+    valid_domains = list(iter_typo_domains(domain, tlds, similar_char_map, keyboard_map, subdomains, entries))
     print(f"Generated {len(valid_domains)} valid typo domains.")
     return valid_domains
@@ -0,0 +1,104 @@
+import hashlib
+import math
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional
+
+from domain_generator import TypoCandidate
+from models import db, CandidateSet, CandidateState
+
+# Share of the already known, not existing candidates re-probed on every incremental scan;
+# with 0.1 every old candidate is re-checked at least once every ten scans
+DEFAULT_REFRESH_FRACTION = 0.1
+
+_QUERY_CHUNK = 500  # keeps IN (...) lists below SQLite's variable limit
+
+
+def candidate_fingerprint(domains: Iterable[str]) -> str:
+    # Order-independent hash of a candidate set
+    digest = hashlib.sha256()
+    for domain in sorted(domains):
+        digest.update(domain.encode("utf-8"))
+        digest.update(b"\n")
+    return digest.hexdigest()
+
+
+def _chunked(items: List[str]):
+    for i in range(0, len(items), _QUERY_CHUNK):
+        yield items[i:i + _QUERY_CHUNK]
+
+
+def _sync_candidate_states(domain_id: int, candidates: Dict[str, TypoCandidate], fingerprint: str,
+                           wordlist_version: Optional[str], now: datetime):
+    # Adds states for new candidates and drops states of candidates no longer generated
+    known = {row.candidate for row in db.session.query(CandidateState.candidate).filter_by(domain_id=domain_id)}
+
+    removed = list(known - candidates.keys())
+    for chunk in _chunked(removed):
+        CandidateState.query.filter(CandidateState.domain_id == domain_id,
+                                    CandidateState.candidate.in_(chunk)).delete(synchronize_session=False)
+
+    new_domains = [domain for domain in candidates if domain not in known]
+    db.session.add_all(CandidateState(domain_id=domain_id, candidate=domain,
+                                      technique=candidates[domain].technique, first_seen=now)
+                       for domain in new_domains)
+
+    candidate_set = CandidateSet.query.filter_by(domain_id=domain_id).first()
+    if candidate_set is None:
+        candidate_set = CandidateSet(domain_id=domain_id)
+        db.session.add(candidate_set)
+    candidate_set.fingerprint = fingerprint
+    candidate_set.wordlist_version = wordlist_version
+    candidate_set.candidate_count = len(candidates)
+    candidate_set.updated_at = now
+    db.session.commit()
+
+    print(f"[INFO] Candidate set changed: {len(new_domains)} new, {len(removed)} removed candidates.")
+
+
+def select_candidates_to_probe(domain_id: int, candidates: Iterable[TypoCandidate],
+                               wordlist_version: Optional[str] = None,
+                               refresh_fraction: float = DEFAULT_REFRESH_FRACTION,
+                               now: Optional[datetime] = None) -> List[TypoCandidate]:
+    """ Returns the part of a domain's candidate set an incremental scan has to resolve:
+    candidates never probed, candidates that existed at their last probe, and the refresh_fraction
+    of the remaining ones that were checked longest ago. The stored set is only diffed when the
+    fingerprint of the generated candidates changed. """
+    now = now or datetime.utcnow()
+    by_domain: Dict[str, TypoCandidate] = {}
+    for candidate in candidates:
+        by_domain.setdefault(candidate.domain, candidate)
+
+    fingerprint = candidate_fingerprint(by_domain)
+    candidate_set = CandidateSet.query.filter_by(domain_id=domain_id).first()
+    if candidate_set is None or candidate_set.fingerprint != fingerprint:
+        _sync_candidate_states(domain_id, by_domain, fingerprint, wordlist_version, now)
+
+    states = db.session.query(CandidateState.candidate).filter(CandidateState.domain_id == domain_id)
+    unchecked = [row.candidate for row in states.filter(CandidateState.last_checked.is_(None))]
+    existing = [row.candidate for row in states.filter(CandidateState.exists.is_(True),
+                                                       CandidateState.last_checked.isnot(None))]
+
+    old_count = len(by_domain) - len(unchecked) - len(existing)
+    slice_size = math.ceil(old_count * refresh_fraction)
+    stale = [row.candidate for row in states.filter(CandidateState.exists.isnot(True),
+                                                    CandidateState.last_checked.isnot(None))
+             .order_by(CandidateState.last_checked.asc(), CandidateState.id.asc())
+             .limit(slice_size)]
+
+    selected = [by_domain[domain] for domain in unchecked + existing + stale if domain in by_domain]
+    print(f"[INFO] Incremental scan: {len(unchecked)} unchecked, {len(existing)} existing and "
+          f"{len(stale)} stale of {len(by_domain)} candidates selected.")
+    return selected
+
+
+def record_probe_results(domain_id: int, results: Dict[str, Optional[bool]], now: Optional[datetime] = None):
+    # Stores the DNS outcome of every probed candidate; unknown outcomes (None) leave the state untouched,
+    # so the candidate keeps its previous result and is probed again as before
+    now = now or datetime.utcnow()
+    results = {domain: exists for domain, exists in results.items() if exists is not None}
+    for chunk in _chunked(list(results)):
+        for state in CandidateState.query.filter(CandidateState.domain_id == domain_id,
+                                                 CandidateState.candidate.in_(chunk)):
+            state.exists = results[state.candidate]
+            state.last_checked = now
+    db.session.commit()
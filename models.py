@@ -1,10 +1,32 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime
+from sqlalchemy import inspect, text
 
 db = SQLAlchemy()
 
 
+def upgrade_schema():
+    # db.create_all() only creates missing tables; this adds columns introduced later to existing
+    # tables (all of them nullable) and their indexes, so an existing app.db keeps working. Needs an app context
+    inspector = inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=db.engine.dialect)
+                    connection.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                    print(f"[INFO] Added column {table.name}.{column.name}")
+            existing_indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing_indexes:
+                    index.create(connection)
+                    print(f"[INFO] Added index {index.name}")
+
+
 # User Model
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -56,6 +78,21 @@ class ScanDetails(db.Model):
     whois_emails = db.Column(db.String(255), nullable=True)
     similarity_score = db.Column(db.Integer, nullable=True)
     reputation = db.Column(db.String(50), nullable=True)
+    blocklisted_by = db.Column(db.String(255), nullable=True)  # reputation providers listing the domain
+    # DNS profile of the domain; ip_address holds the first of ip_addresses
+    ip_addresses = db.Column(db.Text, nullable=True)  # comma separated A records
+    ipv6_addresses = db.Column(db.Text, nullable=True)  # comma separated AAAA records
+    cname_chain = db.Column(db.Text, nullable=True)  # comma separated, in resolution order
+    mx_records = db.Column(db.Text, nullable=True)  # comma separated "preference exchange"
+    ns_records = db.Column(db.Text, nullable=True)  # comma separated
+    txt_records = db.Column(db.Text, nullable=True)  # JSON list, TXT strings may contain commas
+    dns_rcode = db.Column(db.Integer, nullable=True)
+    dns_ttl = db.Column(db.Integer, nullable=True)
+    dns_latency_ms = db.Column(db.Float, nullable=True)
+    # Registration dates parsed at ingest (naive UTC); whois_creation_date keeps the raw string
+    whois_created_at = db.Column(db.DateTime, nullable=True, index=True)
+    whois_expires_at = db.Column(db.DateTime, nullable=True, index=True)
+    whois_updated_at = db.Column(db.DateTime, nullable=True, index=True)
 
 
 class Whitelist(db.Model):
@@ -68,3 +105,26 @@ class Whitelist(db.Model):
 
     def __repr__(self):
         return f"<Whitelist {self.whitelisted_domain} for Domain {self.domain_id}>"
+
+
+# Fingerprint of the typo candidate set generated for a domain, used to diff re-scans
+class CandidateSet(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    domain_id = db.Column(db.Integer, db.ForeignKey('domain.id'), nullable=False, unique=True)
+    wordlist_version = db.Column(db.String(40), nullable=True)
+    fingerprint = db.Column(db.String(64), nullable=False)
+    candidate_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# Last DNS outcome of one typo candidate of a domain
+class CandidateState(db.Model):
+    __table_args__ = (db.UniqueConstraint('domain_id', 'candidate'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    domain_id = db.Column(db.Integer, db.ForeignKey('domain.id'), nullable=False, index=True)
+    candidate = db.Column(db.String(255), nullable=False)
+    technique = db.Column(db.String(50), nullable=True)
+    exists = db.Column(db.Boolean, nullable=True)  # None until the candidate was probed once
+    first_seen = db.Column(db.DateTime, default=datetime.utcnow)
+    last_checked = db.Column(db.DateTime, nullable=True, index=True)
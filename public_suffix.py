@@ -0,0 +1,99 @@
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+PUBLIC_SUFFIX_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lists", "public_suffix_list.dat")
+
+_RULE = "!"  # trie key marking the end of a rule
+_EXCEPTION = "!!"  # trie key marking the end of an exception rule
+
+
+class PublicSuffixList:
+    # Public Suffix List held as a trie of reversed labels ("ac.uk" -> {"uk": {"ac": {...}}})
+
+    def __init__(self, rules):
+        self._trie: Dict[str, dict] = {}
+        for rule in rules:
+            exception = rule.startswith("!")
+            node = self._trie
+            for label in reversed(rule.lstrip("!").split(".")):
+                node = node.setdefault(label, {})
+            node[_EXCEPTION if exception else _RULE] = True
+
+    def get_public_suffix(self, domain: str) -> Optional[str]:
+        # Returns the longest matching public suffix of domain, None if no listed rule matches
+        labels = domain.lower().rstrip(".").split(".")
+        node = self._trie
+        suffix_length = 0
+        for depth, label in enumerate(reversed(labels), start=1):
+            wildcard = node.get("*")
+            node = node.get(label)
+            if node is not None and node.get(_EXCEPTION):
+                # "!city.kawasaki.jp" - the exception label itself is registrable
+                suffix_length = depth - 1
+                break
+            if node is not None and node.get(_RULE):
+                suffix_length = depth
+            elif wildcard is not None and wildcard.get(_RULE):
+                suffix_length = depth
+            if node is None:
+                break
+
+        if suffix_length == 0:
+            return None
+        return ".".join(labels[-suffix_length:])
+
+    def split_domain(self, domain: str) -> Optional[Tuple[str, str]]:
+        # Splits domain into (name, public suffix), e.g. "ox.ac.uk" -> ("ox", "ac.uk")
+        suffix = self.get_public_suffix(domain)
+        if suffix is None:
+            return None
+        name = domain[:-len(suffix)].rstrip(".")
+        if not name:
+            return None
+        return name, suffix
+
+    def get_registrable_domain(self, domain: str) -> Optional[str]:
+        # Returns the part of domain that can be bought from a registrar, e.g. "mail.ox.ac.uk" -> "ox.ac.uk"
+        parts = self.split_domain(domain)
+        if parts is None:
+            return None
+        return parts[0].split(".")[-1] + "." + parts[1]
+
+    def is_registrable(self, domain: str) -> bool:
+        # True if domain sits under a listed public suffix and is not a public suffix itself
+        return self.split_domain(domain) is not None
+
+
+def load_public_suffix_list(file_path: str = PUBLIC_SUFFIX_FILE, include_private: bool = False) -> PublicSuffixList:
+    # Loads rules from a public_suffix_list.dat file; private (non-ICANN) sections are skipped by default
+    rules = []
+    try:
+        with open(file_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if line.startswith("// ===BEGIN PRIVATE DOMAINS===") and not include_private:
+                    break
+                if not line or line.startswith("//"):
+                    continue
+                rules.append(line.split()[0].lower())
+    except FileNotFoundError:
+        print(f"Error: Public suffix list not found: {file_path}")
+    return PublicSuffixList(rules)
+
+
+_public_suffix_lists: Dict[bool, PublicSuffixList] = {}
+_lock = threading.Lock()
+
+
+def get_public_suffix_list(include_private: bool = False) -> PublicSuffixList:
+    # Returns the process-wide list parsed from the bundled lists/public_suffix_list.dat;
+    # include_private adds the private section (shared hosting such as blogspot.com)
+    public_suffix_list = _public_suffix_lists.get(include_private)
+    if public_suffix_list is None:
+        with _lock:
+            public_suffix_list = _public_suffix_lists.get(include_private)
+            if public_suffix_list is None:
+                public_suffix_list = _public_suffix_lists[include_private] = load_public_suffix_list(
+                    include_private=include_private)
+    return public_suffix_list
@@ -0,0 +1,260 @@
+import json
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from dns_resolver import to_ascii
+
+# IANA RDAP bootstrap registry for domains (RFC 9224), shipped in lists/ and refreshed with --update-bootstrap
+RDAP_BOOTSTRAP_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lists", "rdap_dns.json")
+IANA_RDAP_BOOTSTRAP_URL = "https://data.iana.org/rdap/dns.json"
+
+
+class RDAPError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+class RDAPRecord(NamedTuple):
+    # Registration data of one domain; dates are naive UTC
+    domain: str
+    registrar: Optional[str] = None
+    creation_date: Optional[datetime] = None
+    expiration_date: Optional[datetime] = None
+    updated_date: Optional[datetime] = None
+    name_servers: Tuple[str, ...] = ()
+    emails: Tuple[str, ...] = ()
+    country: Optional[str] = None
+    status: Tuple[str, ...] = ()
+    related: Optional[str] = None  # registrar's RDAP URL for the domain, given by thin registries
+
+
+def load_rdap_bootstrap(file_path: str = RDAP_BOOTSTRAP_FILE) -> Dict[str, List[str]]:
+    # TLD -> RDAP base URLs (https first) from an IANA bootstrap file
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            services = json.load(file).get("services", [])
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] Cannot read RDAP bootstrap file {file_path}: {e}")
+        return {}
+
+    bootstrap = {}
+    for tlds, urls in services:
+        urls = sorted(urls, key=lambda url: not url.startswith("https://"))
+        for tld in tlds:
+            bootstrap[tld.lower()] = urls
+    return bootstrap
+
+
+def parse_rdap_date(value) -> Optional[datetime]:
+    # RFC 3339 timestamp ("2024-01-02T03:04:05Z", fractions and offsets allowed) as naive UTC
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00").replace("z", "+00:00"))
+    except ValueError:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _vcard(entity: dict) -> Dict[str, list]:
+    # vCard property name -> list of (parameters, value) of a jCard vcardArray
+    properties: Dict[str, list] = {}
+    vcard = entity.get("vcardArray")
+    if isinstance(vcard, list) and len(vcard) == 2 and isinstance(vcard[1], list):
+        for item in vcard[1]:
+            if isinstance(item, list) and len(item) >= 4:
+                properties.setdefault(item[0], []).append((item[1], item[3]))
+    return properties
+
+
+def _walk_entities(entities: list):
+    for entity in _list(entities):
+        if isinstance(entity, dict):
+            yield entity
+            yield from _walk_entities(entity.get("entities"))
+
+
+def _list(value) -> list:
+    return value if isinstance(value, list) else []
+
+
+def parse_rdap_domain(domain: str, data: dict) -> RDAPRecord:
+    # Members may be missing or null; a body that is not an RDAP object raises RDAPError
+    if not isinstance(data, dict):
+        raise RDAPError(f"Invalid RDAP response for {domain}: not an object")
+    events = {event.get("eventAction"): parse_rdap_date(event.get("eventDate"))
+              for event in _list(data.get("events")) if isinstance(event, dict)}
+
+    registrar, country, emails = None, None, []
+    for entity in _walk_entities(data.get("entities")):
+        roles = _list(entity.get("roles"))
+        vcard = _vcard(entity)
+        if "registrar" in roles and registrar is None:
+            registrar = next((value for _, value in vcard.get("fn", []) if isinstance(value, str) and value), None)
+        if "registrant" in roles and country is None:
+            for parameters, value in vcard.get("adr", []):
+                if isinstance(parameters, dict) and isinstance(parameters.get("cc"), str) and parameters["cc"]:
+                    country = parameters["cc"]
+                elif isinstance(value, list) and value and isinstance(value[-1], str) and value[-1]:
+                    country = value[-1]
+        for _, value in vcard.get("email", []):
+            if isinstance(value, str) and value and value not in emails:
+                emails.append(value)
+
+    name_servers = tuple(server["ldhName"].lower() for server in _list(data.get("nameservers"))
+                         if isinstance(server, dict) and isinstance(server.get("ldhName"), str))
+    related = next((link["href"] for link in _list(data.get("links"))
+                    if isinstance(link, dict) and link.get("rel") == "related" and isinstance(link.get("href"), str)
+                    and link.get("type", "application/rdap+json") == "application/rdap+json"
+                    and "/domain/" in link["href"]), None)
+    return RDAPRecord(
+        domain=domain,
+        registrar=registrar,
+        creation_date=events.get("registration"),
+        expiration_date=events.get("expiration"),
+        updated_date=events.get("last changed"),
+        name_servers=name_servers,
+        emails=tuple(emails),
+        country=country,
+        status=tuple(status for status in _list(data.get("status")) if isinstance(status, str)),
+        related=related,
+    )
+
+
+def needs_registrar_data(record: RDAPRecord) -> bool:
+    # Thin registries (com, net) leave the registrant out, only the registrar's record has it
+    return record.country is None or not record.emails
+
+
+def merge_rdap_records(registry: RDAPRecord, registrar: RDAPRecord) -> RDAPRecord:
+    # Registry record completed with the registrar's: registry values win, contacts are combined
+    return registry._replace(
+        registrar=registry.registrar or registrar.registrar,
+        creation_date=registry.creation_date or registrar.creation_date,
+        expiration_date=registry.expiration_date or registrar.expiration_date,
+        updated_date=registry.updated_date or registrar.updated_date,
+        name_servers=registry.name_servers or registrar.name_servers,
+        emails=tuple(dict.fromkeys(registry.emails + registrar.emails)),
+        country=registry.country or registrar.country,
+    )
+
+
+class RDAPClient:
+    """ RDAP client for domain lookups. Servers come from the IANA bootstrap data (a file path or a
+    TLD -> base URLs mapping); all requests go through one requests.Session whose connection pool
+    keeps pool_size keep-alive connections per RDAP host. Thread safe. """
+
+    def __init__(self, bootstrap: Union[str, Dict[str, List[str]]] = RDAP_BOOTSTRAP_FILE,
+                 timeout: float = 10.0, pool_size: int = 16):
+        self.bootstrap = load_rdap_bootstrap(bootstrap) if isinstance(bootstrap, str) else dict(bootstrap)
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Accept": "application/rdap+json, application/json"})
+
+    def base_url(self, domain: str) -> Optional[str]:
+        # RDAP base URL of the closest listed suffix of domain, None when its TLD has no RDAP service
+        labels = to_ascii(domain).split(".")
+        for i in range(1, len(labels)):
+            urls = self.bootstrap.get(".".join(labels[i:]))
+            if urls:
+                return urls[0]
+        return None
+
+    def domain_url(self, domain: str) -> Optional[str]:
+        base_url = self.base_url(domain)
+        return base_url.rstrip("/") + "/domain/" + to_ascii(domain) if base_url else None
+
+    def lookup(self, domain: str, follow_related: bool = True) -> RDAPRecord:
+        # Registry record of domain; for thin registries completed from the registrar's RDAP server
+        url = self.domain_url(domain)
+        if url is None:
+            raise RDAPError(f"No RDAP service for {domain}")
+        record = self.get(domain, url)
+        if follow_related and record.related and needs_registrar_data(record):
+            try:
+                record = merge_rdap_records(record, self.get(domain, record.related))
+            except RDAPError as e:
+                print(f"[WARNING] RDAP registrar lookup failed: {e}")
+        return record
+
+    def get(self, domain: str, url: str) -> RDAPRecord:
+        # One RDAP domain request to url; an error status is raised with RDAPError.status set
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+        except requests.RequestException as e:
+            raise RDAPError(f"RDAP request for {domain} failed: {e}")
+        if response.status_code != 200:
+            raise RDAPError(f"RDAP server answered {response.status_code} for {domain}", response.status_code)
+        try:
+            data = response.json()
+        except ValueError as e:
+            raise RDAPError(f"Invalid RDAP response for {domain}: {e}")
+        try:
+            return parse_rdap_domain(domain, data)
+        except RDAPError:
+            raise
+        except Exception as e:
+            raise RDAPError(f"Invalid RDAP response for {domain}: {e}")
+
+    def close(self):
+        self.session.close()
+
+
+_rdap_client: Optional[RDAPClient] = None
+_lock = threading.Lock()
+
+
+def get_rdap_client() -> RDAPClient:
+    # Process-wide client, so every scan shares the pooled connections
+    global _rdap_client
+    if _rdap_client is None:
+        with _lock:
+            if _rdap_client is None:
+                _rdap_client = RDAPClient()
+    return _rdap_client
+
+
+def update_bootstrap(file_path: str = RDAP_BOOTSTRAP_FILE, url: str = IANA_RDAP_BOOTSTRAP_URL):
+    response = requests.get(url, timeout=30)
+    response.raise_for_status()
+    services = response.json().get("services")
+    if not services:
+        raise ValueError("Bootstrap file without services")
+    with open(file_path, "w", encoding="utf-8") as file:
+        file.write(response.text)
+    print(f"[SUCCESS] RDAP bootstrap updated: {len(services)} services -> {file_path}")
+
+
+def main():
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python rdap_client.py <domain> | --update-bootstrap")
+        sys.exit(1)
+    if sys.argv[1] == "--update-bootstrap":
+        update_bootstrap()
+        return
+
+    try:
+        record = get_rdap_client().lookup(sys.argv[1])
+    except RDAPError as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+    for field, value in record._asdict().items():
+        print(f"{field}: {value}")
+
+
+if __name__ == "__main__":
+    main()
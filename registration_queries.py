@@ -0,0 +1,66 @@
+from datetime import datetime
+from typing import List, NamedTuple, Optional
+
+from sqlalchemy import func
+
+from models import db, Domain, ScanDetails, ScanHistory
+from whois_lookup import parse_whois_date
+
+
+class NewRegistration(NamedTuple):
+    brand: str
+    domain: str
+    created_at: datetime
+    expires_at: Optional[datetime]
+    registrar: Optional[str]
+    last_seen: datetime
+
+
+def newly_registered_domains(user_id: int, since: datetime, until: Optional[datetime] = None) -> List[NewRegistration]:
+    """ Lookalike domains of all brands of a user registered in [since, until), newest registration first.
+    Each domain is reported once per brand, judged by its most recent scan: a domain whose latest WHOIS
+    creation date moved out of the range (re-registered, or corrected) is not reported from an older scan.
+    The filter runs on the indexed whois_created_at column, so no WHOIS string is parsed at query time.
+    Needs an app context. """
+    latest = (db.session.query(func.max(ScanDetails.id).label("id"))
+              .join(ScanHistory, ScanDetails.scan_id == ScanHistory.id)
+              .join(Domain, ScanHistory.domain_id == Domain.id)
+              .filter(Domain.user_id == user_id)
+              .group_by(ScanHistory.domain_id, ScanDetails.domain_name)
+              .subquery())
+
+    rows = (db.session.query(Domain.name, ScanDetails.domain_name, ScanDetails.whois_created_at,
+                             ScanDetails.whois_expires_at, ScanDetails.whois_registrar, ScanHistory.date)
+            .join(latest, ScanDetails.id == latest.c.id)
+            .join(ScanHistory, ScanDetails.scan_id == ScanHistory.id)
+            .join(Domain, ScanHistory.domain_id == Domain.id)
+            .filter(ScanDetails.whois_created_at >= since))
+    if until is not None:
+        rows = rows.filter(ScanDetails.whois_created_at < until)
+    rows = rows.order_by(ScanDetails.whois_created_at.desc(), ScanDetails.domain_name).all()
+    return [NewRegistration(*row) for row in rows]
+
+
+def backfill_registration_dates(batch_size: int = 500) -> int:
+    # Fills whois_created_at of rows written before it existed from the raw whois_creation_date string.
+    # Rows whose string cannot be parsed stay NULL and are not retried; returns the number of rows updated.
+    # whois_expires_at and whois_updated_at are not backfilled: older rows never stored the raw expiration
+    # or update date, so they stay NULL until the domain is scanned again
+    updated = 0
+    last_id = 0
+    while True:
+        rows = (ScanDetails.query
+                .filter(ScanDetails.id > last_id, ScanDetails.whois_created_at.is_(None),
+                        ScanDetails.whois_creation_date.isnot(None), ScanDetails.whois_creation_date != "---")
+                .order_by(ScanDetails.id).limit(batch_size).all())
+        if not rows:
+            break
+        for row in rows:
+            row.whois_created_at = parse_whois_date(row.whois_creation_date)
+            updated += row.whois_created_at is not None
+        last_id = rows[-1].id
+        db.session.commit()
+
+    if updated:
+        print(f"[INFO] Backfilled registration dates of {updated} scan details.")
+    return updated
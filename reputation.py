@@ -1,36 +1,81 @@
 import requests
 from dotenv import load_dotenv
 import os
+from typing import Optional
+from requests.adapters import HTTPAdapter
 
 load_dotenv()
 
 VT_API_KEY = os.getenv("VIRUSTOTAL_API_KEY")
+VT_API_URL = "https://www.virustotal.com/api/v3"
+
+
+class VTError(Exception):
+    def __init__(self, message: str, status: Optional[int] = None):
+        super().__init__(message)
+        self.status = status
+
+
+def vt_summary(domain, vt_data):
+    # Fields of the VT domain attributes shown in scans and alerts
+    return {
+        "domain": domain,
+        "last_modification_date": vt_data.get("last_modification_date"),
+        "whois": vt_data.get("whois"),
+        "last_dns_records_date": vt_data.get("last_dns_records_date"),
+        "last_https_certificate_date": vt_data.get("last_https_certificate_date"),
+        "categories": vt_data.get("categories", {}),
+        "reputation": vt_data.get("reputation"),
+        "total_votes": vt_data.get("total_votes", {}),
+        "tags": vt_data.get("tags", []),
+        "last_analysis_stats": vt_data.get("last_analysis_stats", {})
+    }
 
 
 def check_domain_reputation(domain, api_key):
     # Performs VT reputation check
     print(f"Checking reputation for domain: {domain}")
-    url = f"https://www.virustotal.com/api/v3/domains/{domain}"
+    url = f"{VT_API_URL}/domains/{domain}"
     headers = {"x-apikey": api_key}
     try:
         response = requests.get(url, headers=headers)
         if response.status_code == 200:
             vt_data = response.json().get('data', {}).get('attributes', {})
-            return {
-                "domain": domain,
-                "last_modification_date": vt_data.get("last_modification_date"),
-                "whois": vt_data.get("whois"),
-                "last_dns_records_date": vt_data.get("last_dns_records_date"),
-                "last_https_certificate_date": vt_data.get("last_https_certificate_date"),
-                "categories": vt_data.get("categories", {}),
-                "reputation": vt_data.get("reputation"),
-                "total_votes": vt_data.get("total_votes", {}),
-                "tags": vt_data.get("tags", []),
-                "last_analysis_stats": vt_data.get("last_analysis_stats", {})
-            }
+            return vt_summary(domain, vt_data)
         else:
             print(f"Error: VirusTotal returned status code {response.status_code} for domain {domain}")
             return {"error": "Failed to retrieve data from VirusTotal"}
     except Exception as e:
         print(f"Error: Could not connect to VirusTotal for domain {domain}. Exception: {e}")
         return {"error": str(e)}
+
+
+class VirusTotalClient:
+    """ VT API v3 client on one requests.Session, so every lookup reuses pooled keep-alive connections.
+    It does not pace itself; requests go through the shared quota of vt_queue. Thread safe. """
+
+    def __init__(self, api_key: str, base_url: str = VT_API_URL, timeout: float = 15.0, pool_size: int = 4):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"x-apikey": api_key, "Accept": "application/json"})
+
+    def lookup(self, domain: str) -> dict:
+        # Full attribute payload of domain; VTError with status 429 when the API quota is used up
+        try:
+            response = self.session.get(f"{self.base_url}/domains/{domain}", timeout=self.timeout)
+        except requests.RequestException as e:
+            raise VTError(f"VirusTotal request for {domain} failed: {e}")
+        if response.status_code != 200:
+            raise VTError(f"VirusTotal returned status code {response.status_code} for domain {domain}",
+                          response.status_code)
+        try:
+            return response.json().get("data", {}).get("attributes", {})
+        except ValueError as e:
+            raise VTError(f"Invalid VirusTotal response for {domain}: {e}")
+
+    def close(self):
+        self.session.close()
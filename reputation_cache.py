@@ -0,0 +1,110 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, NamedTuple, Optional
+
+# Shared by every scan and user; lives next to app.db like the WHOIS cache
+REPUTATION_CACHE_PATH = os.getenv("REPUTATION_CACHE_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", "reputation_cache.db")
+
+# Older entries are still served, but a refresh is queued for them
+REPUTATION_MAX_AGE = int(os.getenv("REPUTATION_MAX_AGE", 3 * 86400))
+
+
+class ReputationEntry(NamedTuple):
+    domain: str
+    attributes: dict  # full VT attribute payload, {} when VT does not know the domain
+    fetched_at: float
+    stale: bool
+
+
+def reputation_fingerprint(addresses: Iterable[str], name_servers: Iterable[str]) -> str:
+    # Where a domain is hosted; when it changes the cached reputation no longer describes the site
+    digest = hashlib.sha256()
+    for value in sorted(set(addresses)) + ["|"] + sorted(set(name_servers)):
+        digest.update(value.lower().encode("utf-8") + b"\n")
+    return digest.hexdigest()[:16]
+
+
+class ReputationCache:
+    """ Persistent reputation data keyed by domain, shared by all scans and users. Entries younger than
+    max_age are fresh; older ones, and ones whose hosting fingerprint changed since they were fetched,
+    are returned as stale so the caller can serve them and queue a refresh. """
+
+    def __init__(self, path: Optional[str] = REPUTATION_CACHE_PATH, max_age: float = REPUTATION_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+        self.hits = 0
+        self.stale = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", timeout=10, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS reputation_cache "
+                         "(domain TEXT PRIMARY KEY, attributes TEXT NOT NULL, fetched REAL NOT NULL, fingerprint TEXT)")
+        self._db.commit()
+
+    @staticmethod
+    def _key(domain: str) -> str:
+        return domain.lower().rstrip(".")
+
+    def get(self, domain: str, fingerprint: Optional[str] = None,
+            now: Optional[float] = None) -> Optional[ReputationEntry]:
+        # The first fingerprint seen after a fetch is adopted; a different one later marks the entry stale
+        now = time.time() if now is None else now
+        key = self._key(domain)
+        with self._lock:
+            row = self._db.execute("SELECT attributes, fetched, fingerprint FROM reputation_cache WHERE domain = ?",
+                                   (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            attributes, fetched, stored_fingerprint = row
+            if fingerprint is not None and stored_fingerprint is None:
+                self._db.execute("UPDATE reputation_cache SET fingerprint = ? WHERE domain = ?", (fingerprint, key))
+                self._db.commit()
+                stored_fingerprint = fingerprint
+            stale = now - fetched >= self.max_age or (fingerprint is not None and fingerprint != stored_fingerprint)
+            if stale:
+                self.stale += 1
+            else:
+                self.hits += 1
+        return ReputationEntry(key, json.loads(attributes), fetched, stale)
+
+    def put(self, domain: str, attributes: dict, now: Optional[float] = None):
+        # The fingerprint is cleared, the next scan of the domain records the current one
+        now = time.time() if now is None else now
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO reputation_cache (domain, attributes, fetched, fingerprint) "
+                             "VALUES (?, ?, ?, NULL)", (self._key(domain), json.dumps(attributes, default=str), now))
+            self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM reputation_cache")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "stale": self.stale, "misses": self.misses}
+
+
+_reputation_cache: Optional[ReputationCache] = None
+_lock = threading.Lock()
+
+
+def get_reputation_cache() -> ReputationCache:
+    # Process-wide cache stored in REPUTATION_CACHE_PATH
+    global _reputation_cache
+    if _reputation_cache is None:
+        with _lock:
+            if _reputation_cache is None:
+                _reputation_cache = ReputationCache()
+    return _reputation_cache
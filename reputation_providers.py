@@ -0,0 +1,313 @@
+import csv
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, List, NamedTuple, Optional, Sequence
+from urllib.parse import urlparse
+
+from public_suffix import get_public_suffix_list
+from reputation_cache import ReputationCache
+from vt_queue import VT_MAX_SCORE, VTQueue, cached_reputation, fetch_reputation_now, get_vt_queue, vt_worker_running
+
+INSTANCE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "instance")
+
+# Offline sources, used when the file exists: one domain per line, and a URLhaus CSV dump
+# (https://urlhaus.abuse.ch/downloads/csv/)
+REPUTATION_BLOCKLIST = os.getenv("REPUTATION_BLOCKLIST") or os.path.join(INSTANCE_DIR, "blocklist.txt")
+URLHAUS_CSV = os.getenv("URLHAUS_CSV") or os.path.join(INSTANCE_DIR, "urlhaus.csv")
+
+PROVIDER_TIMEOUT = 10.0  # seconds a provider may take for one batch
+FAILURE_THRESHOLD = 3  # consecutive failures that open a provider's circuit
+RESET_TIMEOUT = 300.0  # seconds an open circuit skips its provider before one trial call
+
+
+class ReputationQuery(NamedTuple):
+    domain: str
+    priority: int  # Damerau-Levenshtein score, lower is checked first by quota-limited providers
+    fingerprint: Optional[str] = None  # hosting fingerprint, see reputation_cache
+    immediate: bool = False  # quick scans: answer now where possible instead of queueing
+
+
+class Verdict(NamedTuple):
+    provider: str
+    listed: bool  # the provider reports the domain as malicious
+    reason: str = ""
+    pending: bool = False  # the answer comes later (queued VT lookup)
+    data: Optional[dict] = None  # provider specific payload, the VT summary for virustotal
+
+
+class CircuitBreaker:
+    """ Closed while the provider works. failure_threshold consecutive failures open it: calls are
+    refused for reset_timeout seconds, then a single trial call is let through (half open) which
+    closes the circuit on success and opens it again on failure. """
+
+    def __init__(self, failure_threshold: int = FAILURE_THRESHOLD, reset_timeout: float = RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self._trial else "open"
+
+    def allow(self, now: Optional[float] = None) -> bool:
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if not self._trial and now - self.opened_at >= self.reset_timeout:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def record_failure(self, now: Optional[float] = None):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = now
+                self._trial = False
+
+
+class ReputationProvider(ABC):
+    # One reputation source; check_many returns a verdict for the domains it knows something about
+    name = "provider"
+
+    def __init__(self, timeout: float = PROVIDER_TIMEOUT):
+        self.timeout = timeout
+
+    @abstractmethod
+    def check_many(self, queries: Sequence[ReputationQuery]) -> Dict[str, Verdict]:
+        pass
+
+
+class _FileProvider(ReputationProvider, ABC):
+    # Loads its file on first use and again whenever it changes on disk
+
+    def __init__(self, path: str, timeout: float = PROVIDER_TIMEOUT):
+        super().__init__(timeout)
+        self.path = path
+        self._mtime: Optional[float] = None
+        self._entries: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    @abstractmethod
+    def _load(self) -> Dict[str, str]:
+        pass
+
+    def entries(self) -> Dict[str, str]:
+        mtime = os.path.getmtime(self.path)
+        with self._lock:
+            if mtime != self._mtime:
+                self._entries = self._load()
+                self._mtime = mtime
+                print(f"[INFO] Loaded {len(self._entries)} entries of {self.name} from {self.path}")
+            return self._entries
+
+
+def _parents(domain: str) -> List[str]:
+    # domain and its parent domains down to the registrable domain: a.b.example.com, b.example.com,
+    # example.com. Shared hosting suffixes count as public, so a report on x.blogspot.com or a.evil.co.uk
+    # does not list blogspot.com or co.uk
+    domain = domain.lower().rstrip(".")
+    registrable = get_public_suffix_list(include_private=True).get_registrable_domain(domain)
+    if registrable is None:
+        return [domain]
+    labels = domain.split(".")
+    return [".".join(labels[i:]) for i in range(len(labels) - registrable.count("."))]
+
+
+class BlocklistProvider(_FileProvider):
+    # Plain text blocklist, one domain per line, "#" starts a comment; a listed domain covers its subdomains
+    name = "blocklist"
+
+    def _load(self) -> Dict[str, str]:
+        entries = {}
+        with open(self.path, "r", encoding="utf-8") as file:
+            for line in file:
+                domain = line.split("#", 1)[0].strip().lower().rstrip(".")
+                if domain:
+                    entries[domain] = f"listed in {os.path.basename(self.path)}"
+        return entries
+
+    def check_many(self, queries: Sequence[ReputationQuery]) -> Dict[str, Verdict]:
+        entries = self.entries()
+        verdicts = {}
+        for query in queries:
+            listed = next((entries[parent] for parent in _parents(query.domain) if parent in entries), None)
+            if listed:
+                verdicts[query.domain] = Verdict(self.name, True, listed)
+        return verdicts
+
+
+class URLhausProvider(_FileProvider):
+    # URLhaus CSV dump (id, dateadded, url, url_status, last_online, threat, tags, urlhaus_link, reporter);
+    # a domain is listed when it or one of its subdomains hosts a reported URL
+    name = "urlhaus"
+
+    def _load(self) -> Dict[str, str]:
+        entries = {}
+        with open(self.path, "r", encoding="utf-8", newline="") as file:
+            rows = csv.reader(line for line in file if not line.startswith("#"))
+            for row in rows:
+                if len(row) < 6:
+                    continue
+                host = urlparse(row[2]).hostname
+                if not host:
+                    continue
+                reason = f"{row[5] or 'malicious url'} ({row[3] or 'unknown'}) {row[2]}"
+                for parent in _parents(host):
+                    entries.setdefault(parent, reason)
+        return entries
+
+    def check_many(self, queries: Sequence[ReputationQuery]) -> Dict[str, Verdict]:
+        entries = self.entries()
+        return {query.domain: Verdict(self.name, True, entries[query.domain.lower().rstrip(".")])
+                for query in queries if query.domain.lower().rstrip(".") in entries}
+
+
+class VirusTotalProvider(ReputationProvider):
+    # Reputation cache first; close candidates are queued for the shared-quota worker, or looked up
+    # right away for immediate queries while a token is available. Without a worker (use_queue None:
+    # none running in this process) nothing is queued, so no result is left pending forever
+    name = "virustotal"
+
+    def __init__(self, cache: Optional[ReputationCache] = None, queue: Optional[VTQueue] = None,
+                 max_score: int = VT_MAX_SCORE, timeout: float = PROVIDER_TIMEOUT,
+                 use_queue: Optional[bool] = None):
+        super().__init__(timeout)
+        self.cache = cache
+        self.queue = queue
+        self.max_score = max_score
+        self.use_queue = use_queue
+
+    def check_many(self, queries: Sequence[ReputationQuery]) -> Dict[str, Verdict]:
+        queue = self.queue or get_vt_queue()
+        use_queue = vt_worker_running() if self.use_queue is None else self.use_queue
+        verdicts = {}
+        queued = {}
+        for query in queries:
+            summary = cached_reputation(query.domain, query.priority, query.fingerprint, self.cache, queue)
+            if summary is None and query.priority <= self.max_score:
+                if query.immediate:
+                    summary = fetch_reputation_now(query.domain, query.priority, queue, cache=self.cache,
+                                                   enqueue=use_queue)
+                elif use_queue:
+                    queued[query.domain] = query.priority
+            if summary is not None and "error" not in summary:
+                malicious = (summary.get("last_analysis_stats") or {}).get("malicious") or 0
+                verdicts[query.domain] = Verdict(self.name, malicious > 0,
+                                                 f"{malicious} engines flag it as malicious" if malicious else "",
+                                                 data=summary)
+            elif query.domain in queued:
+                verdicts[query.domain] = Verdict(self.name, False, pending=True)
+        if queued:
+            queue.enqueue(queued)
+        return verdicts
+
+
+class ReputationFanout:
+    """ Asks every provider about a batch of domains at the same time, each in its own daemon thread,
+    and waits at most the provider's timeout for it. A provider that raises or times out is skipped for
+    this batch and counts a failure on its circuit breaker; while the circuit is open the provider is not
+    called at all, so one slow source cannot stall a scan. """
+
+    def __init__(self, providers: Sequence[ReputationProvider]):
+        self.providers = list(providers)
+        self.breakers = {provider.name: CircuitBreaker() for provider in self.providers}
+
+    @staticmethod
+    def _start(provider: ReputationProvider, queries: Sequence[ReputationQuery]) -> Future:
+        future = Future()
+
+        def run():
+            try:
+                future.set_result(provider.check_many(queries))
+            except BaseException as e:
+                future.set_exception(e)
+
+        threading.Thread(target=run, name=f"reputation-{provider.name}", daemon=True).start()
+        return future
+
+    def check_many(self, queries: Sequence[ReputationQuery]) -> Dict[str, Dict[str, Verdict]]:
+        # domain -> provider name -> verdict, for the domains some provider knows something about
+        queries = list(queries)
+        results: Dict[str, Dict[str, Verdict]] = {}
+        if not queries:
+            return results
+
+        started = time.monotonic()
+        running = []
+        for provider in self.providers:
+            breaker = self.breakers[provider.name]
+            if breaker.allow():
+                running.append((provider, breaker, self._start(provider, queries)))
+            else:
+                print(f"[WARNING] Reputation provider {provider.name} is failing, skipped.")
+
+        for provider, breaker, future in running:
+            try:
+                verdicts = future.result(timeout=max(0.0, provider.timeout - (time.monotonic() - started)))
+            except FutureTimeoutError:
+                breaker.record_failure()
+                print(f"[ERROR] Reputation provider {provider.name} timed out after {provider.timeout:.0f}s.")
+                continue
+            except Exception as e:
+                breaker.record_failure()
+                print(f"[ERROR] Reputation provider {provider.name} failed: {e}")
+                continue
+            breaker.record_success()
+            for domain, verdict in verdicts.items():
+                results.setdefault(domain, {})[provider.name] = verdict
+        return results
+
+
+def merge_verdicts(verdicts: Dict[str, Verdict]) -> dict:
+    # One domain's verdicts as stored in domains_info: listed when any provider lists it
+    listed_by = sorted(name for name, verdict in verdicts.items() if verdict.listed)
+    return {
+        "listed": bool(listed_by),
+        "listed_by": listed_by,
+        "reasons": {name: verdicts[name].reason for name in listed_by},
+        "pending": sorted(name for name, verdict in verdicts.items() if verdict.pending),
+    }
+
+
+def default_providers() -> List[ReputationProvider]:
+    providers: List[ReputationProvider] = [VirusTotalProvider()]
+    if os.path.exists(REPUTATION_BLOCKLIST):
+        providers.append(BlocklistProvider(REPUTATION_BLOCKLIST))
+    if os.path.exists(URLHAUS_CSV):
+        providers.append(URLhausProvider(URLHAUS_CSV))
+    return providers
+
+
+_reputation_fanout: Optional[ReputationFanout] = None
+_lock = threading.Lock()
+
+
+def get_reputation_fanout() -> ReputationFanout:
+    # Process-wide fan-out, so circuit breakers remember failures across scans
+    global _reputation_fanout
+    if _reputation_fanout is None:
+        with _lock:
+            if _reputation_fanout is None:
+                _reputation_fanout = ReputationFanout(default_providers())
+    return _reputation_fanout
+
+
+def check_reputation(queries: Sequence[ReputationQuery]) -> Dict[str, Dict[str, Verdict]]:
+    return get_reputation_fanout().check_many(queries)
@@ -1,6 +1,7 @@
 import threading
 from app import app, db
 from scheduler import run_scheduler
+from vt_queue import start_vt_worker
 import time
 
 
@@ -25,6 +26,9 @@ if __name__ == '__main__':
         scheduler_thread = threading.Thread(target=start_scheduler, daemon=True)
         scheduler_thread.start()
 
+        # Queued VirusTotal lookups of every scan, within the shared API quota
+        start_vt_worker(app)
+
         while True:
             time.sleep(1)
 
@@ -0,0 +1,194 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence
+
+DEFAULT_QUEUE_SIZE = 256  # items waiting between two stages; a full queue pauses the stage feeding it
+_POLL = 0.1  # how often blocked workers look at the stop flag
+
+_END = object()
+
+
+class _Stopped(Exception):
+    pass
+
+
+class Stage(NamedTuple):
+    """ One step of a Pipeline. handler gets a list of up to batch_size items (waiting at most batch_wait
+    seconds to fill it) and returns or yields the items for the next stage; concurrency workers call it
+    in parallel. A streaming stage instead gets one iterator over all its input items and runs in a
+    single worker, for steps that keep their own concurrency window (the DNS resolver). """
+    name: str
+    handler: Callable[[Any], Iterable[Any]]
+    concurrency: int = 1
+    batch_size: int = 1
+    batch_wait: float = 0.0
+    streaming: bool = False
+
+
+class StageStats:
+    def __init__(self):
+        self.items_in = 0
+        self.items_out = 0
+        self.seconds = 0.0  # time spent in the handler, summed over workers
+        self.max_backlog = 0  # longest input queue seen
+        self._lock = threading.Lock()
+
+    def add(self, items_in: int = 0, items_out: int = 0, seconds: float = 0.0, backlog: int = 0):
+        with self._lock:
+            self.items_in += items_in
+            self.items_out += items_out
+            self.seconds += seconds
+            self.max_backlog = max(self.max_backlog, backlog)
+
+
+class Pipeline:
+    """ Runs stages concurrently, each in its own worker threads, connected by bounded queues. The source
+    is consumed by a "generate" thread; run() yields what the last stage outputs as soon as it is ready.
+    Because every queue holds at most queue_size items, a slow stage holds back the ones before it and
+    memory stays bounded however large the source is. The first error stops all stages and is raised
+    from run(). """
+
+    def __init__(self, stages: Sequence[Stage], queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.stages = list(stages)
+        self.queue_size = queue_size
+        self.stats: Dict[str, StageStats] = {}
+
+    def run(self, source: Iterable) -> Iterator:
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        stop = threading.Event()
+        errors: List[BaseException] = []
+        self.stats = {"generate": StageStats()}
+        self.stats.update((stage.name, StageStats()) for stage in self.stages)
+        workers_left = [stage.concurrency for stage in self.stages]
+        lock = threading.Lock()
+
+        def put(index: int, item):
+            while True:
+                if stop.is_set():
+                    raise _Stopped()
+                try:
+                    queues[index].put(item, timeout=_POLL)
+                    return
+                except queue.Full:
+                    continue
+
+        def get(index: int, timeout: Optional[float] = None):
+            # Next item of queue index, _END when the input is finished or the pipeline stops;
+            # with timeout, None when nothing arrived in time
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not stop.is_set():
+                wait = _POLL if deadline is None else min(_POLL, deadline - time.monotonic())
+                if wait <= 0:
+                    return None
+                try:
+                    return queues[index].get(timeout=wait)
+                except queue.Empty:
+                    continue
+            return _END
+
+        def close(index: int):
+            # Ends the input of stage index (or the output) once per worker reading it
+            readers = self.stages[index].concurrency if index < len(self.stages) else 1
+            for _ in range(readers):
+                put(index, _END)
+
+        def fail(error: BaseException):
+            with lock:
+                errors.append(error)
+            stop.set()
+
+        def generate():
+            stats = self.stats["generate"]
+            try:
+                for item in source:
+                    put(0, item)
+                    stats.add(items_out=1)
+                close(0)
+            except _Stopped:
+                pass
+            except BaseException as e:
+                fail(e)
+
+        def stream_items(index: int, stats: StageStats):
+            while True:
+                stats.add(backlog=queues[index].qsize())
+                item = get(index)
+                if item is _END:
+                    return
+                stats.add(items_in=1)
+                yield item
+
+        def work(index: int):
+            stage = self.stages[index]
+            stats = self.stats[stage.name]
+            try:
+                if stage.streaming:
+                    started = time.monotonic()
+                    outputs = stage.handler(stream_items(index, stats))
+                    try:
+                        for output in outputs:
+                            put(index + 1, output)
+                            stats.add(items_out=1)
+                    finally:
+                        if hasattr(outputs, "close"):
+                            outputs.close()
+                        stats.add(seconds=time.monotonic() - started)
+                else:
+                    finished = False
+                    while not finished:
+                        stats.add(backlog=queues[index].qsize())
+                        item = get(index)
+                        if item is _END:
+                            break
+                        batch = [item]
+                        deadline = time.monotonic() + stage.batch_wait
+                        while len(batch) < stage.batch_size:
+                            item = get(index, max(deadline - time.monotonic(), 0.001))
+                            if item is None:
+                                break
+                            if item is _END:
+                                finished = True
+                                break
+                            batch.append(item)
+                        started = time.monotonic()
+                        outputs = list(stage.handler(batch))
+                        stats.add(items_in=len(batch), seconds=time.monotonic() - started)
+                        for output in outputs:
+                            put(index + 1, output)
+                        stats.add(items_out=len(outputs))
+                with lock:
+                    workers_left[index] -= 1
+                    last = workers_left[index] == 0
+                if last:
+                    close(index + 1)
+            except _Stopped:
+                pass
+            except BaseException as e:
+                fail(e)
+
+        threads = [threading.Thread(target=generate, name="pipeline-generate", daemon=True)]
+        for index, stage in enumerate(self.stages):
+            threads.extend(threading.Thread(target=work, args=(index,), name=f"pipeline-{stage.name}-{n}",
+                                            daemon=True)
+                           for n in range(stage.concurrency))
+        for thread in threads:
+            thread.start()
+
+        try:
+            while True:
+                item = get(len(self.stages))
+                if item is _END:
+                    break
+                yield item
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+        if errors:
+            raise errors[0]
+
+    def report(self):
+        for name, stats in self.stats.items():
+            print(f"[INFO] Stage {name}: {stats.items_in} in, {stats.items_out} out, {stats.seconds:.1f}s busy, "
+                  f"max backlog {stats.max_backlog}.")
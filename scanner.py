@@ -1,27 +1,66 @@
 import json
-import os
+import time
+from contextlib import nullcontext
 from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
 
 import jellyfish
 from dotenv import load_dotenv
+from flask import current_app, has_app_context
 
 from alerts import alert_conditions
-from dns_check import check_domain_exists, get_domain_ip
+from dns_check import resolve_domains
+from dns_resolver import ResolutionRecord
 from domain_generator import (
     generate_typo_domains,
-    load_tlds,
-    load_subdomains,
-    load_keyboard_proximity,
-    load_prefixes_and_suffixes,
-    load_similar_chars
+    iter_typo_candidates,
+    iter_deep_typo_candidates,
+    DEEP_TECHNIQUES,
+    split_domain,
+    TypoCandidate,
+    PREFIX_SUFFIX,
+    TLD_REPLACEMENT,
+    KEYBOARD,
+    VISUAL,
+    REMOVAL_ADDITION,
+    TRANSPOSITION,
+    SUBDOMAIN,
+    HYPHEN_DOT,
+    SOUNDSQUATTING,
+    BITSQUATTING
 )
+from incremental_scan import DEFAULT_REFRESH_FRACTION, select_candidates_to_probe, record_probe_results
 from models import db, ScanHistory, Domain, ScanDetails
-from reputation import check_domain_reputation
-from whois_lookup import get_whois_info
+from whois_fetcher import WhoisSession, fetch_whois_many, report_server_stats
+from reputation_cache import reputation_fingerprint
+from reputation_providers import ReputationQuery, VirusTotalProvider, check_reputation, merge_verdicts
+from scan_pipeline import Pipeline, Stage
+from vt_queue import VT_PENDING
+from whois_lookup import parse_whois_date
+from wordlists import get_wordlists
 
 load_dotenv()
 
-VT_API_KEY = os.getenv("VIRUSTOTAL_API_KEY")
+# Pipeline tuning: items waiting between stages, and how existing domains are grouped for WHOIS,
+# reputation and database writes
+PIPELINE_QUEUE_SIZE = 256
+ENRICH_BATCH_SIZE = 32
+ENRICH_BATCH_WAIT = 0.5  # seconds a stage waits to fill a batch while resolution trickles in
+WHOIS_STAGE_CONCURRENCY = 2
+
+# How likely a live domain produced by each technique is a deliberate squat (0-1)
+TECHNIQUE_PRIORS = {
+    TRANSPOSITION: 1.0,
+    KEYBOARD: 0.95,
+    VISUAL: 0.95,
+    HYPHEN_DOT: 0.9,
+    SOUNDSQUATTING: 0.85,
+    REMOVAL_ADDITION: 0.8,
+    TLD_REPLACEMENT: 0.75,
+    BITSQUATTING: 0.6,
+    PREFIX_SUFFIX: 0.5,
+    SUBDOMAIN: 0.4,
+}
 
 
 def calculate_damerau_levenshtein_score(original_domain: str, domain: str) -> int:
@@ -44,56 +83,235 @@ def calculate_domain_similarity_in_percent(original_domain: str, domain: str) ->
     return round(similarity_percent, 2)
 
 
+def dns_record_info(record: ResolutionRecord) -> dict:
+    # Plain-dict view of a resolution record for domains_info and ScanDetails
+    return {
+        "rcode": record.rcode,
+        "addresses": list(record.addresses),
+        "addresses6": list(record.addresses6),
+        "cnames": list(record.cnames),
+        "mx": list(record.mx),
+        "ns": list(record.ns),
+        "txt": list(record.txt),
+        "ttl": record.ttl,
+        "latency_ms": round(record.latency * 1000, 1),
+    }
+
+
+def dns_fingerprint(dns_info: dict) -> str:
+    # Hosting of a live domain as seen by this scan, cached reputations of moved domains are refreshed
+    return reputation_fingerprint(dns_info["addresses"] + dns_info["addresses6"], dns_info["ns"])
+
+
+def _keyboard_factor(main_name: str, candidate: TypoCandidate, keyboard_map: Mapping[str, Sequence[str]]) -> float:
+    # 1.0 when a single typed character is a neighbour (or a repeat) of the keys around the edit, else lower
+    replacement = candidate.replacement
+    if candidate.position is None or not replacement or len(replacement) != 1:
+        return 1.0
+    around = main_name[max(candidate.position - 1, 0):candidate.position + 1]
+    if replacement in around or any(replacement in keyboard_map.get(char, ()) for char in around):
+        return 1.0
+    return 0.8
+
+
+def _main_name(domain: str) -> str:
+    parts = split_domain(domain)
+    return parts[0] if parts else domain
+
+
+def calculate_candidate_prior(original_domain: str, candidate: TypoCandidate,
+                              keyboard_map: Mapping[str, Sequence[str]], tld_ranks: Mapping[str, int],
+                              main_name: Optional[str] = None) -> float:
+    """ Returns a cheap 0-1 prior of how risky a candidate is before it is resolved.
+    Combines the technique, keyboard distance of the edit, similarity to the original domain
+    and the popularity (position in tlds_100.txt) of the candidate's TLD.
+    main_name (the original domain without its suffix) is split off when not given """
+    if main_name is None:
+        main_name = _main_name(original_domain)
+    candidate_parts = split_domain(candidate.domain)
+
+    tld = candidate_parts[1].split('.')[-1] if candidate_parts else ""
+    rank = tld_ranks.get(tld)
+    tld_popularity = 0.3 if rank is None else 1.0 - rank / max(len(tld_ranks), 1)
+
+    similarity = calculate_domain_similarity_in_percent(original_domain, candidate.domain) / 100
+    # Combined deep-mode edits ("tld+visual") are as likely as all of their edits together
+    technique_prior = 1.0
+    for technique in candidate.technique.split("+"):
+        technique_prior *= TECHNIQUE_PRIORS.get(technique, 0.5)
+    return (similarity
+            * technique_prior
+            * _keyboard_factor(main_name, candidate, keyboard_map)
+            * (0.5 + 0.5 * tld_popularity))
+
+
+def rank_typo_candidates(original_domain: str, candidates: Iterable[TypoCandidate],
+                         keyboard_map: Mapping[str, Sequence[str]],
+                         tlds: Sequence[str]) -> List[Tuple[float, TypoCandidate]]:
+    # Scores candidates as they are generated and returns them riskiest first
+    tld_ranks: Dict[str, int] = {}
+    for rank, tld in enumerate(tlds):
+        tld_ranks.setdefault(tld, rank)
+
+    main_name = _main_name(original_domain)
+    scored = [(calculate_candidate_prior(original_domain, candidate, keyboard_map, tld_ranks, main_name), candidate)
+              for candidate in candidates]
+    scored.sort(key=lambda item: (-item[0], item[1].domain))
+    return scored
+
+
+def check_domains_reputation(domains_info: List[dict], immediate: bool = False):
+    # Adds vt_data, vt_link, vt_queued and the merged provider verdicts (reputation_verdict) to every entry
+    queries = [ReputationQuery(info["domain"], info["score"], dns_fingerprint(info["dns"]), immediate)
+               for info in domains_info]
+    reputations = check_reputation(queries)
+    for info in domains_info:
+        verdicts = reputations.get(info["domain"], {})
+        vt_verdict = verdicts.get(VirusTotalProvider.name)
+        info["vt_link"] = f"https://www.virustotal.com/gui/domain/{info['domain']}"
+        if vt_verdict is not None and vt_verdict.data is not None:
+            info["vt_data"] = vt_verdict.data
+        info["vt_queued"] = vt_verdict is not None and vt_verdict.pending
+        info["reputation_verdict"] = merge_verdicts(verdicts)
+
+
+def whois_fields(whois_info: dict) -> dict:
+    # WHOIS fields kept in domains_info
+    return {
+        "registrar": whois_info.get("registrar", "---"),
+        "country": whois_info.get("country", "---"),
+        "creation_date": whois_info.get("creation_date", "---"),
+        "expiration_date": whois_info.get("expiration_date", "---"),
+        "updated_date": whois_info.get("updated_date", "---"),
+        "name_servers": whois_info.get("name_servers", "---"),
+        "emails": whois_info.get("emails", "---")
+    }
+
+
+def scan_detail(scan_id: int, info: dict) -> ScanDetails:
+    vt_reputation = info.get("vt_data", {}).get("reputation")
+    reputation = VT_PENDING if info["vt_queued"] else vt_reputation if vt_reputation is not None else "---"
+    dns_info = info["dns"]
+    return ScanDetails(
+        scan_id=scan_id,
+        domain_name=info["domain"],
+        ip_address=info["ip_address"],
+        ip_addresses=",".join(dns_info["addresses"]),
+        ipv6_addresses=",".join(dns_info["addresses6"]),
+        cname_chain=",".join(dns_info["cnames"]),
+        mx_records=",".join(dns_info["mx"]),
+        ns_records=",".join(dns_info["ns"]),
+        txt_records=json.dumps(dns_info["txt"]),
+        dns_rcode=dns_info["rcode"],
+        dns_ttl=dns_info["ttl"],
+        dns_latency_ms=dns_info["latency_ms"],
+        whois_name_servers=info["whois_info"].get("name_servers", "---"),
+        whois_registrar=info["whois_info"].get("registrar", "---"),
+        whois_country=info["whois_info"].get("country", "---"),
+        whois_creation_date=info["whois_info"].get("creation_date", "---"),
+        whois_created_at=parse_whois_date(info["whois_info"].get("creation_date")),
+        whois_expires_at=parse_whois_date(info["whois_info"].get("expiration_date"), pick=max),
+        whois_updated_at=parse_whois_date(info["whois_info"].get("updated_date"), pick=max),
+        whois_emails=info["whois_info"].get("emails", "---"),
+        similarity_score=info["similarity_percent"],
+        reputation=reputation,
+        blocklisted_by=",".join(info["reputation_verdict"]["listed_by"])
+    )
+
+
+def build_scan_pipeline(original_domain: str, on_record: Optional[Callable[[ResolutionRecord], None]] = None,
+                        techniques: Optional[Mapping[str, str]] = None, immediate_reputation: bool = False,
+                        persist: Optional[Callable[[List[dict]], None]] = None,
+                        whois_session: Optional[WhoisSession] = None) -> Pipeline:
+    """ Scan stages from candidate names to finished domains_info entries: resolve (every record is passed
+    to on_record, existing domains go on), score, WHOIS, reputation and, with persist, persist, which gets
+    batches of finished entries to store. WHOIS batches all go through whois_session, so per-server
+    limits hold for the whole scan. Quick and full scans are configurations of this pipeline. """
+
+    def resolve(domains):
+        for record in resolve_domains(domains):
+            if on_record is not None:
+                on_record(record)
+            if record.is_live:
+                yield record
+
+    def score(records):
+        for record in records:
+            domain_data = {
+                "domain": record.name,
+                "ip_address": record.ip_address,
+                "dns": dns_record_info(record),
+                "score": calculate_damerau_levenshtein_score(original_domain, record.name),
+                "similarity_percent": calculate_domain_similarity_in_percent(original_domain, record.name),
+            }
+            if techniques is not None:
+                domain_data["technique"] = techniques.get(record.name, "---")
+            yield domain_data
+
+    # Enrichment failures only cost the batch its WHOIS or reputation data, the scan goes on
+    def whois(batch):
+        # One fetch per batch, concurrently per WHOIS server
+        try:
+            whois_by_domain = fetch_whois_many([info["domain"] for info in batch], session=whois_session)
+        except Exception as e:
+            print(f"[ERROR] WHOIS failed for a batch of {len(batch)} domains: {e}")
+            whois_by_domain = {}
+        for info in batch:
+            info["whois_info"] = whois_fields(whois_by_domain.get(info["domain"]) or {})
+        return batch
+
+    def reputation(batch):
+        try:
+            check_domains_reputation(batch, immediate=immediate_reputation)
+        except Exception as e:
+            print(f"[ERROR] Reputation check failed for a batch of {len(batch)} domains: {e}")
+            for info in batch:
+                info["vt_link"] = f"https://www.virustotal.com/gui/domain/{info['domain']}"
+                info["vt_queued"] = False
+                info["reputation_verdict"] = merge_verdicts({})
+        return batch
+
+    stages = [
+        Stage("resolve", resolve, streaming=True),
+        Stage("score", score, batch_size=ENRICH_BATCH_SIZE),
+        Stage("whois", whois, concurrency=WHOIS_STAGE_CONCURRENCY, batch_size=ENRICH_BATCH_SIZE,
+              batch_wait=ENRICH_BATCH_WAIT),
+        Stage("reputation", reputation, concurrency=2, batch_size=ENRICH_BATCH_SIZE, batch_wait=ENRICH_BATCH_WAIT),
+    ]
+    if persist is not None:
+        stages.append(Stage("persist", lambda batch: persist(batch) or batch, batch_size=ENRICH_BATCH_SIZE,
+                            batch_wait=ENRICH_BATCH_WAIT))
+    return Pipeline(stages, queue_size=PIPELINE_QUEUE_SIZE)
+
+
 def quick_scan_domain(domain_name: str):
     # Performs quick scan, alerts and db write skipped
 
     print(f"[INFO] Starting Quick Scan for domain: {domain_name}")
-    base_dir = os.path.join(os.path.dirname(__file__), "lists")
 
     try:
-        tlds = load_tlds(os.path.join(base_dir, "tlds_100.txt"))
-        subdomains = load_subdomains(os.path.join(base_dir, "subdomains.txt"))
-        keyboard_map = load_keyboard_proximity(os.path.join(base_dir, "keyboard_proximity.txt"))
-        entries = load_prefixes_and_suffixes(os.path.join(base_dir, "prefixes_suffixes.txt"))
-        similar_chars = load_similar_chars(os.path.join(base_dir, "similar_chars.txt"))
-
-        generated_domains = generate_typo_domains(domain_name, tlds, similar_chars, keyboard_map, subdomains, entries)
-        valid_domains = [d for d in generated_domains if check_domain_exists(d)]
-        print(f"[SUCCESS] Found {len(valid_domains)} existing domains.")
-
-        domains_info = []
-        analyzed_count = 0
-
-        for valid_domain in valid_domains:
-            whois_info = get_whois_info(valid_domain) or {}
-            ip_address = get_domain_ip(valid_domain) or "---"
-            score = calculate_damerau_levenshtein_score(domain_name, valid_domain)
-            similarity_percent = calculate_domain_similarity_in_percent(domain_name, valid_domain)
-
-            domain_data = {
-                "domain": valid_domain,
-                "ip_address": ip_address,
-                "score": score,
-                "similarity_percent": similarity_percent,
-                "whois_info": {
-                    "registrar": whois_info.get("registrar", "---"),
-                    "country": whois_info.get("country", "---"),
-                    "creation_date": whois_info.get("creation_date", "---"),
-                    "expiration_date": whois_info.get("expiration_date", "---"),
-                    "name_servers": whois_info.get("name_servers", "---"),
-                    "emails": whois_info.get("emails", "---")
-                }
-            }
-            # VirusTotal – limit 4 API requests per hour on free plan
-            if score <= 1 and analyzed_count < 4:
-                vt_result = check_domain_reputation(valid_domain, VT_API_KEY) or {}
-                domain_data["vt_data"] = vt_result
-                analyzed_count += 1
-            else:
-                domain_data["vt_link"] = f"https://www.virustotal.com/gui/domain/{valid_domain}"
-
-            domains_info.append(domain_data)
-
+        lists = get_wordlists()
+        generated_domains = generate_typo_domains(domain_name, lists.tlds, lists.similar_chars, lists.keyboard_map,
+                                                  lists.subdomains, lists.entries)
+        wildcard_count = 0
+
+        def count_wildcards(record):
+            nonlocal wildcard_count
+            wildcard_count += record.wildcard
+
+        # VirusTotal answers right away while the shared API quota allows
+        with WhoisSession() as whois_session:
+            pipeline = build_scan_pipeline(domain_name, on_record=count_wildcards, immediate_reputation=True,
+                                           whois_session=whois_session)
+            domains_info = list(pipeline.run(generated_domains))
+        pipeline.report()
+        report_server_stats(whois_session.server_stats())
+
+        live_domains = {info["domain"] for info in domains_info}
+        valid_domains = [d for d in generated_domains if d in live_domains]
+        analyzed_count = sum(1 for info in domains_info if "vt_data" in info)
+        print(f"[SUCCESS] Found {len(valid_domains)} existing domains, "
+              f"skipped {wildcard_count} under wildcard zones.")
         print(f"[SUCCESS] Processed {len(domains_info)} domains with {analyzed_count} VirusTotal analyses.")
 
         #Sorting by Similarity Score (%) in descending order
@@ -112,61 +330,100 @@ def quick_scan_domain(domain_name: str):
         raise RuntimeError(f"Quick scan failed: {e}")
 
 
-def full_scan_domain(domain: Domain):
-    # Full scan for logged-in user
+def _discard_scan(scan_id: int):
+    # A failed scan leaves no partial history behind
+    try:
+        db.session.rollback()
+        ScanDetails.query.filter_by(scan_id=scan_id).delete()
+        ScanHistory.query.filter_by(id=scan_id).delete()
+        db.session.commit()
+    except Exception as e:
+        print(f"[ERROR] Could not remove partial scan {scan_id}: {e}")
+
+
+def full_scan_domain(domain: Domain, techniques=None, max_probes: Optional[int] = None,
+                     time_limit: Optional[float] = None, incremental: bool = False,
+                     refresh_fraction: float = DEFAULT_REFRESH_FRACTION, depth: int = 1):
+    # Full scan for logged-in user, techniques optionally limits the generated technique families.
+    # depth > 1 adds deep-mode candidates made of up to depth combined edits of the techniques
+    # (DEEP_TECHNIQUES when not given); pair it with max_probes or time_limit, the candidate space grows fast.
+    # Candidates are probed riskiest first; max_probes and time_limit (seconds) cap the DNS probing stage.
+    # incremental only probes new, previously existing and a refresh_fraction slice of stale candidates.
+    # Existing domains are enriched and saved while resolution is still running
     print(f"[INFO] Starting Full Scan for domain: {domain.name}")
-    base_dir = os.path.join(os.path.dirname(__file__), "lists")
 
+    scan_id = None
     try:
-        tlds = load_tlds(os.path.join(base_dir, "tlds_100.txt"))
-        subdomains = load_subdomains(os.path.join(base_dir, "subdomains.txt"))
-        keyboard_map = load_keyboard_proximity(os.path.join(base_dir, "keyboard_proximity.txt"))
-        entries = load_prefixes_and_suffixes(os.path.join(base_dir, "prefixes_suffixes.txt"))
-        similar_chars = load_similar_chars(os.path.join(base_dir, "similar_chars.txt"))
-
-        generated_domains = generate_typo_domains(
-            domain.name, tlds, similar_chars, keyboard_map, subdomains, entries
-        )
-        valid_domains = [d for d in generated_domains if check_domain_exists(d)]
-        print(f"[SUCCESS] Found {len(valid_domains)} existing domains.")
-
-        domains_info = []
-        analyzed_count = 0
-
-        for valid_domain in valid_domains:
-            whois_info = get_whois_info(valid_domain) or {}
-            ip_address = get_domain_ip(valid_domain) or "---"
-
-            score = calculate_damerau_levenshtein_score(domain.name, valid_domain)
-            similarity_percent = calculate_domain_similarity_in_percent(domain.name, valid_domain)
-
-            domain_data = {
-                "domain": valid_domain,
-                "ip_address": ip_address,
-                "score": score,
-                "similarity_percent": similarity_percent,
-                "whois_info": {
-                    "registrar": whois_info.get("registrar", "---"),
-                    "country": whois_info.get("country", "---"),
-                    "creation_date": whois_info.get("creation_date", "---"),
-                    "expiration_date": whois_info.get("expiration_date", "---"),
-                    "name_servers": whois_info.get("name_servers", "---"),
-                    "emails": whois_info.get("emails", "---")
-                }
-            }
-
-            # VirusTotal – limit 4 API requests per hour on free plan
-            if score <= 1 and analyzed_count < 4:
-                vt_result = check_domain_reputation(valid_domain, VT_API_KEY) or {}
-                domain_data["vt_data"] = vt_result
-                analyzed_count += 1
-            else:
-                domain_data["vt_link"] = f"https://www.virustotal.com/gui/domain/{valid_domain}"
-
-            domains_info.append(domain_data)
-
-        print(f"[SUCCESS] Processed {len(domains_info)} domains "
-              f"with {analyzed_count} VirusTotal analyses.")
+        lists = get_wordlists()
+        deadline = time.monotonic() + time_limit if time_limit is not None else None
+
+        if depth > 1:
+            candidates = iter_deep_typo_candidates(domain.name, lists.tlds, lists.similar_chars, lists.keyboard_map,
+                                                   lists.subdomains, lists.entries, depth,
+                                                   techniques if techniques is not None else DEEP_TECHNIQUES)
+        else:
+            candidates = iter_typo_candidates(domain.name, lists.tlds, lists.similar_chars, lists.keyboard_map,
+                                              lists.subdomains, lists.entries, techniques)
+        if incremental:
+            candidates = select_candidates_to_probe(domain.id, candidates, lists.version, refresh_fraction)
+        ranked_candidates = rank_typo_candidates(domain.name, candidates, lists.keyboard_map, lists.tlds)
+
+        generated_count = 0
+
+        def probe_queue():
+            # Feeds the resolver riskiest first until the probe budget is used up
+            nonlocal generated_count
+            for prior, candidate in ranked_candidates:
+                if max_probes is not None and generated_count >= max_probes:
+                    return
+                if deadline is not None and time.monotonic() >= deadline:
+                    return
+                generated_count += 1
+                yield candidate.domain
+
+        probe_results = {}
+        wildcard_count = 0
+
+        def record_probe(dns_record):
+            nonlocal wildcard_count
+            probe_results[dns_record.name] = None if dns_record.unknown else dns_record.is_live
+            wildcard_count += dns_record.wildcard
+
+        # db write ScanHistory first, ScanDetails rows are added by the persist stage as domains are finished
+        new_scan = ScanHistory(domain_id=domain.id, date=datetime.utcnow())
+        db.session.add(new_scan)
+        db.session.commit()
+        scan_id = new_scan.id
+        app = current_app._get_current_object() if has_app_context() else None
+
+        def persist(batch):
+            with app.app_context() if app is not None else nullcontext():
+                for info in batch:
+                    db.session.add(scan_detail(scan_id, info))
+                db.session.commit()
+
+        techniques_by_domain = {candidate.domain: candidate.technique for _, candidate in ranked_candidates}
+        # VirusTotal lookups not in the reputation cache are queued and the worker fills
+        # ScanDetails.reputation as the shared API quota allows
+        with WhoisSession() as whois_session:
+            pipeline = build_scan_pipeline(domain.name, on_record=record_probe, techniques=techniques_by_domain,
+                                           persist=persist, whois_session=whois_session)
+            domains_info = list(pipeline.run(probe_queue()))
+        pipeline.report()
+        report_server_stats(whois_session.server_stats())
+
+        if incremental:
+            record_probe_results(domain.id, probe_results)
+
+        if generated_count < len(ranked_candidates):
+            print(f"[INFO] Probe budget reached, skipped {len(ranked_candidates) - generated_count} "
+                  f"lower-ranked permutations.")
+        unknown_count = sum(1 for exists in probe_results.values() if exists is None)
+        print(f"[SUCCESS] Checked {generated_count} permutations, found {len(domains_info)} existing domains, "
+              f"skipped {wildcard_count} under wildcard zones, {unknown_count} unknown.")
+        vt_queued = sum(1 for info in domains_info if info["vt_queued"])
+        print(f"[SUCCESS] Processed {len(domains_info)} domains, "
+              f"queued {vt_queued} VirusTotal analyses.")
 
         domains_info = sorted(domains_info,
                               key=lambda x: x.get('similarity_percent', 0.0),
@@ -186,38 +443,15 @@ def full_scan_domain(domain: Domain):
 
         print(f"[ALERT] Alerted domains: {alerted_domains}")
 
-        # db write ScanHistory
-        new_scan = ScanHistory(
-            domain_id=domain.id,
-            date=datetime.utcnow(),
-            permutations_checked=len(generated_domains),
-            existing_domains=len(valid_domains),
-            domains_alerted=json.dumps(alerted_domains)
-        )
-        db.session.add(new_scan)
-        db.session.commit()
-
-        # db write ScanDetails
-        for info in domains_info:
-            vt_data = info.get("vt_data", {})
-            reputation = vt_data.get("reputation", "---")
-            detail = ScanDetails(
-                scan_id=new_scan.id,
-                domain_name=info["domain"],
-                ip_address=info["ip_address"],
-                whois_name_servers=info["whois_info"].get("name_servers", "---"),
-                whois_registrar=info["whois_info"].get("registrar", "---"),
-                whois_country=info["whois_info"].get("country", "---"),
-                whois_creation_date=info["whois_info"].get("creation_date", "---"),
-                whois_emails=info["whois_info"].get("emails", "---"),
-                similarity_score=info["similarity_percent"],
-                reputation=reputation
-            )
-            db.session.add(detail)
-
+        # db update ScanHistory with the totals
+        new_scan.permutations_checked = generated_count
+        new_scan.existing_domains = len(domains_info)
+        new_scan.domains_alerted = json.dumps(alerted_domains)
         db.session.commit()
         print("[SUCCESS] Full scan results saved to database.")
 
     except Exception as e:
         print(f"[ERROR] Full scan failed: {e}")
+        if scan_id is not None:
+            _discard_scan(scan_id)
         raise RuntimeError(f"Full scan failed: {e}")
@@ -8,12 +8,15 @@ from app import app
 from models import Domain, ScanSettings, ScanHistory
 from report_utils import send_alert_email_with_summary
 from scanner import full_scan_domain
+from vt_queue import start_vt_worker
+from wordlists import get_wordlists
 
 
 def perform_full_scan(domain: Domain):
     try:
         print(f"[INFO] Performing full scan for domain: {domain.name}")
-        full_scan_domain(domain)
+        # Scheduled re-scans only resolve new, existing and a rotating slice of stale candidates
+        full_scan_domain(domain, incremental=True)
         print(f"[SUCCESS] Full scan completed for domain: {domain.name}")
     except Exception as e:
         print(f"[ERROR] Error during full scan for domain {domain.name}: {e}")
@@ -25,7 +28,11 @@ def run_scheduled_scans(db):
         settings = ScanSettings.query.all()
         now = datetime.utcnow()
 
+        # Loads (or refreshes after an edit) the word lists shared by every scan in this process
+        wordlists = get_wordlists()
+
         print(f"[DEBUG] Current time: {now}")
+        print(f"[DEBUG] Word lists version: {wordlists.version[:12]}")
         print("[DEBUG] Retrieved scan settings from the database:")
 
         for setting in settings:
@@ -109,4 +116,6 @@ def run_scheduler(db=None):
 
 
 if __name__ == '__main__':
+    # Queued VirusTotal lookups of the scheduled scans, within the shared API quota
+    start_vt_worker(app)
     run_scheduler()
@@ -0,0 +1,132 @@
+import itertools
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+import jellyfish
+
+ALPHABET = 'abcdefghijklmnopqrstuvwxyz'
+
+PHONETIC_KEYS: Dict[str, Callable[[str], str]] = {
+    "metaphone": jellyfish.metaphone,
+    "soundex": jellyfish.soundex,
+    "nysiis": jellyfish.nysiis,
+}
+
+# Letters that most phonetic keys drop or merge (vowels and the semi-silent h/w/y)
+NEUTRAL_LETTERS = frozenset('aeiouhwy')
+
+# Metaphone pruning tables, generated by derive_pruning_tables(jellyfish.metaphone, 4): every single-letter
+# edit of every name of up to four letters that kept the key. '$' stands for the end of the name.
+# Names with other characters than ALPHABET are swept fully.
+
+# Letters that can replace a given letter without changing the key (besides neutral letters and neighbours)
+METAPHONE_EQUIVALENTS = {
+    "a": "bcdgkqt", "b": "cdgkt", "c": "gkqstxz", "d": "cgkt", "e": "bcdgkqt", "f": "cdgkptv", "g": "cdjkpqt",
+    "h": "cdgt", "i": "bcdgkqt", "j": "cdgkt", "k": "cdgpqt", "l": "cdgkt", "m": "bcdgkt", "n": "cdgkpt",
+    "o": "bcdgkqt", "p": "cdfgktv", "q": "cdgkt", "r": "cdgkt", "s": "cdktxz", "t": "cdksx", "u": "bcdgkqt",
+    "v": "cdfgkpt", "w": "bcdgkpt", "x": "ckstz", "y": "bcdgkpt", "z": "cdgkstx"
+}
+
+# Letters that can be inserted right before a given letter without changing the key (kn, gn, pn, ck, dg, mb$)
+METAPHONE_SILENT_BEFORE = {
+    "$": "bk", "a": "k", "b": "k", "c": "kt", "d": "k", "f": "k", "g": "dkn", "h": "g", "j": "k", "k": "c",
+    "l": "k", "m": "k", "n": "gkp", "o": "k", "p": "k", "q": "k", "r": "k", "s": "k", "t": "k", "u": "k",
+    "v": "k", "w": "k", "x": "k", "z": "k"
+}
+
+# mode -> (equivalents, silent before). Soundex keeps only four characters, so roughly half of all single
+# edits keep its key and a letter table cannot prune much; Soundex and NYSIIS are therefore checked against
+# the full alphabet.
+PHONETIC_TABLES: Dict[str, Tuple[Dict[str, str], Dict[str, str]]] = {
+    "metaphone": (METAPHONE_EQUIVALENTS, METAPHONE_SILENT_BEFORE),
+}
+
+
+def derive_pruning_tables(key: Callable[[str], str], max_length: int) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """ Derives (equivalents, silent before) tables for a phonetic key from the key function itself.
+    Every name of up to max_length letters is edited exhaustively and every substitution or insertion that
+    keeps its key, and is not already tried as a neutral letter or a neighbour, is recorded.
+    Slow (a few minutes for max_length=4); used to regenerate the tables above. """
+    equivalents: Dict[str, set] = {}
+    silent_before: Dict[str, set] = {}
+    for length in range(1, max_length + 1):
+        for letters in itertools.product(ALPHABET, repeat=length):
+            name = ''.join(letters)
+            for variant, i, char in iter_phonetic_variants(name, key=key):
+                if char is None or char in NEUTRAL_LETTERS:
+                    continue
+                before = name[i - 1] if i > 0 else '^'
+                if len(variant) == len(name):
+                    after = name[i + 1] if i + 1 < len(name) else '$'
+                    if char not in (name[i], before, after):
+                        equivalents.setdefault(name[i], set()).add(char)
+                else:
+                    after = name[i] if i < len(name) else '$'
+                    if char not in (before, after):
+                        silent_before.setdefault(after, set()).add(char)
+    return ({letter: ''.join(sorted(chars)) for letter, chars in sorted(equivalents.items())},
+            {letter: ''.join(sorted(chars)) for letter, chars in sorted(silent_before.items())})
+
+
+def _context_letters(tables, before: str, after: str) -> Iterable[str]:
+    letters = set(NEUTRAL_LETTERS)
+    letters.update(before, after, tables[1].get(after, ""))
+    return letters
+
+
+def _substitution_letters(name: str, i: int, tables) -> str:
+    # Letters worth trying in place of name[i]
+    if tables is None:
+        return ALPHABET
+    before = name[i - 1] if i > 0 else '^'
+    after = name[i + 1] if i + 1 < len(name) else '$'
+    letters = set(_context_letters(tables, before, after))
+    letters.update(tables[0].get(name[i], ""), name[i])
+    return ''.join(c for c in ALPHABET if c in letters)
+
+
+def _insertion_letters(name: str, i: int, tables) -> str:
+    # Letters worth inserting before name[i]
+    if tables is None:
+        return ALPHABET
+    before = name[i - 1] if i > 0 else '^'
+    after = name[i] if i < len(name) else '$'
+    letters = _context_letters(tables, before, after)
+    return ''.join(c for c in ALPHABET if c in letters)
+
+
+def iter_phonetic_variants(name: str, mode: str = "metaphone",
+                           key: Optional[Callable[[str], str]] = None) -> Iterator[Tuple[str, int, Optional[str]]]:
+    # Yields (variant, position, letter) for single-letter deletions, substitutions and insertions of name
+    # whose phonetic key equals the key of name. Only the letters listed in the mode's pruning tables are
+    # tried, so the key is computed for far fewer throwaway strings than a full alphabet sweep.
+    # A custom key function is always checked against the full alphabet
+    if key is None:
+        if mode not in PHONETIC_KEYS:
+            raise ValueError(f"Unknown phonetic key mode: {mode}")
+        key = PHONETIC_KEYS[mode]
+        tables = PHONETIC_TABLES.get(mode)
+    else:
+        tables = None
+    original_phonetic = key(name)
+    # The tables only cover plain lowercase names; dotted names are compared on their first label only
+    # and digits or hyphens were never part of the derivation, so those names are swept fully
+    if tables is not None and not all(char in ALPHABET for char in name):
+        tables = None
+
+    def matches(variant: str) -> bool:
+        return key(variant.split('.')[0]) == original_phonetic
+
+    for i in range(len(name)):
+        variant = name[:i] + name[i + 1:]
+        if matches(variant):
+            yield variant, i, None
+    for i in range(len(name)):
+        for char in _substitution_letters(name, i, tables):
+            variant = name[:i] + char + name[i + 1:]
+            if matches(variant):
+                yield variant, i, char
+    for i in range(len(name) + 1):
+        for char in _insertion_letters(name, i, tables):
+            variant = name[:i] + char + name[i:]
+            if matches(variant):
+                yield variant, i, char
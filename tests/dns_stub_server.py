@@ -0,0 +1,150 @@
+import socket
+import socketserver
+import struct
+import threading
+from typing import Dict, List, Optional
+
+# Minimal authoritative-style DNS server for tests. zone maps lower-case names to
+# {"A": [...], "AAAA": [...], "CNAME": "target", "MX": [(10, "mx.host")], "NS": [...], "TXT": [...]};
+# "*.zone" entries answer every name under zone.
+# Unknown names get NXDOMAIN with an SOA record in the authority section.
+
+TYPES = {"A": 1, "NS": 2, "CNAME": 5, "SOA": 6, "MX": 15, "TXT": 16, "AAAA": 28}
+
+
+def _name(name: str) -> bytes:
+    encoded = b""
+    for label in name.rstrip(".").split("."):
+        if label:
+            encoded += bytes([len(label)]) + label.encode("ascii")
+    return encoded + b"\x00"
+
+
+def _read_qname(data: bytes, offset: int):
+    labels = []
+    while data[offset]:
+        length = data[offset]
+        labels.append(data[offset + 1:offset + 1 + length].decode("ascii").lower())
+        offset += 1 + length
+    return ".".join(labels), offset + 1
+
+
+def _record(name: str, rtype: str, ttl: int, value) -> bytes:
+    if rtype == "A":
+        rdata = socket.inet_aton(value)
+    elif rtype == "AAAA":
+        rdata = socket.inet_pton(socket.AF_INET6, value)
+    elif rtype in ("CNAME", "NS"):
+        rdata = _name(value)
+    elif rtype == "MX":
+        rdata = struct.pack("!H", value[0]) + _name(value[1])
+    elif rtype == "TXT":
+        raw = value.encode("utf-8")
+        rdata = b"".join(bytes([len(raw[i:i + 255])]) + raw[i:i + 255] for i in range(0, len(raw), 255))
+    elif rtype == "SOA":
+        rdata = _name(value[0]) + _name(value[1]) + struct.pack("!IIIII", *value[2:])
+    else:
+        raise ValueError(rtype)
+    return _name(name) + struct.pack("!HHIH", TYPES[rtype], 1, ttl, len(rdata)) + rdata
+
+
+class _UDPServer(socketserver.ThreadingUDPServer):
+    daemon_threads = True
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class StubDNSServer:
+    # Serves zone on 127.0.0.1 over UDP and TCP on the same port; queries lists every (name, type, transport)
+
+    def __init__(self, zone: Dict[str, dict], ttl: int = 300, negative_ttl: int = 60,
+                 truncate: Optional[List[str]] = None, servfail: Optional[List[str]] = None):
+        self.zone = {name.lower(): records for name, records in zone.items()}
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.truncate = set(truncate or [])
+        self.servfail = set(servfail or [])
+        self.queries = []
+        self._lock = threading.Lock()
+        self._servers = []
+
+    def lookup(self, name: str) -> Optional[dict]:
+        # Exact name first, then "*.parent" wildcards from the closest parent up
+        if name in self.zone:
+            return self.zone[name]
+        labels = name.split(".")
+        for i in range(1, len(labels)):
+            wildcard = "*." + ".".join(labels[i:])
+            if wildcard in self.zone:
+                return self.zone[wildcard]
+        return None
+
+    def respond(self, data: bytes, transport: str) -> bytes:
+        query_id = struct.unpack_from("!H", data)[0]
+        qname, offset = _read_qname(data, 12)
+        qtype_code = struct.unpack_from("!H", data, offset)[0]
+        qtype = next((name for name, code in TYPES.items() if code == qtype_code), str(qtype_code))
+        question = data[12:offset + 4]
+        with self._lock:
+            self.queries.append((qname, qtype, transport))
+
+        flags = 0x8180  # response, recursion desired and available
+        answers, authority = [], []
+        if qname in self.servfail:
+            flags |= 2
+        elif transport == "udp" and qname in self.truncate:
+            flags |= 0x0200
+        else:
+            records = self.lookup(qname)
+            if records is None:
+                flags |= 3
+                zone_name = qname.split(".", 1)[-1]
+                authority.append(_record(zone_name, "SOA", self.negative_ttl,
+                                         ("ns1." + zone_name, "hostmaster." + zone_name, 1, 7200, 900,
+                                          1209600, self.negative_ttl)))
+            else:
+                owner = qname
+                if "CNAME" in records and qtype != "CNAME":
+                    answers.append(_record(owner, "CNAME", self.ttl, records["CNAME"]))
+                    owner = records["CNAME"]
+                    records = self.lookup(owner) or {}
+                for value in records.get(qtype, []) if qtype != "CNAME" else [records.get("CNAME")]:
+                    if value is not None:
+                        answers.append(_record(owner, qtype, self.ttl, value))
+
+        header = struct.pack("!HHHHHH", query_id, flags, 1, len(answers), len(authority), 0)
+        return header + question + b"".join(answers) + b"".join(authority)
+
+    def start(self) -> int:
+        stub = self
+
+        class UDPHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                data, sock = self.request
+                sock.sendto(stub.respond(data, "udp"), self.client_address)
+
+        class TCPHandler(socketserver.BaseRequestHandler):
+            def handle(self):
+                length = struct.unpack("!H", self.request.recv(2))[0]
+                data = b""
+                while len(data) < length:
+                    data += self.request.recv(length - len(data))
+                response = stub.respond(data, "tcp")
+                self.request.sendall(struct.pack("!H", len(response)) + response)
+
+        udp = _UDPServer(("127.0.0.1", 0), UDPHandler)
+        port = udp.server_address[1]
+        tcp = _TCPServer(("127.0.0.1", port), TCPHandler)
+        self._servers = [udp, tcp]
+        for server in self._servers:
+            threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        self.port = port
+        return port
+
+    def stop(self):
+        for server in self._servers:
+            server.shutdown()
+            server.server_close()
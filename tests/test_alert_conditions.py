@@ -0,0 +1,40 @@
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+
+from alerts import alert_conditions
+from dns_resolver import ResolutionRecord
+from scanner import dns_record_info
+
+
+def _entry(record: ResolutionRecord) -> dict:
+    # A distant, old and clean candidate: only its DNS profile can raise an alert
+    return {
+        "domain": record.name,
+        "whois_info": {"creation_date": "2020-01-01"},
+        "vt_data": {"reputation": 0},
+        "score": 5,
+        "dns": dns_record_info(record),
+    }
+
+
+class TestMailOnlyAlert(unittest.TestCase):
+
+    @patch("alerts.Whitelist")
+    def test_mail_only_domain_is_alerted(self, mock_whitelist):
+        mock_whitelist.query.all.return_value = []
+        mail_only = ResolutionRecord("mail-exampel.com", 0, mx=("10 mx.hoster.example",), ttl=300)
+        no_records = ResolutionRecord("parked-exampel.com", 0, ttl=300)
+        web = ResolutionRecord("web-exampel.com", 0, ("192.0.2.1",), mx=("10 mx.hoster.example",), ttl=300)
+
+        # NODATA answers count as existing domains, with or without MX records
+        self.assertTrue(mail_only.is_live)
+        self.assertTrue(no_records.is_live)
+
+        alerted = alert_conditions([_entry(mail_only), _entry(no_records), _entry(web)], datetime(2025, 1, 1))
+
+        self.assertEqual(alerted, ["mail-exampel.com"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import public_suffix
+from batch_generator import iter_batch_candidates, load_brand_domains, WorkerStats
+from domain_generator import iter_typo_candidates
+from wordlists import get_wordlists
+
+
+class TestBatchGenerator(unittest.TestCase):
+
+    def test_iter_batch_candidates_matches_serial_generation(self):
+        brands = ["example.com", "cisco.com", "ox.ac.uk"]
+        lists = get_wordlists()
+        expected = {
+            (brand, candidate.domain, candidate.technique)
+            for brand in brands
+            for candidate in iter_typo_candidates(brand, lists.tlds, lists.similar_chars, lists.keyboard_map,
+                                                  lists.subdomains, lists.entries)
+        }
+
+        stats = {}
+        records = list(iter_batch_candidates(brands, processes=2, chunk_size=1, stats=stats))
+
+        self.assertEqual(len(records), len(expected))
+        self.assertEqual({tuple(record) for record in records}, expected)
+        self.assertTrue(all(isinstance(worker, WorkerStats) for worker in stats.values()))
+        self.assertEqual(sum(worker.brands for worker in stats.values()), 3)
+        self.assertEqual(sum(worker.candidates for worker in stats.values()), len(records))
+
+    def test_public_suffix_list_is_loaded_before_the_pool(self):
+        with patch.dict("public_suffix._public_suffix_lists", clear=True), \
+                patch("batch_generator._pool_context") as mock_context:
+            mock_context.return_value.Pool.return_value.__enter__.return_value.imap_unordered.return_value = []
+            list(iter_batch_candidates(["example.com"], processes=1))
+
+            # Forked workers inherit the parsed list instead of each parsing it
+            self.assertIn(False, public_suffix._public_suffix_lists)
+
+    def test_load_brand_domains(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            csv_path = os.path.join(tmp_dir, "brands.csv")
+            with open(csv_path, "w", encoding="utf-8") as file:
+                file.write("ox.ac.uk,cam.ac.uk\ncisco.com\n")
+
+            self.assertEqual(load_brand_domains(csv_path), ["ox.ac.uk", "cam.ac.uk", "cisco.com"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from benchmarks.run_benchmarks import compare_to_baseline, run_suite
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def test_compare_to_baseline(self):
+        baseline = {"corpus": "abc", "benchmarks": {"fast": {"relative_time": 1.0},
+                                                    "slow": {"relative_time": 1.0}}}
+        report = {"corpus": "abc", "benchmarks": {"fast": {"relative_time": 1.1},
+                                                  "slow": {"relative_time": 1.5},
+                                                  "new": {"relative_time": 9.0}}}
+
+        regressions = compare_to_baseline(report, baseline, threshold=0.25)
+
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("slow", regressions[0])
+
+    def test_run_suite(self):
+        report = run_suite(["example.com"], repeat=1, only=["generate_transposed_domains", "is_valid_domain"])
+
+        self.assertEqual(set(report["benchmarks"]), {"generate_transposed_domains", "is_valid_domain"})
+        self.assertEqual(report["benchmarks"]["generate_transposed_domains"]["items"], 6)
+        self.assertGreater(report["benchmarks"]["is_valid_domain"]["items_per_second"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from bloom_filter import BloomFilter
+
+
+class TestBloomFilter(unittest.TestCase):
+
+    def test_add_and_contains(self):
+        bloom = BloomFilter(1000, 0.01)
+
+        self.assertTrue(bloom.add("example.com"))
+        self.assertFalse(bloom.add("example.com"))
+        self.assertIn("example.com", bloom)
+        self.assertNotIn("exampel.com", bloom)
+        self.assertEqual(len(bloom), 1)
+
+    def test_false_positive_rate(self):
+        bloom = BloomFilter(10000, 0.01)
+        for i in range(10000):
+            bloom.add(f"domain{i}.com")
+
+        self.assertTrue(all(f"domain{i}.com" in bloom for i in range(10000)))
+        false_positives = sum(f"other{i}.net" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+    def test_invalid_arguments(self):
+        with self.assertRaises(ValueError):
+            BloomFilter(0)
+        with self.assertRaises(ValueError):
+            BloomFilter(100, 1.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
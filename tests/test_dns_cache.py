@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+from dns_cache import DNSCache, DEFAULT_NEGATIVE_TTL
+from dns_resolver import ResolutionRecord, iter_resolve
+from tests.dns_stub_server import StubDNSServer
+
+
+class TestDNSCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "dns_cache.db")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_positive_answer_expires_with_ttl(self):
+        cache = DNSCache(self.path)
+        cache.put(ResolutionRecord("example.com", 0, ("93.184.216.34",), ttl=300, latency=0.02), now=1000)
+
+        record = cache.get("example.com", now=1100)
+        self.assertEqual(record.addresses, ("93.184.216.34",))
+        self.assertEqual(record.ttl, 200)
+        self.assertEqual(record.latency, 0.0)
+        self.assertIsNone(cache.get("example.com", now=1300))
+        self.assertEqual(cache.stats()["hits"], 1)
+        self.assertEqual(cache.stats()["misses"], 1)
+
+    def test_negative_caching(self):
+        cache = DNSCache(None)
+        cache.put(ResolutionRecord("missing.com", 3, ttl=60), now=1000)
+        cache.put(ResolutionRecord("no-soa.com", 3), now=1000)
+        cache.put(ResolutionRecord("failed.com", None, error="timeout"), now=1000)
+
+        self.assertEqual(cache.get("missing.com", now=1059).rcode, 3)
+        self.assertIsNone(cache.get("missing.com", now=1061))
+        self.assertIsNotNone(cache.get("no-soa.com", now=1000 + DEFAULT_NEGATIVE_TTL - 1))
+        self.assertIsNone(cache.get("failed.com", now=1000))
+
+    def test_lru_eviction(self):
+        cache = DNSCache(None, max_entries=2)
+        for name in ("a.com", "b.com"):
+            cache.put(ResolutionRecord(name, 3, ttl=60), now=1000)
+        cache.get("a.com", now=1000)
+        cache.put(ResolutionRecord("c.com", 3, ttl=60), now=1000)
+
+        self.assertIsNotNone(cache.get("a.com", now=1000))
+        self.assertIsNone(cache.get("b.com", now=1000))
+
+    def test_persisted_between_instances(self):
+        cache = DNSCache(self.path)
+        cache.put(ResolutionRecord("example.com", 0, ("93.184.216.34",), cnames=("x.com",), ttl=3600))
+        cache.close()
+
+        record = DNSCache(self.path).get("example.com")
+        self.assertEqual(record.cnames, ("x.com",))
+        self.assertTrue(record.exists)
+
+    def test_resolver_uses_cache(self):
+        server = StubDNSServer({"example.com": {"A": ["93.184.216.34"]}})
+        port = server.start()
+        cache = DNSCache(self.path)
+        try:
+            names = ["example.com", "missing.com"]
+            first = {r.name: r.exists for r in iter_resolve(names, nameservers=["127.0.0.1"], port=port, cache=cache)}
+            second = {r.name: r.exists for r in iter_resolve(names, nameservers=["127.0.0.1"], port=port, cache=cache)}
+        finally:
+            server.stop()
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(server.queries), 2)
+        self.assertEqual(cache.stats()["hits"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
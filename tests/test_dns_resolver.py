@@ -0,0 +1,223 @@
+import asyncio
+import socket
+import time
+import unittest
+
+from dns_resolver import PROFILE_QTYPES, AsyncResolver, UpstreamRate, build_query, iter_resolve, parse_nameserver, parse_response
+from tests.dns_stub_server import StubDNSServer
+
+ZONE = {
+    "example.com": {"A": ["93.184.216.34"], "AAAA": ["2606:2800:220:1::1"],
+                    "MX": [(20, "mx2.example.com"), (10, "mx1.example.com")],
+                    "NS": ["b.iana-servers.net", "a.iana-servers.net"], "TXT": ["v=spf1 -all"]},
+    "www.example.com": {"CNAME": "example.com"},
+    "mail-only.com": {"MX": [(10, "mx.example.com")]},
+    "big.example.com": {"A": ["10.0.0.1"]},
+    "*.wild.com": {"A": ["10.9.9.9"]},
+    "own.wild.com": {"A": ["10.1.1.1"]},
+    "*.ws": {"A": ["10.8.8.8"]},
+    "exampel.ws": {"A": ["10.2.2.2"]},
+}
+
+
+def _unused_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class TestDNSResolver(unittest.TestCase):
+
+    def setUp(self):
+        self.server = StubDNSServer(ZONE, truncate=["big.example.com"])
+        self.port = self.server.start()
+
+    def tearDown(self):
+        self.server.stop()
+
+    def resolver(self, **options):
+        options.setdefault("timeout", 0.5)
+        return AsyncResolver(nameservers=["127.0.0.1"], port=self.port, **options)
+
+    def test_query_and_parse(self):
+        message = parse_response(self.server.respond(build_query("www.example.com", "A", 1234), "udp"))
+
+        self.assertEqual(message.id, 1234)
+        self.assertEqual(message.question, ("www.example.com", 1))
+        self.assertEqual([(r.type, r.data) for r in message.answers],
+                         [("CNAME", "example.com"), ("A", "93.184.216.34")])
+
+    def test_resolve_many(self):
+        names = ["example.com", "www.example.com", "missing.com", "mail-only.com"]
+
+        async def collect(resolver):
+            try:
+                return {record.name: record async for record in resolver.resolve_many(names)}
+            finally:
+                resolver.close()
+
+        results = asyncio.run(collect(self.resolver(concurrency=2)))
+
+        self.assertEqual({name: record.exists for name, record in results.items()},
+                         {"example.com": True, "www.example.com": True, "missing.com": False,
+                          "mail-only.com": False})
+        self.assertEqual(results["www.example.com"].cnames, ("example.com",))
+        self.assertEqual(results["www.example.com"].addresses, ("93.184.216.34",))
+        self.assertEqual(results["www.example.com"].ttl, 300)
+        self.assertEqual(results["missing.com"].rcode, 3)
+        self.assertEqual(results["missing.com"].ttl, 60)
+        self.assertEqual(results["mail-only.com"].rcode, 0)
+        self.assertGreater(results["example.com"].latency, 0)
+
+    def test_profile_registered_names(self):
+        names = ["example.com", "mail-only.com", "missing.com"]
+        records = {r.name: r for r in iter_resolve(names, nameservers=["127.0.0.1"], port=self.port,
+                                                     profile_qtypes=PROFILE_QTYPES)}
+
+        example = records["example.com"]
+        self.assertEqual(example.addresses, ("93.184.216.34",))
+        self.assertEqual(example.addresses6, ("2606:2800:220:1::1",))
+        self.assertEqual(example.mx, ("10 mx1.example.com", "20 mx2.example.com"))
+        self.assertEqual(example.ns, ("a.iana-servers.net", "b.iana-servers.net"))
+        self.assertEqual(example.txt, ("v=spf1 -all",))
+        # Mail-only domains have no address but are registered
+        self.assertFalse(records["mail-only.com"].exists)
+        self.assertTrue(records["mail-only.com"].is_live)
+        self.assertEqual(records["mail-only.com"].mx, ("10 mx.example.com",))
+        self.assertFalse(records["missing.com"].is_live)
+        # NXDOMAIN names cost one A query, registered names one query per record type
+        queried = [(name, qtype) for name, qtype, _ in self.server.queries]
+        self.assertEqual([qtype for name, qtype in queried if name == "missing.com"], ["A"])
+        self.assertEqual(sorted(qtype for name, qtype in queried if name == "example.com"),
+                         ["A", "AAAA", "MX", "NS", "TXT"])
+
+    def test_truncated_answer_falls_back_to_tcp(self):
+        records = list(iter_resolve(["big.example.com"], nameservers=["127.0.0.1"], port=self.port))
+        self.assertTrue(records[0].exists)
+        self.assertIn(("big.example.com", "A", "tcp"), self.server.queries)
+
+    def test_retry_on_next_upstream(self):
+        failing = StubDNSServer(ZONE, servfail=["example.com"])
+        failing.start()
+        try:
+            records = list(iter_resolve(["example.com"], retries=1,
+                                        nameservers=[f"127.0.0.1:{failing.port}", f"127.0.0.1:{self.port}"]))
+
+            self.assertTrue(records[0].exists)
+            self.assertEqual(failing.queries, [("example.com", "A", "udp")])
+        finally:
+            failing.stop()
+
+    def test_wildcard_zone_skip(self):
+        names = ["example.wild.com", "login.wild.com", "example.com"]
+        records = {r.name: r for r in iter_resolve(names, nameservers=["127.0.0.1"], port=self.port,
+                                                     detect_wildcards=True)}
+
+        self.assertTrue(records["example.wild.com"].wildcard)
+        self.assertFalse(records["example.wild.com"].is_live)
+        self.assertEqual(records["login.wild.com"].addresses, ("10.9.9.9",))
+        self.assertTrue(records["example.com"].is_live)
+        # One random-label probe per parent zone, no lookups for names under the wildcard zone
+        queried = [name for name, _, _ in self.server.queries]
+        self.assertEqual(len([name for name in queried if name.endswith(".wild.com")]), 1)
+        self.assertNotIn("example.wild.com", queried)
+        self.assertEqual(len([name for name in queried if name.count(".") == 1 and name.endswith(".com")]), 2)
+
+    def test_wildcard_zone_mark(self):
+        names = ["example.wild.com", "own.wild.com"]
+        records = {r.name: r for r in iter_resolve(names, nameservers=["127.0.0.1"], port=self.port,
+                                                     detect_wildcards=True, wildcard_mode="mark")}
+
+        self.assertTrue(records["example.wild.com"].wildcard)
+        self.assertTrue(records["own.wild.com"].is_live)
+
+    def test_wildcard_suffix_does_not_hide_names(self):
+        names = ["exampel.ws", "examp1e.ws"]
+        records = {r.name: r for r in iter_resolve(names, nameservers=["127.0.0.1"], port=self.port,
+                                                     detect_wildcards=True)}
+
+        # A TLD answering random labels is detected, but names registered under it are still looked up
+        self.assertTrue(records["exampel.ws"].is_live)
+        self.assertFalse(records["exampel.ws"].wildcard)
+        self.assertTrue(records["examp1e.ws"].wildcard)
+        self.assertIn("exampel.ws", [name for name, _, _ in self.server.queries])
+
+    def test_servfail_slows_upstream_down(self):
+        failing = StubDNSServer(ZONE, servfail=["example.com"])
+        failing.start()
+        nameservers = [f"127.0.0.1:{failing.port}", f"127.0.0.1:{self.port}"]
+
+        async def run(resolver):
+            try:
+                return [await resolver.resolve("example.com") for _ in range(2)], resolver.upstream_stats()
+            finally:
+                resolver.close()
+
+        try:
+            records, stats = asyncio.run(run(AsyncResolver(nameservers=nameservers, timeout=0.5, rate=100)))
+        finally:
+            failing.stop()
+
+        self.assertTrue(all(record.exists for record in records))
+        self.assertEqual(stats[nameservers[0]]["failures"], 1)
+        self.assertEqual(stats[nameservers[0]]["rate"], 50)
+        self.assertEqual(stats[nameservers[1]]["successes"], 2)
+
+    def test_upstream_rate_aimd(self):
+        rate = UpstreamRate(100, min_rate=10, max_rate=120, increase=5, decrease=0.5, cooldown=1.0)
+
+        rate.on_failure(now=10.0)
+        rate.on_failure(now=10.5)  # same burst of losses, backs off once
+        self.assertEqual(rate.rate, 50)
+        rate.on_failure(now=11.5)
+        self.assertEqual(rate.rate, 25)
+        for _ in range(30):
+            rate.on_success()
+        self.assertEqual(rate.rate, 120)
+        for second in range(20):
+            rate.on_failure(now=20.0 + second)
+        self.assertEqual(rate.rate, 10)
+
+    def test_upstream_rate_token_bucket(self):
+        rate = UpstreamRate(20)
+        now = rate._updated
+        self.assertEqual(rate.try_acquire(now), 0)
+        self.assertEqual(rate.try_acquire(now), 0)  # burst of rate / 10 tokens
+        self.assertAlmostEqual(rate.try_acquire(now), 0.05)
+        self.assertEqual(rate.try_acquire(now + 0.05), 0)
+
+    def test_parse_nameserver(self):
+        self.assertEqual(parse_nameserver("1.1.1.1"), ("1.1.1.1", 53))
+        self.assertEqual(parse_nameserver("127.0.0.1:5353"), ("127.0.0.1", 5353))
+        self.assertEqual(parse_nameserver("[::1]:5353"), ("::1", 5353))
+        self.assertEqual(parse_nameserver("2001:db8::1"), ("2001:db8::1", 53))
+
+    def test_timeout_is_not_existing(self):
+        records = list(iter_resolve(["example.com"], nameservers=["127.0.0.1"], port=_unused_port(),
+                                    timeout=0.2, retries=1))
+        self.assertFalse(records[0].exists)
+        self.assertTrue(records[0].unknown)
+        self.assertIsNone(records[0].rcode)
+        self.assertIsNotNone(records[0].error)
+
+    def test_iter_resolve_streams_generator(self):
+        names = (name for name in ["example.com", "nope.example.com"])
+        results = [(record.name, record.exists) for record in iter_resolve(names, nameservers=["127.0.0.1"],
+                                                                            port=self.port)]
+
+        self.assertEqual(sorted(results), [("example.com", True), ("nope.example.com", False)])
+
+    def test_iter_resolve_waits_for_slow_consumer(self):
+        pulled = []
+        names = (pulled.append(i) or f"n{i}.example.com" for i in range(50))
+        records = iter_resolve(names, buffer_size=2, nameservers=["127.0.0.1"], port=self.port, concurrency=1)
+
+        next(records)
+        time.sleep(0.3)
+        # One answer taken, two buffered and one in flight: the rest of the names are not queried yet
+        self.assertLessEqual(len(pulled), 5)
+        self.assertEqual(len(list(records)), 49)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,23 +1,38 @@
 import unittest
 from unittest.mock import patch
 import socket
-from dns_check import check_domain_exists, get_domain_ip
+from dns_cache import DNSCache
+from dns_check import check_domain_exists, check_domains_exist, get_domain_ip
+from tests.dns_stub_server import StubDNSServer
 
 
 class TestDNSCheck(unittest.TestCase):
 
-    @patch('socket.gethostbyname')
-    def test_check_domain_exists_valid(self, mock_gethostbyname):
-        mock_gethostbyname.return_value = '93.184.216.34'
-        result = check_domain_exists('example.com')
-        self.assertTrue(result)
-        mock_gethostbyname.assert_called_once_with('example.com')
+    def test_check_domain_exists_uses_cache(self):
+        cache = DNSCache(None)
+        server = StubDNSServer({"example.com": {"A": ["93.184.216.34"]}})
+        port = server.start()
+        try:
+            self.assertTrue(check_domain_exists("example.com", cache=cache, nameservers=["127.0.0.1"], port=port))
+            self.assertFalse(check_domain_exists("invalid-domain-12345.com", cache=cache,
+                                                 nameservers=["127.0.0.1"], port=port))
+        finally:
+            server.stop()
+        try:
+            # Answered from the cache, the server is gone
+            self.assertTrue(check_domain_exists("example.com", cache=cache, nameservers=["127.0.0.1"], port=port,
+                                                retries=1))
+        finally:
+            cache.close()
 
-    @patch('socket.gethostbyname', side_effect=socket.gaierror)
-    def test_check_domain_exists_invalid(self, mock_gethostbyname):
-        result = check_domain_exists('invalid-domain-12345.tld')
-        self.assertFalse(result)
-        mock_gethostbyname.assert_called_once_with('invalid-domain-12345.tld')
+    def test_check_domain_exists_unknown(self):
+        server = StubDNSServer({}, servfail=["example.com"])
+        port = server.start()
+        try:
+            self.assertIsNone(check_domain_exists("example.com", use_cache=False, retries=1,
+                                                  nameservers=["127.0.0.1"], port=port))
+        finally:
+            server.stop()
 
     @patch('socket.gethostbyname')
     def test_get_domain_ip_valid(self, mock_gethostbyname):
@@ -38,6 +53,26 @@ class TestDNSCheck(unittest.TestCase):
         self.assertEqual(ip, 'N/A')
         mock_gethostbyname.assert_called_once_with('example.com')
 
+    def test_check_domains_exist(self):
+        server = StubDNSServer({"example.com": {"A": ["93.184.216.34"]}})
+        port = server.start()
+        try:
+            results = dict(check_domains_exist(["example.com", "invalid-domain-12345.com"], use_cache=False,
+                                               nameservers=["127.0.0.1"], port=port))
+        finally:
+            server.stop()
+        self.assertEqual(results, {"example.com": True, "invalid-domain-12345.com": False})
+
+    def test_check_domains_exist_unknown(self):
+        server = StubDNSServer({}, servfail=["example.com"])
+        port = server.start()
+        try:
+            results = dict(check_domains_exist(["example.com"], use_cache=False, retries=1,
+                                               nameservers=["127.0.0.1"], port=port))
+        finally:
+            server.stop()
+        self.assertEqual(results, {"example.com": None})
+
 
 if __name__ == '__main__':
     unittest.main()
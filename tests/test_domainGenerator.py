@@ -1,11 +1,13 @@
 import unittest
 from domain_generator import (
-    is_valid_domain, load_keyboard_proximity, load_tlds, generate_prefix_suffix_domains,
+    is_valid_domain, is_registrable_domain, filter_valid_domains, split_domain, load_keyboard_proximity, load_tlds, generate_prefix_suffix_domains,
     generate_tld_replacements, generate_keyboard_proximity_domains,
     generate_visual_substitutions,
     generate_typo_domains, generate_removal_and_addition,
     generate_transposed_domains, generate_subdomain_domains,
-    generate_hyphen_dot_manipulations, generate_bitsquatting_domains
+    generate_hyphen_dot_manipulations, generate_bitsquatting_domains,
+    iter_typo_domains, iter_typo_candidates, iter_deep_typo_candidates, TypoCandidate, KEYBOARD, TLD_REPLACEMENT,
+    VISUAL, SOUNDSQUATTING, TRANSPOSITION
 )
 
 class TestDomainGenerator(unittest.TestCase):
@@ -15,6 +17,23 @@ class TestDomainGenerator(unittest.TestCase):
         self.assertFalse(is_valid_domain("example..com"))
         self.assertFalse(is_valid_domain("-example.com"))
 
+    def test_is_registrable_domain(self):
+        self.assertTrue(is_registrable_domain("ox.ac.uk"))
+        self.assertFalse(is_registrable_domain("ac.uk"))
+        self.assertFalse(is_registrable_domain("example.flight"))
+
+    def test_filter_valid_domains(self):
+        domains = ["example.com", "-example.com", "example.flight", "ox.exchange.ac.uk"]
+        self.assertEqual(filter_valid_domains(domains), ["example.com", "ox.exchange.ac.uk"])
+        self.assertEqual(filter_valid_domains(domains, registrable_only=False),
+                         ["example.com", "example.flight", "ox.exchange.ac.uk"])
+
+    def test_split_domain(self):
+        self.assertEqual(split_domain("ox.ac.uk"), ("ox", "ac.uk"))
+        self.assertEqual(split_domain("example.com"), ("example", "com"))
+        self.assertEqual(split_domain("example.localdomain"), ("example", "localdomain"))
+        self.assertIsNone(split_domain("example"))
+
     def test_load_keyboard_proximity(self):
         keyboard_map = load_keyboard_proximity("lists/keyboard_proximity.txt")
         self.assertIsInstance(keyboard_map, dict)
@@ -96,5 +115,90 @@ class TestDomainGenerator(unittest.TestCase):
         self.assertTrue(any("test-example.com" in d for d in domains))
         self.assertTrue(any("example.net" in d for d in domains))
 
+    def test_generate_typo_domains_multi_label_suffix(self):
+        domains = generate_typo_domains("ox.ac.uk", ["com", "flight"], {}, {}, ["www"], ["test"])
+        self.assertIn("ox.com", domains)
+        self.assertIn("ox-test.ac.uk", domains)
+        self.assertIn("ox.www.ac.uk", domains)
+        self.assertNotIn("ox.ac.exchange.uk", domains)
+        self.assertNotIn("ox.flight", domains)
+
+    def test_iter_typo_domains(self):
+        tlds = ["net", "org"]
+        similar_char_map = {"o": ["0"]}
+        keyboard_map = {"a": ["q", "z"]}
+        subdomains = ["www", "mail"]
+        prefixes_suffixes = ["test", "sample"]
+
+        candidates = iter_typo_domains("example.com", tlds, similar_char_map, keyboard_map, subdomains,
+                                       prefixes_suffixes)
+        self.assertEqual(next(candidates), "test-example.com")
+
+        streamed = ["test-example.com"] + list(candidates)
+        self.assertEqual(len(streamed), len(set(streamed)))
+        self.assertEqual(set(streamed), set(generate_typo_domains("example.com", tlds, similar_char_map,
+                                                                  keyboard_map, subdomains, prefixes_suffixes)))
+        self.assertEqual(list(iter_typo_domains("example", tlds, similar_char_map, keyboard_map, subdomains,
+                                                prefixes_suffixes)), [])
+
+    def test_iter_typo_candidates_provenance(self):
+        keyboard_map = {"a": ["q", "z"]}
+        candidates = list(iter_typo_candidates("example.com", ["net"], {}, keyboard_map, [], [],
+                                               techniques=[KEYBOARD, TLD_REPLACEMENT]))
+
+        self.assertEqual({c.technique for c in candidates}, {KEYBOARD, TLD_REPLACEMENT})
+        self.assertIn(TypoCandidate("exqmple.com", KEYBOARD, 2, "q"), candidates)
+        self.assertIn(TypoCandidate("example.net", TLD_REPLACEMENT, None, "net"), candidates)
+
+    def test_iter_deep_typo_candidates(self):
+        similar_char_map = {"o": ["0"]}
+        keyboard_map = {"a": ["q", "z"]}
+        techniques = [TLD_REPLACEMENT, KEYBOARD, VISUAL]
+
+        single = [c for c in iter_typo_candidates("foobar.com", ["net"], similar_char_map, keyboard_map, [], [])
+                  if c.domain != "foobar.com"]
+        deep = list(iter_deep_typo_candidates("foobar.com", ["net"], similar_char_map, keyboard_map, [], [],
+                                              depth=2, techniques=techniques))
+        domains = [c.domain for c in deep]
+
+        # Level 1 keeps every technique, only the composed levels are limited to techniques
+        self.assertEqual(deep[:len(single)], single)
+        self.assertIn(SOUNDSQUATTING, {c.technique for c in single})
+        self.assertTrue(all(c.technique.rsplit("+", 1)[-1] in techniques for c in deep[len(single):]))
+        self.assertEqual(len(domains), len(set(domains)))
+        self.assertNotIn("foobar.com", domains)
+        self.assertIn(TypoCandidate("f0obar.net", "tld+visual", 1, "0"), deep)
+        self.assertIn("f00bar.com", domains)
+        self.assertIn("foobzqar.com", domains)
+        self.assertNotIn("f00bar.net", domains)
+
+        deeper = {c.domain for c in iter_deep_typo_candidates("foobar.com", ["net"], similar_char_map,
+                                                              keyboard_map, [], [], depth=3,
+                                                              techniques=techniques)}
+        self.assertIn("f00bar.net", deeper)
+        self.assertTrue(set(domains) < deeper)
+
+    def test_iter_deep_typo_candidates_matches_brute_force(self):
+        similar_char_map = {"o": ["0"], "b": ["6"]}
+        keyboard_map = {"o": ["0", "i"], "b": ["v", "n"]}
+        techniques = [TLD_REPLACEMENT, KEYBOARD, VISUAL, TRANSPOSITION]
+        tlds = ["net", "org"]
+
+        # Every name within depth edits, each one edited again regardless of how it was first reached
+        level = {c.domain for c in iter_typo_candidates("bob.com", tlds, similar_char_map, keyboard_map, [], [])}
+        expected = set(level)
+        for _ in range(2):
+            level = {c.domain for name in level
+                     for c in iter_typo_candidates(name, tlds, similar_char_map, keyboard_map, [], [], techniques)}
+            expected |= level
+        expected.discard("bob.com")
+
+        deep = [c.domain for c in iter_deep_typo_candidates("bob.com", tlds, similar_char_map, keyboard_map,
+                                                            [], [], depth=3, techniques=techniques)]
+
+        self.assertEqual(len(deep), len(set(deep)))
+        self.assertEqual(set(deep), expected)
+        self.assertIn("06ob.net", deep)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+from datetime import datetime, timedelta
+
+from flask import Flask
+
+from domain_generator import TypoCandidate, KEYBOARD, TLD_REPLACEMENT
+from incremental_scan import candidate_fingerprint, select_candidates_to_probe, record_probe_results
+from models import db, CandidateSet, CandidateState
+
+
+class TestIncrementalScan(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        self.candidates = [TypoCandidate(f"exampl{i}.com", KEYBOARD) for i in range(20)]
+        self.now = datetime(2025, 1, 1)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def test_candidate_fingerprint(self):
+        self.assertEqual(candidate_fingerprint(["a.com", "b.com"]), candidate_fingerprint(["b.com", "a.com"]))
+        self.assertNotEqual(candidate_fingerprint(["a.com"]), candidate_fingerprint(["a.com", "b.com"]))
+
+    def test_first_scan_probes_everything(self):
+        selected = select_candidates_to_probe(1, self.candidates, "v1", now=self.now)
+
+        self.assertEqual(len(selected), 20)
+        self.assertEqual(CandidateSet.query.filter_by(domain_id=1).one().candidate_count, 20)
+        self.assertEqual(CandidateState.query.filter_by(domain_id=1).count(), 20)
+
+    def test_rescan_probes_existing_and_stale_slice(self):
+        select_candidates_to_probe(1, self.candidates, "v1", now=self.now)
+        results = {c.domain: c.domain == "exampl0.com" for c in self.candidates}
+        # exampl19 was checked first, so it is the stalest one
+        record_probe_results(1, {"exampl19.com": False}, now=self.now - timedelta(days=1))
+        del results["exampl19.com"]
+        record_probe_results(1, results, now=self.now)
+
+        selected = select_candidates_to_probe(1, self.candidates, "v1", refresh_fraction=0.1, now=self.now)
+
+        self.assertEqual([c.domain for c in selected], ["exampl0.com", "exampl19.com", "exampl1.com"])
+
+    def test_unknown_results_are_probed_again(self):
+        select_candidates_to_probe(1, self.candidates, "v1", now=self.now)
+        results = {c.domain: False for c in self.candidates}
+        results["exampl0.com"] = None
+        record_probe_results(1, results, now=self.now)
+
+        selected = select_candidates_to_probe(1, self.candidates, "v1", refresh_fraction=0, now=self.now)
+
+        self.assertEqual([c.domain for c in selected], ["exampl0.com"])
+        self.assertIsNone(CandidateState.query.filter_by(candidate="exampl0.com").one().last_checked)
+
+    def test_changed_candidate_set_is_diffed(self):
+        select_candidates_to_probe(1, self.candidates, "v1", now=self.now)
+        record_probe_results(1, {c.domain: False for c in self.candidates}, now=self.now)
+
+        changed = self.candidates[1:] + [TypoCandidate("example.net", TLD_REPLACEMENT)]
+        selected = select_candidates_to_probe(1, changed, "v2", refresh_fraction=0, now=self.now)
+
+        self.assertEqual(selected, [TypoCandidate("example.net", TLD_REPLACEMENT)])
+        self.assertIsNone(CandidateState.query.filter_by(candidate="exampl0.com").first())
+        self.assertEqual(CandidateSet.query.filter_by(domain_id=1).one().wordlist_version, "v2")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,32 @@
+import unittest
+
+from flask import Flask
+from sqlalchemy import inspect, text
+
+from models import db, upgrade_schema
+
+
+class TestModels(unittest.TestCase):
+
+    def test_upgrade_schema_adds_missing_columns(self):
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(app)
+
+        with app.app_context():
+            with db.engine.begin() as connection:
+                connection.execute(text("CREATE TABLE scan_details (id INTEGER PRIMARY KEY, "
+                                        "scan_id INTEGER NOT NULL, domain_name VARCHAR(255) NOT NULL)"))
+            db.create_all()
+            upgrade_schema()
+
+            columns = {column["name"] for column in inspect(db.engine).get_columns("scan_details")}
+            self.assertIn("dns_ttl", columns)
+            self.assertIn("ip_address", columns)
+            indexes = {index["name"] for index in inspect(db.engine).get_indexes("scan_details")}
+            self.assertIn("ix_scan_details_whois_created_at", indexes)
+            db.drop_all()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import unittest
+
+from public_suffix import PublicSuffixList, get_public_suffix_list
+
+
+class TestPublicSuffixList(unittest.TestCase):
+
+    def setUp(self):
+        self.psl = PublicSuffixList(["com", "uk", "ac.uk", "jp", "*.kawasaki.jp", "!city.kawasaki.jp"])
+
+    def test_get_public_suffix(self):
+        self.assertEqual(self.psl.get_public_suffix("example.com"), "com")
+        self.assertEqual(self.psl.get_public_suffix("ox.ac.uk"), "ac.uk")
+        self.assertEqual(self.psl.get_public_suffix("www.ox.ac.uk"), "ac.uk")
+        self.assertEqual(self.psl.get_public_suffix("shop.town.kawasaki.jp"), "town.kawasaki.jp")
+        self.assertEqual(self.psl.get_public_suffix("city.kawasaki.jp"), "kawasaki.jp")
+        self.assertIsNone(self.psl.get_public_suffix("example.flight"))
+
+    def test_split_domain(self):
+        self.assertEqual(self.psl.split_domain("ox.ac.uk"), ("ox", "ac.uk"))
+        self.assertEqual(self.psl.split_domain("mail.ox.ac.uk"), ("mail.ox", "ac.uk"))
+        self.assertIsNone(self.psl.split_domain("ac.uk"))
+
+    def test_get_registrable_domain(self):
+        self.assertEqual(self.psl.get_registrable_domain("mail.ox.ac.uk"), "ox.ac.uk")
+        self.assertIsNone(self.psl.get_registrable_domain("town.kawasaki.jp"))
+
+    def test_is_registrable(self):
+        self.assertTrue(self.psl.is_registrable("ox.ac.uk"))
+        self.assertFalse(self.psl.is_registrable("ac.uk"))
+        self.assertFalse(self.psl.is_registrable("example.flight"))
+
+    def test_bundled_list(self):
+        psl = get_public_suffix_list()
+        self.assertEqual(psl.split_domain("pw.edu.pl"), ("pw", "edu.pl"))
+        self.assertEqual(psl.split_domain("ox.ac.uk"), ("ox", "ac.uk"))
+        self.assertEqual(psl.get_registrable_domain("x.blogspot.com"), "blogspot.com")
+        self.assertEqual(get_public_suffix_list(include_private=True).get_registrable_domain("a.x.blogspot.com"),
+                         "x.blogspot.com")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,186 @@
+import json
+import threading
+import unittest
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rdap_client import RDAPClient, RDAPError, load_rdap_bootstrap, parse_rdap_date, parse_rdap_domain
+from tests.whois_stub_server import StubWhoisServer
+from whois_fetcher import fetch_whois_many
+
+
+def _rdap_domain(domain: str, registrant: bool = True, related: str = None) -> dict:
+    data = {
+        "objectClassName": "domain",
+        "ldhName": domain.upper(),
+        "status": ["client transfer prohibited"],
+        "events": [
+            {"eventAction": "registration", "eventDate": "2024-01-02T03:04:05Z"},
+            {"eventAction": "expiration", "eventDate": "2026-01-02T03:04:05.123+02:00"},
+            {"eventAction": "last changed", "eventDate": "2024-06-01T00:00:00Z"},
+        ],
+        "nameservers": [{"objectClassName": "nameserver", "ldhName": "NS1.HOSTER.EXAMPLE"}],
+        "entities": [
+            {"roles": ["registrar"],
+             "vcardArray": ["vcard", [["version", {}, "text", "4.0"], ["fn", {}, "text", "Example Registrar"]]],
+             "entities": [{"roles": ["abuse"], "vcardArray": ["vcard", [
+                 ["email", {}, "text", "abuse@registrar.example"]]]}]},
+        ],
+    }
+    if registrant:
+        data["entities"].append({"roles": ["registrant"], "vcardArray": ["vcard", [
+            ["adr", {"cc": "PL"}, "text", ["", "", "", "", "", "", ""]]]]})
+    if related:
+        data["links"] = [{"rel": "self", "href": "https://rdap.registry.example/domain/" + domain},
+                         {"rel": "related", "type": "application/rdap+json", "href": related}]
+    return data
+
+
+def _registrar_domain(domain: str) -> dict:
+    # What a registrar's RDAP server adds for a thin registry: the registrant
+    return {"objectClassName": "domain", "ldhName": domain.upper(), "entities": [
+        {"roles": ["registrant"], "vcardArray": ["vcard", [
+            ["adr", {"cc": "DE"}, "text", ["", "", "", "", "", "", ""]],
+            ["email", {}, "text", "owner@registrant.example"]]]}]}
+
+
+class _RDAPStub:
+    # Serves /rdap/domain/<name> for names in domains over HTTP/1.1 keep-alive, other names get 404.
+    # Names in thin have no registrant; thin names ending in "-link" point to /registrar/domain/<name>.
+    # Names in broken get 500, names in malformed a JSON array
+
+    def __init__(self, domains, thin=(), broken=(), malformed=()):
+        self.domains = set(domains)
+        self.thin = set(thin)
+        self.broken = set(broken)
+        self.malformed = set(malformed)
+        self.requests = []
+        self.connections = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.requests.append(self.path)
+                stub.connections.add(self.client_address)
+                name = self.path.rsplit("/", 1)[-1]
+                data = None
+                if self.path.startswith("/rdap/domain/") and name in stub.domains:
+                    data = _rdap_domain(name)
+                elif self.path.startswith("/rdap/domain/") and name in stub.thin:
+                    related = stub.url.replace("/rdap/", "/registrar/domain/") + name
+                    data = _rdap_domain(name, registrant=False,
+                                        related=related if name.split(".")[0].endswith("-link") else None)
+                elif self.path.startswith("/registrar/domain/") and name in stub.thin:
+                    data = _registrar_domain(name)
+                if name in stub.broken:
+                    status, body = 500, b'{"errorCode": 500}'
+                elif name in stub.malformed:
+                    status, body = 200, b'["not", "an", "object"]'
+                elif data is not None:
+                    status, body = 200, json.dumps(data).encode("utf-8")
+                else:
+                    status, body = 404, b'{"errorCode": 404}'
+                self.send_response(status)
+                self.send_header("Content-Type", "application/rdap+json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/rdap/"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestRDAPClient(unittest.TestCase):
+
+    def setUp(self):
+        self.stub = _RDAPStub([f"typo{i}.test" for i in range(5)], thin=["thin-link.test", "thin.test"],
+                              broken=["broken.test"], malformed=["malformed.test"])
+        self.client = RDAPClient({"test": [self.stub.url]}, timeout=2, pool_size=2)
+
+    def tearDown(self):
+        self.client.close()
+        self.stub.stop()
+
+    def test_lookup_parses_typed_fields(self):
+        record = self.client.lookup("typo0.test")
+
+        self.assertEqual(record.registrar, "Example Registrar")
+        self.assertEqual(record.creation_date, datetime(2024, 1, 2, 3, 4, 5))
+        self.assertEqual(record.expiration_date, datetime(2026, 1, 2, 1, 4, 5, 123000))
+        self.assertEqual(record.updated_date, datetime(2024, 6, 1))
+        self.assertEqual(record.name_servers, ("ns1.hoster.example",))
+        self.assertEqual(record.emails, ("abuse@registrar.example",))
+        self.assertEqual(record.country, "PL")
+
+    def test_pooled_connections_and_errors(self):
+        for i in range(5):
+            self.client.lookup(f"typo{i}.test")
+        with self.assertRaises(RDAPError) as error:
+            self.client.lookup("missing.test")
+
+        self.assertEqual(error.exception.status, 404)
+        self.assertEqual(len(self.stub.requests), 6)
+        self.assertEqual(len(self.stub.connections), 1)
+        self.assertIsNone(self.client.base_url("typo0.example"))
+
+    def test_malformed_responses(self):
+        record = parse_rdap_domain("typo0.test", {"events": None, "nameservers": None, "links": None,
+                                                  "status": None, "entities": [{"roles": None, "vcardArray": 3}]})
+        self.assertEqual((record.creation_date, record.name_servers, record.status, record.related),
+                         (None, (), (), None))
+        with self.assertRaises(RDAPError):
+            self.client.lookup("malformed.test")
+
+    def test_bootstrap_and_dates(self):
+        bootstrap = load_rdap_bootstrap()
+        self.assertTrue(bootstrap["com"][0].startswith("https://"))
+        self.assertIsNone(parse_rdap_date("not a date"))
+        self.assertEqual(parse_rdap_date("2024-01-02T00:00:00-05:00"), datetime(2024, 1, 2, 5))
+
+    def test_thin_registry_follows_registrar_link(self):
+        record = self.client.lookup("thin-link.test")
+
+        self.assertEqual(record.registrar, "Example Registrar")
+        self.assertEqual(record.creation_date, datetime(2024, 1, 2, 3, 4, 5))
+        self.assertEqual(record.country, "DE")
+        self.assertEqual(record.emails, ("abuse@registrar.example", "owner@registrant.example"))
+        self.assertIn("/registrar/domain/thin-link.test", self.stub.requests)
+
+    def test_fetch_whois_many_falls_back_to_whois(self):
+        whois = StubWhoisServer({
+            "broken.test": "Domain Name: BROKEN.TEST\r\nRegistrar: Whois Registrar\r\n",
+            "thin.test": "Domain Name: THIN.TEST\r\nRegistrar: Whois Registrar\r\nRegistrant Country: CZ\r\n",
+            "missing.test": "Domain Name: MISSING.TEST\r\nRegistrar: Whois Registrar\r\n",
+        })
+        whois.start()
+        try:
+            results = fetch_whois_many(["typo1.test", "broken.test", "missing.test", "thin.test", "thin-link.test"],
+                                       use_cache=False, rdap=self.client, servers={"test": f"127.0.0.1:{whois.port}"})
+        finally:
+            whois.stop()
+
+        self.assertEqual(results["typo1.test"]["registrar"], "Example Registrar")
+        self.assertEqual(results["typo1.test"]["creation_date"], "2024-01-02 03:04:05")
+        self.assertEqual(results["broken.test"]["registrar"], "Whois Registrar")
+        # RDAP 404 is authoritative: not registered, no WHOIS query
+        self.assertEqual(results["missing.test"]["registrar"], "---")
+        # Thin records keep the RDAP data and take the registrant from the registrar or WHOIS
+        self.assertEqual((results["thin.test"]["registrar"], results["thin.test"]["country"]),
+                         ("Example Registrar", "CZ"))
+        self.assertEqual(results["thin-link.test"]["country"], "DE")
+        self.assertEqual(sorted(whois.queries), ["broken.test", "thin.test"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+from datetime import datetime
+
+from flask import Flask
+
+from models import db, User, Domain, ScanHistory, ScanDetails
+from registration_queries import newly_registered_domains, backfill_registration_dates
+
+
+class TestRegistrationQueries(unittest.TestCase):
+
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(self.app)
+        self.context = self.app.app_context()
+        self.context.push()
+        db.create_all()
+
+        db.session.add_all([User(id=1, email="a@example.com", password="x"),
+                            User(id=2, email="b@example.com", password="x")])
+        db.session.add_all([Domain(id=1, name="example.com", user_id=1),
+                            Domain(id=2, name="brand.com", user_id=1),
+                            Domain(id=3, name="other.com", user_id=2)])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.context.pop()
+
+    def _scan(self, domain_id, date, details):
+        scan = ScanHistory(domain_id=domain_id, date=date)
+        db.session.add(scan)
+        db.session.flush()
+        for domain_name, created_at, registrar in details:
+            db.session.add(ScanDetails(scan_id=scan.id, domain_name=domain_name, whois_created_at=created_at,
+                                       whois_registrar=registrar))
+        db.session.commit()
+
+    def test_newly_registered_across_brands(self):
+        self._scan(1, datetime(2025, 1, 1), [("examp1e.com", datetime(2024, 12, 20), "Old"),
+                                             ("exampel.com", datetime(2020, 1, 1), "Old")])
+        self._scan(1, datetime(2025, 2, 1), [("examp1e.com", datetime(2024, 12, 20), "New")])
+        self._scan(2, datetime(2025, 2, 1), [("brnad.com", datetime(2025, 1, 15), "Reg"),
+                                             ("brand.net", None, "Reg")])
+        self._scan(3, datetime(2025, 2, 1), [("0ther.com", datetime(2025, 1, 20), "Reg")])
+
+        results = newly_registered_domains(1, since=datetime(2024, 12, 1))
+
+        self.assertEqual([(r.brand, r.domain) for r in results],
+                         [("brand.com", "brnad.com"), ("example.com", "examp1e.com")])
+        self.assertEqual(results[1].registrar, "New")
+        self.assertEqual(results[1].last_seen, datetime(2025, 2, 1))
+        self.assertEqual([r.domain for r in newly_registered_domains(1, datetime(2024, 12, 1),
+                                                                     until=datetime(2025, 1, 1))],
+                         ["examp1e.com"])
+
+    def test_latest_scan_decides_the_registration_date(self):
+        # Re-registered after an older scan: the new creation date is outside the range
+        self._scan(1, datetime(2025, 1, 1), [("examp1e.com", datetime(2024, 12, 20), "Old")])
+        self._scan(1, datetime(2025, 3, 1), [("examp1e.com", datetime(2025, 2, 20), "New")])
+
+        self.assertEqual(newly_registered_domains(1, datetime(2024, 12, 1), until=datetime(2025, 1, 1)), [])
+        self.assertEqual([r.registrar for r in newly_registered_domains(1, datetime(2024, 12, 1))], ["New"])
+
+    def test_backfill_registration_dates(self):
+        scan = ScanHistory(domain_id=1, date=datetime(2025, 1, 1))
+        db.session.add(scan)
+        db.session.flush()
+        db.session.add_all([ScanDetails(scan_id=scan.id, domain_name="a.com", whois_creation_date="2024-12-20 00:00:00"),
+                            ScanDetails(scan_id=scan.id, domain_name="b.com", whois_creation_date="---"),
+                            ScanDetails(scan_id=scan.id, domain_name="c.com", whois_creation_date="garbage")])
+        db.session.commit()
+
+        self.assertEqual(backfill_registration_dates(batch_size=1), 1)
+        self.assertEqual(ScanDetails.query.filter_by(domain_name="a.com").one().whois_created_at,
+                         datetime(2024, 12, 20))
+        self.assertEqual([r.domain for r in newly_registered_domains(1, datetime(2024, 1, 1))], ["a.com"])
+
+
+if __name__ == "__main__":
+    unittest.main()
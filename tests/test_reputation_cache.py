@@ -0,0 +1,80 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from reputation import VTError
+from reputation_cache import ReputationCache, reputation_fingerprint
+from vt_queue import VTQueue, cached_reputation, process_queue
+
+
+class TestReputationCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache = ReputationCache(os.path.join(self.directory, "reputation_cache.db"), max_age=100)
+        self.queue = VTQueue(os.path.join(self.directory, "vt_queue.db"), rate_per_minute=600)
+
+    def tearDown(self):
+        self.cache.close()
+        self.queue.close()
+        shutil.rmtree(self.directory)
+
+    def test_fresh_and_stale_by_age(self):
+        self.cache.put("Exampel.com.", {"reputation": -5}, now=1000)
+
+        entry = self.cache.get("exampel.com", now=1050)
+        self.assertEqual((entry.attributes, entry.fetched_at, entry.stale), ({"reputation": -5}, 1000, False))
+        self.assertTrue(self.cache.get("exampel.com", now=1100).stale)
+        self.assertIsNone(self.cache.get("missing.com"))
+        self.assertEqual(self.cache.stats(), {"hits": 1, "stale": 1, "misses": 1})
+
+    def test_changed_hosting_makes_entry_stale(self):
+        old = reputation_fingerprint(["192.0.2.1"], ["ns1.hoster.example"])
+        new = reputation_fingerprint(["198.51.100.7"], ["ns1.hoster.example"])
+        self.assertEqual(old, reputation_fingerprint(["192.0.2.1", "192.0.2.1"], ["NS1.hoster.example"]))
+        self.cache.put("exampel.com", {"reputation": 0}, now=1000)
+
+        self.assertFalse(self.cache.get("exampel.com", old, now=1010).stale)
+        self.assertFalse(self.cache.get("exampel.com", old, now=1020).stale)
+        self.assertTrue(self.cache.get("exampel.com", new, now=1030).stale)
+
+        # The refreshed entry adopts the fingerprint of the next scan
+        self.cache.put("exampel.com", {"reputation": -3}, now=1040)
+        self.assertFalse(self.cache.get("exampel.com", new, now=1050).stale)
+
+    def test_stale_entries_are_served_and_refreshed(self):
+        self.cache.put("exampel.com", {"reputation": -5}, now=0)
+        self.cache.put("examp1e.com", {"reputation": 2})
+
+        self.assertEqual(cached_reputation("exampel.com", 1, cache=self.cache, queue=self.queue)["reputation"], -5)
+        self.assertEqual(cached_reputation("examp1e.com", 1, cache=self.cache, queue=self.queue)["reputation"], 2)
+        self.assertIsNone(cached_reputation("missing.com", 1, cache=self.cache, queue=self.queue))
+        self.assertEqual(self.queue.counts(), {"pending": 1})
+
+        client = MagicMock()
+        client.lookup.return_value = {"reputation": -40}
+        self.assertEqual(process_queue(self.queue, client, block=False, cache=self.cache), 1)
+
+        client.lookup.assert_called_once_with("exampel.com")
+        entry = self.cache.get("exampel.com")
+        self.assertEqual((entry.attributes, entry.stale), ({"reputation": -40}, False))
+
+    def test_unknown_domains_are_cached_as_empty(self):
+        self.queue.enqueue({"missing.com": 0, "broken.com": 0})
+
+        def lookup(domain):
+            raise VTError("not found", 404) if domain == "missing.com" else VTError("forbidden", 403)
+
+        client = MagicMock()
+        client.lookup.side_effect = lookup
+
+        process_queue(self.queue, client, block=False, cache=self.cache)
+
+        self.assertEqual(self.cache.get("missing.com").attributes, {})
+        self.assertIsNone(self.cache.get("broken.com"))
+
+
+if __name__ == "__main__":
+    unittest.main()
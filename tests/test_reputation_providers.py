@@ -0,0 +1,162 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from reputation_cache import ReputationCache
+from reputation_providers import (BlocklistProvider, CircuitBreaker, ReputationFanout, ReputationProvider,
+                                  ReputationQuery, URLhausProvider, Verdict, VirusTotalProvider, merge_verdicts)
+from vt_queue import VTQueue
+
+URLHAUS_DUMP = """################################################################
+# abuse.ch URLhaus Database Dump (CSV)                         #
+################################################################
+# id,dateadded,url,url_status,last_online,threat,tags,urlhaus_link,reporter
+"3000001","2025-01-02 10:00:00","http://login.exampel.com/wp/index.php","online","2025-01-02 10:00:00","malware_download","elf","https://urlhaus.abuse.ch/url/3000001/","reporter"
+"3000002","2025-01-02 11:00:00","https://192.0.2.7/payload.bin","offline","","malware_download","","https://urlhaus.abuse.ch/url/3000002/","reporter"
+"3000003","2025-01-03 09:00:00","http://x.blogspot.com/phish.html","online","","phishing","","https://urlhaus.abuse.ch/url/3000003/","reporter"
+"3000004","2025-01-03 10:00:00","http://a.evil.co.uk/drop.exe","online","","malware_download","","https://urlhaus.abuse.ch/url/3000004/","reporter"
+"""
+
+
+class _SlowProvider(ReputationProvider):
+    name = "slow"
+
+    def __init__(self, delay, timeout):
+        super().__init__(timeout)
+        self.delay = delay
+        self.calls = 0
+        self.released = threading.Event()
+
+    def check_many(self, queries):
+        self.calls += 1
+        self.released.wait(self.delay)
+        return {query.domain: Verdict(self.name, True, "late") for query in queries}
+
+
+class _BrokenProvider(ReputationProvider):
+    name = "broken"
+
+    def check_many(self, queries):
+        raise OSError("connection refused")
+
+
+class TestReputationProviders(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.queries = [ReputationQuery("exampel.com", 1), ReputationQuery("login.examp1e.com", 2),
+                        ReputationQuery("example.org", 3)]
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _write(self, name, text):
+        path = os.path.join(self.directory, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+        return path
+
+    def test_blocklist_matches_parents_and_reloads(self):
+        path = self._write("blocklist.txt", "# phishing\nexamp1e.com\n\nEXAMPLE.net.  # old\n")
+        provider = BlocklistProvider(path)
+
+        self.assertEqual(list(provider.check_many(self.queries)), ["login.examp1e.com"])
+
+        self._write("blocklist.txt", "example.org\n")
+        os.utime(path, (time.time() + 10, time.time() + 10))
+        self.assertEqual(list(provider.check_many(self.queries)), ["example.org"])
+
+    def test_urlhaus_dump(self):
+        provider = URLhausProvider(self._write("urlhaus.csv", URLHAUS_DUMP))
+
+        verdicts = provider.check_many(self.queries)
+
+        self.assertEqual(list(verdicts), ["exampel.com"])
+        self.assertTrue(verdicts["exampel.com"].listed)
+        self.assertIn("malware_download (online)", verdicts["exampel.com"].reason)
+
+        # A report on shared hosting or under a public suffix does not list the parent
+        shared = [ReputationQuery(domain, 1) for domain in ("blogspot.com", "x.blogspot.com", "co.uk", "evil.co.uk")]
+        self.assertEqual(sorted(provider.check_many(shared)), ["evil.co.uk", "x.blogspot.com"])
+
+    def test_providers_must_implement_check_many(self):
+        with self.assertRaises(TypeError):
+            ReputationProvider()
+
+    def test_circuit_breaker(self):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        breaker.record_failure(now=0)
+        self.assertTrue(breaker.allow(now=1))
+        breaker.record_failure(now=1)
+        self.assertEqual(breaker.state, "open")
+        self.assertFalse(breaker.allow(now=5))
+
+        self.assertTrue(breaker.allow(now=11))
+        self.assertEqual(breaker.state, "half-open")
+        self.assertFalse(breaker.allow(now=11))
+        breaker.record_failure(now=12)
+        self.assertFalse(breaker.allow(now=20))
+        self.assertTrue(breaker.allow(now=22))
+        breaker.record_success()
+        self.assertEqual(breaker.state, "closed")
+
+    def test_fanout_skips_slow_and_failing_providers(self):
+        blocklist = BlocklistProvider(self._write("blocklist.txt", "examp1e.com\n"))
+        slow = _SlowProvider(delay=5, timeout=0.2)
+        fanout = ReputationFanout([blocklist, slow, _BrokenProvider()])
+        try:
+            started = time.monotonic()
+            for _ in range(4):
+                results = fanout.check_many(self.queries)
+            elapsed = time.monotonic() - started
+        finally:
+            slow.released.set()
+
+        self.assertEqual({domain: list(verdicts) for domain, verdicts in results.items()},
+                         {"login.examp1e.com": ["blocklist"]})
+        # The third timeout opens the circuit, the fourth scan does not wait for the slow provider
+        self.assertEqual(slow.calls, 3)
+        self.assertLess(elapsed, 3 * 0.2 + 0.5)
+        self.assertEqual(fanout.breakers["slow"].state, "open")
+        self.assertEqual(fanout.breakers["broken"].state, "open")
+        self.assertEqual(fanout.breakers["blocklist"].state, "closed")
+
+    def test_virustotal_provider_and_merge(self):
+        cache = ReputationCache(None)
+        queue = VTQueue(None)
+        try:
+            cache.put("exampel.com", {"reputation": -20, "last_analysis_stats": {"malicious": 4}})
+            provider = VirusTotalProvider(cache, queue)
+
+            verdicts = provider.check_many(self.queries)
+
+            self.assertTrue(verdicts["exampel.com"].listed)
+            self.assertEqual(verdicts["exampel.com"].data["reputation"], -20)
+            self.assertNotIn("login.examp1e.com", verdicts)
+            self.assertEqual(queue.counts(), {})
+
+            # Without a worker nothing is queued, so no scan result waits for a lookup that never runs
+            verdicts = VirusTotalProvider(cache, queue, max_score=2, use_queue=False).check_many(self.queries)
+            self.assertNotIn("login.examp1e.com", verdicts)
+            self.assertEqual(queue.counts(), {})
+
+            verdicts = VirusTotalProvider(cache, queue, max_score=2, use_queue=True).check_many(self.queries)
+            self.assertTrue(verdicts["login.examp1e.com"].pending)
+            self.assertEqual(queue.counts(), {"pending": 1})
+        finally:
+            cache.close()
+            queue.close()
+
+        merged = merge_verdicts({"virustotal": Verdict("virustotal", False, pending=True),
+                                 "urlhaus": Verdict("urlhaus", True, "malware_download"),
+                                 "blocklist": Verdict("blocklist", True, "listed")})
+        self.assertEqual(merged, {"listed": True, "listed_by": ["blocklist", "urlhaus"],
+                                  "reasons": {"blocklist": "listed", "urlhaus": "malware_download"},
+                                  "pending": ["virustotal"]})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import threading
+import time
+import unittest
+
+from scan_pipeline import Pipeline, Stage
+
+
+def _double(batch):
+    return [item * 2 for item in batch]
+
+
+class TestScanPipeline(unittest.TestCase):
+
+    def test_stages_batches_and_streaming(self):
+        batches = []
+
+        def collect(batch):
+            batches.append(len(batch))
+            return batch
+
+        def evens(items):
+            for item in items:
+                if item % 2 == 0:
+                    yield item
+
+        pipeline = Pipeline([Stage("evens", evens, streaming=True),
+                             Stage("double", _double, concurrency=3),
+                             Stage("collect", collect, batch_size=4, batch_wait=1.0)], queue_size=8)
+
+        results = list(pipeline.run(range(20)))
+
+        self.assertEqual(sorted(results), [item * 2 for item in range(0, 20, 2)])
+        self.assertEqual(batches, [4, 4, 2])
+        self.assertEqual(pipeline.stats["generate"].items_out, 20)
+        self.assertEqual((pipeline.stats["evens"].items_in, pipeline.stats["evens"].items_out), (20, 10))
+        self.assertEqual(pipeline.stats["double"].items_out, 10)
+
+    def test_slow_stage_holds_back_the_source(self):
+        pulled = []
+
+        def source():
+            for item in range(200):
+                pulled.append(item)
+                yield item
+
+        def slow(batch):
+            time.sleep(0.01)
+            return batch
+
+        pipeline = Pipeline([Stage("fast", _double), Stage("slow", slow)], queue_size=4)
+        results = pipeline.run(source())
+        for _ in range(10):
+            next(results)
+        time.sleep(0.2)
+
+        # Three queues of four items plus one item held by each thread
+        self.assertLessEqual(len(pulled), 10 + 3 * 4 + 3)
+        self.assertLessEqual(max(stats.max_backlog for stats in pipeline.stats.values()), 4)
+        self.assertEqual(len(list(results)), 190)
+
+    def test_first_results_before_the_source_ends(self):
+        finished = threading.Event()
+        release = threading.Event()
+
+        def source():
+            yield 1
+            release.wait(5)
+            yield 2
+            finished.set()
+
+        results = Pipeline([Stage("double", _double, batch_size=8, batch_wait=0.05)]).run(source())
+
+        self.assertEqual(next(results), 2)
+        self.assertFalse(finished.is_set())
+        release.set()
+        self.assertEqual(list(results), [4])
+
+    def test_errors_stop_the_pipeline(self):
+        def broken(batch):
+            if 5 in batch:
+                raise ValueError("broken item")
+            return batch
+
+        def source():
+            yield from range(100000)
+
+        pipeline = Pipeline([Stage("broken", broken, concurrency=2), Stage("double", _double)], queue_size=4)
+
+        with self.assertRaises(ValueError):
+            list(pipeline.run(source()))
+        self.assertLess(pipeline.stats["generate"].items_out, 100)
+
+    def test_closing_the_run_stops_workers(self):
+        pipeline = Pipeline([Stage("double", _double, concurrency=2)], queue_size=2)
+        threads_before = threading.active_count()
+
+        results = pipeline.run(iter(range(100000)))
+        self.assertEqual(next(results), 0)
+        results.close()
+
+        self.assertEqual(threading.active_count(), threads_before)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,21 @@
 import unittest
-from unittest.mock import patch
-from scanner import (quick_scan_domain,calculate_damerau_levenshtein_score, calculate_domain_similarity_in_percent)
+from unittest.mock import patch, MagicMock
+
+from flask import Flask
+
+from models import db, User, Domain, ScanHistory, ScanDetails
+from scanner import (quick_scan_domain,calculate_damerau_levenshtein_score, calculate_domain_similarity_in_percent,
+                     full_scan_domain, rank_typo_candidates)
+from domain_generator import TypoCandidate, TRANSPOSITION, SUBDOMAIN, KEYBOARD, BITSQUATTING, split_domain
+from dns_resolver import ResolutionRecord
+
+
+def _resolve(domains, live=("example.org",)):
+    for domain in domains:
+        if domain in live:
+            yield ResolutionRecord(domain, 0, ("93.184.216.34",), (), (), 300, 0.01)
+        else:
+            yield ResolutionRecord(domain, 3, ttl=60, latency=0.01)
 
 
 class TestScanner(unittest.TestCase):
@@ -20,18 +35,129 @@ class TestScanner(unittest.TestCase):
         self.assertLess(similarity, 50)
 
     @patch("scanner.generate_typo_domains", return_value=["exampel.com", "example.org"])
-    @patch("scanner.check_domain_exists", side_effect=lambda domain: domain == "example.org")
-    @patch("scanner.get_whois_info", return_value={"registrar": "Example Registrar", "country": "US"})
-    @patch("scanner.get_domain_ip", return_value="93.184.216.34")
-    @patch("scanner.check_domain_reputation", return_value={"reputation": 5})
-    def test_quick_scan_domain(self, mock_reputation, mock_get_ip, mock_whois, mock_check_exists, mock_generate):
+    @patch("scanner.resolve_domains", side_effect=_resolve)
+    @patch("scanner.fetch_whois_many",
+           side_effect=lambda domains, session: {d: {"registrar": "Example Registrar", "country": "US"} for d in domains})
+    @patch("scanner.check_reputation", return_value={})
+    def test_quick_scan_domain(self, mock_reputation, mock_whois, mock_resolve, mock_generate):
         result = quick_scan_domain("example.com")
 
         self.assertIn("domains", result)
         self.assertEqual(len(result["valid_domains"]), 1)
         self.assertEqual(result["valid_domains"], ["example.org"])
+        self.assertEqual(result["domains"][0]["ip_address"], "93.184.216.34")
+        self.assertEqual(result["domains"][0]["dns"]["ttl"], 300)
+        mock_resolve.assert_called_once()
+
+    def test_rank_typo_candidates(self):
+        keyboard_map = {"e": ("w", "r", "d")}
+        candidates = [
+            TypoCandidate("example.blog.com", SUBDOMAIN),
+            TypoCandidate("exampel.com", TRANSPOSITION, 5),
+            TypoCandidate("examplw.com", KEYBOARD, 6, "w"),
+            TypoCandidate("examplu.com", BITSQUATTING, 6, "u"),
+        ]
+        with patch("scanner.split_domain", wraps=split_domain) as mock_split:
+            ranked = rank_typo_candidates("example.com", candidates, keyboard_map, ["com", "org"])
+
+        # The original domain is split once, not once per candidate
+        self.assertEqual([call.args[0] for call in mock_split.call_args_list].count("example.com"), 1)
+        self.assertEqual([candidate.domain for _, candidate in ranked],
+                         ["exampel.com", "examplw.com", "examplu.com", "example.blog.com"])
+        scores = [score for score, _ in ranked]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+
+    @patch("scanner.db")
+    @patch("scanner.ScanDetails")
+    @patch("scanner.ScanHistory")
+    @patch("scanner.alert_conditions", return_value=[])
+    @patch("scanner.resolve_domains", side_effect=_resolve)
+    def test_full_scan_domain_probe_budget(self, mock_check_exists, mock_alerts, mock_history, mock_details, mock_db):
+        domain = MagicMock(id=1)
+        domain.name = "example.com"
+        probed = []
+        mock_check_exists.side_effect = lambda domains: _resolve(d for d in domains if not probed.append(d))
+
+        full_scan_domain(domain, max_probes=5)
+
+        self.assertEqual(len(probed), 5)
+        self.assertIn("exampel.com", probed)
+        self.assertEqual(mock_history.return_value.permutations_checked, 5)
+
+    @patch("scanner.db")
+    @patch("scanner.ScanDetails")
+    @patch("scanner.ScanHistory")
+    @patch("scanner.alert_conditions", return_value=[])
+    @patch("scanner.resolve_domains", side_effect=_resolve)
+    @patch("scanner.iter_deep_typo_candidates", return_value=[TypoCandidate("examplw.com", KEYBOARD, 6, "w"),
+                                                              TypoCandidate("examplw.net", "keyboard+tld")])
+    def test_full_scan_domain_deep_mode(self, mock_deep, mock_check_exists, mock_alerts, mock_history, mock_details,
+                                        mock_db):
+        domain = MagicMock(id=1)
+        domain.name = "example.com"
+
+        full_scan_domain(domain, depth=2)
+
+        self.assertEqual(mock_deep.call_args.args[6], 2)
+        self.assertEqual(mock_history.return_value.permutations_checked, 2)
+
+    @patch("scanner.db")
+    @patch("scanner.ScanDetails")
+    @patch("scanner.ScanHistory")
+    @patch("scanner.alert_conditions", return_value=[])
+    @patch("scanner.resolve_domains", side_effect=_resolve)
+    def test_full_scan_domain_time_limit(self, mock_check_exists, mock_alerts, mock_history, mock_details, mock_db):
+        domain = MagicMock(id=1)
+        domain.name = "example.com"
+
+        full_scan_domain(domain, time_limit=0)
+
+        self.assertEqual(mock_history.return_value.permutations_checked, 0)
+
+    @patch("scanner.check_reputation", return_value={})
+    @patch("scanner.fetch_whois_many",
+           side_effect=lambda domains, session: {d: {"registrar": "Registrar"} for d in domains})
+    @patch("scanner.alert_conditions", return_value=["exampel.com"])
+    @patch("scanner.resolve_domains",
+           side_effect=lambda domains: _resolve(domains, live=("exampel.com", "examp1e.com", "example.org")))
+    def test_full_scan_domain_saves_pipeline_results(self, mock_resolve, mock_alerts, mock_whois, mock_reputation):
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(id=1, email="a@example.com", password="x"))
+            domain = Domain(id=1, name="example.com", user_id=1)
+            db.session.add(domain)
+            db.session.commit()
+
+            full_scan_domain(domain, max_probes=50)
+
+            scan = ScanHistory.query.one()
+            details = ScanDetails.query.filter_by(scan_id=scan.id).all()
+            self.assertEqual(scan.permutations_checked, 50)
+            self.assertEqual(scan.existing_domains, len(details))
+            self.assertEqual(scan.domains_alerted, '["exampel.com"]')
+            self.assertIn("exampel.com", {detail.domain_name for detail in details})
+            self.assertEqual({detail.whois_registrar for detail in details}, {"Registrar"})
 
+            # Failing enrichment only loses its own data
+            mock_whois.side_effect = OSError("whois down")
+            mock_reputation.side_effect = OSError("providers down")
+            full_scan_domain(domain, max_probes=50)
+            second = ScanHistory.query.order_by(ScanHistory.id.desc()).first()
+            second_details = ScanDetails.query.filter_by(scan_id=second.id).all()
+            self.assertEqual(len(second_details), len(details))
+            self.assertEqual({detail.whois_registrar for detail in second_details}, {"---"})
+            self.assertEqual({detail.reputation for detail in second_details}, {"---"})
 
+            # A failing resolver aborts the scan and leaves nothing behind
+            mock_resolve.side_effect = OSError("resolver down")
+            with self.assertRaises(RuntimeError):
+                full_scan_domain(domain, max_probes=50)
+            self.assertEqual(ScanHistory.query.count(), 2)
+            self.assertEqual(ScanDetails.query.count(), 2 * len(details))
+            db.drop_all()
 
 
 if __name__ == "__main__":
@@ -19,7 +19,7 @@ class TestScheduler(unittest.TestCase):
 
         perform_full_scan(mock_domain)
 
-        mock_full_scan.assert_called_once_with(mock_domain)
+        mock_full_scan.assert_called_once_with(mock_domain, incremental=True)
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,52 @@
+import itertools
+import unittest
+
+import jellyfish
+
+from domain_generator import generate_soundsquatting_domains
+from soundsquatting import ALPHABET, iter_phonetic_variants
+from tests import soundsquatting_test
+
+
+class TestSoundsquatting(unittest.TestCase):
+
+    def test_matches_reference_implementation(self):
+        for domain in ["example.com", "cisco.com", "fortinet.com", "kuleuven.be", "knight.com", "thumb.net"]:
+            main_name, base_tld = domain.rsplit(".", 1)
+            expected = set(soundsquatting_test.generate_soundsquatting_domains(domain))
+            generated = {d for d in generate_soundsquatting_domains(main_name, base_tld)
+                         if soundsquatting_test.is_valid_domain(d)}
+            self.assertEqual(generated, expected, domain)
+
+    def test_variants_keep_phonetic_key(self):
+        for mode, key in [("metaphone", jellyfish.metaphone), ("soundex", jellyfish.soundex),
+                          ("nysiis", jellyfish.nysiis)]:
+            variants = list(iter_phonetic_variants("paloalto", mode))
+            self.assertTrue(variants, mode)
+            for variant, position, char in variants:
+                self.assertEqual(key(variant), key("paloalto"))
+
+    def test_metaphone_tables_match_full_sweep(self):
+        # Every name of up to three letters, and longer names whose variants a corpus-learned table missed
+        names = [''.join(letters) for length in range(1, 4) for letters in itertools.product(ALPHABET, repeat=length)]
+        names += ["phhx", "kphh", "ughuh", "eghihcs", "kkghahpc", "pay-pal", "3com"]
+        for name in names:
+            pruned = set(iter_phonetic_variants(name))
+            swept = set(iter_phonetic_variants(name, key=jellyfish.metaphone))
+            self.assertEqual(pruned, swept, name)
+
+        self.assertIn(("fhh", 0, "f"), set(iter_phonetic_variants("phh")))
+        self.assertIn(("vhh", 0, "v"), set(iter_phonetic_variants("phh")))
+
+    def test_soundex_mode(self):
+        domains = generate_soundsquatting_domains("example", "com", mode="soundex")
+        self.assertIn("exampla.com", domains)
+        self.assertTrue(all(jellyfish.soundex(d.split(".")[0]) == "E251" for d in domains))
+
+    def test_unknown_mode(self):
+        with self.assertRaises(ValueError):
+            list(iter_phonetic_variants("example", "caverphone"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,183 @@
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+from unittest.mock import patch
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from flask import Flask
+
+from models import db, ScanDetails
+from reputation import VirusTotalClient
+from reputation_cache import ReputationCache
+from vt_queue import VTQueue, VT_PENDING, process_queue, start_vt_worker, store_vt_result, vt_worker_running
+
+
+class _VTStub:
+    # Serves /api/v3/domains/<name> over HTTP/1.1 keep-alive: known names get attributes,
+    # names in throttled get one 429 first, other names 404
+    def __init__(self, reputations, throttled=()):
+        self.reputations = dict(reputations)
+        self.throttled = set(throttled)
+        self.requests = []
+        self.connections = set()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                name = self.path.rsplit("/", 1)[-1]
+                stub.requests.append(name)
+                stub.connections.add(self.client_address)
+                if self.headers.get("x-apikey") != "test-key":
+                    status, body = 401, {"error": {"code": "WrongCredentialsError"}}
+                elif name in stub.throttled:
+                    stub.throttled.discard(name)
+                    status, body = 429, {"error": {"code": "QuotaExceededError"}}
+                elif name in stub.reputations:
+                    status, body = 200, {"data": {"attributes": {"reputation": stub.reputations[name],
+                                                                 "last_analysis_stats": {"malicious": 1}}}}
+                else:
+                    status, body = 404, {"error": {"code": "NotFoundError"}}
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/v3"
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestVTQueue(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "vt_queue.db")
+        self.queue = VTQueue(self.path, rate_per_minute=600, daily_quota=100)
+        self.stub = _VTStub({"exampel.com": -5, "examp1e.com": 3, "exmaple.com": 0}, throttled={"exmaple.com"})
+        self.client = VirusTotalClient("test-key", base_url=self.stub.url)
+
+    def tearDown(self):
+        self.client.close()
+        self.stub.stop()
+        self.queue.close()
+        shutil.rmtree(self.directory)
+
+    def test_lowest_score_first_on_one_connection(self):
+        self.queue.enqueue({"examp1e.com": 2, "exampel.com": 1, "missing.com": 1}, now=1000)
+        self.queue.enqueue({"examp1e.com": 0}, now=1001)
+        results = {}
+
+        made = process_queue(self.queue, self.client, on_result=results.__setitem__, block=False)
+
+        self.assertEqual(made, 3)
+        self.assertEqual(self.stub.requests, ["examp1e.com", "exampel.com", "missing.com"])
+        self.assertEqual(len(self.stub.connections), 1)
+        self.assertEqual(results["exampel.com"]["reputation"], -5)
+        self.assertEqual(results["missing.com"], {})
+        self.assertEqual(self.queue.result("exampel.com")["reputation"], -5)
+        self.assertEqual(self.queue.counts(), {"done": 3})
+
+    def test_quota_is_shared_between_processes(self):
+        other = VTQueue(self.path, rate_per_minute=2, daily_quota=3)
+        slow = VTQueue(self.path, rate_per_minute=2, daily_quota=3)
+        try:
+            self.assertEqual(other.take_token(now=1000), 0)
+            self.assertEqual(slow.take_token(now=1000), 0)
+            self.assertAlmostEqual(other.take_token(now=1000), 30)
+            self.assertEqual(slow.take_token(now=1030), 0)
+            # Daily quota of 3 used up, the next token comes at midnight UTC
+            self.assertAlmostEqual(other.take_token(now=1090), 86400 - 1090)
+            self.assertEqual(other.take_token(now=86400 + 60), 0)
+        finally:
+            other.close()
+            slow.close()
+
+    def test_throttled_and_abandoned_requests_stay_queued(self):
+        self.queue.enqueue({"exmaple.com": 0, "exampel.com": 1}, now=1000)
+        self.assertEqual(self.queue.claim(now=1000), "exmaple.com")
+        other = VTQueue(self.path, lease_seconds=60)
+        try:
+            # The first worker died, its lease runs out and the request is handed out again
+            self.assertEqual(other.claim(now=1030), "exampel.com")
+            self.assertEqual(other.claim(now=1200), "exmaple.com")
+            other.release("exmaple.com")
+            other.release("exampel.com")
+        finally:
+            other.close()
+
+        self.assertEqual(process_queue(self.queue, self.client, max_requests=1, block=False), 1)
+        self.assertEqual(self.queue.counts(), {"pending": 2})
+        self.assertGreater(self.queue.take_token(), 0)
+
+    @patch("vt_queue._vt_worker", None)
+    @patch("vt_queue.get_vt_client", return_value=None)
+    def test_one_worker_per_process(self, mock_client):
+        cache = ReputationCache(None)
+        try:
+            # No API key, no worker: scans do not queue lookups
+            self.assertIsNone(start_vt_worker(Flask(__name__), self.queue, cache=cache))
+            self.assertFalse(vt_worker_running())
+
+            thread, stop = start_vt_worker(Flask(__name__), self.queue, self.client, cache)
+            self.assertTrue(vt_worker_running())
+            self.assertEqual(start_vt_worker(Flask(__name__), self.queue, self.client, cache), (thread, stop))
+
+            stop.set()
+            thread.join(5)
+            self.assertFalse(vt_worker_running())
+
+            # Concurrent callers all get the one worker that was started
+            barrier = threading.Barrier(8)
+            workers = []
+
+            def start():
+                barrier.wait()
+                workers.append(start_vt_worker(Flask(__name__), self.queue, self.client, cache))
+
+            callers = [threading.Thread(target=start) for _ in range(8)]
+            for caller in callers:
+                caller.start()
+            for caller in callers:
+                caller.join(5)
+            self.assertEqual(len(set(workers)), 1)
+            workers[0][1].set()
+            workers[0][0].join(5)
+        finally:
+            cache.close()
+
+    def test_results_land_in_scan_details(self):
+        app = Flask(__name__)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+            db.session.add_all([ScanDetails(scan_id=1, domain_name="exampel.com", reputation=VT_PENDING),
+                                ScanDetails(scan_id=2, domain_name="exampel.com", reputation="-1"),
+                                ScanDetails(scan_id=1, domain_name="missing.com", reputation=VT_PENDING)])
+            db.session.commit()
+
+            store_vt_result("exampel.com", {"reputation": -5, "last_modification_date": datetime(2025, 1, 1)})
+            store_vt_result("missing.com", None)
+
+            self.assertEqual([d.reputation for d in ScanDetails.query.order_by(ScanDetails.id)], ["-5", "-1", "---"])
+            db.drop_all()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from whois_cache import WhoisCache
+from whois_fetcher import fetch_whois_many
+
+
+class TestWhoisCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "whois_cache.db")
+        self.cache = WhoisCache(self.path, ttl=100, failure_ttl=10, lease_seconds=5, poll_interval=0.01)
+
+    def tearDown(self):
+        self.cache.close()
+        shutil.rmtree(self.directory)
+
+    def test_success_and_failure_ttl(self):
+        self.cache.put("example.com", {"registrar": "Example"}, now=1000)
+        self.cache.put("throttled.com", {"registrar": "---"}, failed=True, now=1000)
+
+        self.assertEqual(self.cache.get("EXAMPLE.com.", now=1050), {"registrar": "Example"})
+        self.assertIsNone(self.cache.get("example.com", now=1100))
+        self.assertEqual(self.cache.get("throttled.com", now=1005), {"registrar": "---"})
+        self.assertIsNone(self.cache.get("throttled.com", now=1010))
+
+    def test_persists_between_instances(self):
+        self.cache.put("example.com", {"registrar": "Example"})
+        other = WhoisCache(self.path)
+        try:
+            self.assertEqual(other.get("example.com"), {"registrar": "Example"})
+        finally:
+            other.close()
+
+    def test_concurrent_callers_share_one_lookup(self):
+        calls = []
+
+        def fetch_many(keys):
+            calls.append(list(keys))
+            time.sleep(0.1)
+            return {key: ({"registrar": key}, False) for key in keys}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(
+            self.cache.get_or_fetch_many(["example.com", "Example.org."], fetch_many)))
+            for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(key for keys in calls for key in keys), ["example.com", "example.org"])
+        self.assertEqual(results, [{"example.com": {"registrar": "example.com"},
+                                    "Example.org.": {"registrar": "example.org"}}] * 8)
+        self.assertEqual(self.cache.stats(), {"hits": 14, "misses": 2})
+
+    def test_waits_for_lookup_of_another_process(self):
+        other = WhoisCache(self.path, lease_seconds=5)
+        try:
+            self.assertTrue(other._acquire_lease("example.com"))
+            threading.Timer(0.1, lambda: other.put("example.com", {"registrar": "Other process"})).start()
+
+            fetch_many = MagicMock(side_effect=lambda keys: {key: ({"registrar": "Own"}, False) for key in keys})
+            results = self.cache.get_or_fetch_many(["example.com", "example.org"], fetch_many)
+
+            self.assertEqual(results, {"example.com": {"registrar": "Other process"},
+                                       "example.org": {"registrar": "Own"}})
+            fetch_many.assert_called_once_with(["example.org"])
+        finally:
+            other.close()
+
+    def test_failures_use_failure_ttl(self):
+        result = fetch_whois_many(["example.com"], cache=self.cache, use_rdap=False,
+                                  servers={"com": "127.0.0.1:1"}, timeout=1)
+
+        self.assertEqual(result["example.com"]["registrar"], "---")
+        row = self.cache._db.execute("SELECT failed, expires - ? FROM whois_cache", (time.time(),)).fetchone()
+        self.assertEqual(row[0], 1)
+        self.assertLessEqual(row[1], 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from whois_cache import WhoisCache
+from whois_fetcher import WhoisSession, fetch_whois_many
+from tests.whois_stub_server import StubWhoisServer
+
+
+def _registry_record(domain: str, referral: str) -> str:
+    return (f"Domain Name: {domain.upper()}\r\n"
+            f"Registrar WHOIS Server: {referral}\r\n"
+            f"Creation Date: 2024-01-02T00:00:00Z\r\n"
+            f"Registry Expiry Date: 2026-01-02T00:00:00Z\r\n"
+            f"Name Server: NS1.{domain.upper()}\r\n")
+
+
+def _registrar_record(domain: str) -> str:
+    return (f"Domain Name: {domain.upper()}\r\n"
+            f"Registrar: Example Registrar, Inc.\r\n"
+            f"Registrant Country: US\r\n"
+            f"Registrar Abuse Contact Email: abuse@registrar.example\r\n")
+
+
+class TestWhoisFetcher(unittest.TestCase):
+
+    def setUp(self):
+        self.domains = [f"typo{i}.com" for i in range(6)]
+        self.registrar = StubWhoisServer({domain: _registrar_record(domain) for domain in self.domains},
+                                         delay=0.1)
+        registrar_server = f"127.0.0.1:{self.registrar.start()}"
+        self.registry = StubWhoisServer({domain: _registry_record(domain, registrar_server)
+                                         for domain in self.domains})
+        self.registry.start()
+        self.other = StubWhoisServer({"typo.net": _registry_record("typo.net", "127.0.0.1:1")})
+        self.other.start()
+        self.servers = {"com": f"127.0.0.1:{self.registry.port}", "net": f"127.0.0.1:{self.other.port}"}
+
+    def tearDown(self):
+        for server in (self.registrar, self.registry, self.other):
+            server.stop()
+
+    def test_fetch_follows_referrals_with_per_server_limits(self):
+        stats = {}
+        started = time.monotonic()
+        results = fetch_whois_many(self.domains + ["login.typo0.com"], use_cache=False, use_rdap=False,
+                                   stats=stats, servers=self.servers, per_server_concurrency=2,
+                                   per_server_rate=1000)
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(results["typo3.com"]["registrar"], "Example Registrar, Inc.")
+        self.assertEqual(results["typo3.com"]["country"], "US")
+        self.assertTrue(results["typo3.com"]["creation_date"].startswith("2024-01-02"))
+        self.assertEqual(results["login.typo0.com"]["domain_name"], "login.typo0.com")
+        self.assertEqual(results["login.typo0.com"]["registrar"], "Example Registrar, Inc.")
+        # One query per registrable domain on each server, at most two at a time on the slow registrar
+        self.assertEqual(sorted(self.registry.queries), self.domains)
+        self.assertEqual(sorted(self.registrar.queries), self.domains)
+        self.assertEqual(self.registrar.max_in_flight, 2)
+        self.assertLess(elapsed, 0.6 * len(self.domains) / 2 + 0.5)
+
+        registry_stats = stats[self.servers["com"]]
+        self.assertEqual((registry_stats.queries, registry_stats.referrals, registry_stats.errors), (6, 6, 0))
+        self.assertGreaterEqual(stats[f"127.0.0.1:{self.registrar.port}"].average_latency_ms, 100)
+
+    def test_session_limits_hold_across_concurrent_batches(self):
+        results = {}
+        with WhoisSession(use_rdap=False, servers=self.servers, per_server_concurrency=2,
+                          per_server_rate=1000) as session:
+            batches = [threading.Thread(target=lambda batch=batch: results.update(
+                fetch_whois_many(batch, use_cache=False, session=session)))
+                for batch in (self.domains[:3], self.domains[3:])]
+            for thread in batches:
+                thread.start()
+            for thread in batches:
+                thread.join()
+            stats = session.server_stats()
+
+        self.assertEqual(sorted(results), self.domains)
+        # Both batches share the registrar's group: never more than two queries at a time
+        self.assertEqual(self.registrar.max_in_flight, 2)
+        self.assertEqual(stats[self.servers["com"]].queries, 6)
+
+    def test_concurrent_callers_share_lookups_through_the_cache(self):
+        cache = WhoisCache(None)
+        results = []
+        try:
+            callers = [threading.Thread(target=lambda: results.append(fetch_whois_many(
+                self.domains, cache=cache, use_rdap=False, servers=self.servers, per_server_rate=1000)))
+                for _ in range(3)]
+            for thread in callers:
+                thread.start()
+            for thread in callers:
+                thread.join()
+        finally:
+            cache.close()
+
+        # Every domain is looked up once, the other callers wait for that lookup
+        self.assertEqual(sorted(self.registry.queries), self.domains)
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(result["typo3.com"]["registrar"] == "Example Registrar, Inc." for result in results))
+
+    def test_unexpected_error_only_fails_its_domain(self):
+        def domain_url(domain):
+            if domain == "typo1.com":
+                raise ValueError("broken bootstrap entry")
+            return None
+
+        rdap = MagicMock()
+        rdap.domain_url.side_effect = domain_url
+        results = fetch_whois_many(["typo0.com", "typo1.com"], use_cache=False, rdap=rdap, servers=self.servers,
+                                   per_server_rate=1000)
+
+        self.assertEqual(results["typo0.com"]["registrar"], "Example Registrar, Inc.")
+        self.assertEqual(results["typo1.com"]["registrar"], "---")
+
+    def test_failed_referral_keeps_registry_data(self):
+        stats = {}
+        results = fetch_whois_many(["typo.net"], use_cache=False, use_rdap=False, stats=stats,
+                                   servers=self.servers, timeout=1)
+
+        self.assertEqual(results["typo.net"]["registrar"], "---")
+        self.assertTrue(results["typo.net"]["creation_date"].startswith("2024-01-02"))
+        self.assertEqual(stats["127.0.0.1:1"].errors, 1)
+
+    def test_unknown_domain_and_cache(self):
+        cache = WhoisCache(None, failure_ttl=60)
+        try:
+            first = fetch_whois_many(["typo0.com", "missing.com"], cache=cache, use_rdap=False, servers=self.servers)
+            second = fetch_whois_many(["typo0.com", "missing.com"], cache=cache, use_rdap=False, servers=self.servers)
+        finally:
+            cache.close()
+
+        self.assertEqual(first["missing.com"]["registrar"], "---")
+        self.assertEqual(first, second)
+        self.assertEqual(self.registry.queries.count("missing.com"), 1)
+        self.assertEqual(self.registry.queries.count("typo0.com"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
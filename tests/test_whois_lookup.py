@@ -1,6 +1,6 @@
 import unittest
 from unittest.mock import patch, MagicMock
-from whois_lookup import get_whois_info, format_whois_date, display_whois_info
+from whois_lookup import get_whois_info, format_whois_date, display_whois_info, parse_whois_date
 from datetime import datetime
 
 class TestWhoisLookup(unittest.TestCase):
@@ -50,6 +50,21 @@ class TestWhoisLookup(unittest.TestCase):
         formatted_date = format_whois_date(None)
         self.assertEqual(formatted_date, "---")
 
+    def test_parse_whois_date_formats(self):
+        self.assertEqual(parse_whois_date("2023-01-01"), datetime(2023, 1, 1))
+        self.assertEqual(parse_whois_date("2023-01-01T10:00:00Z"), datetime(2023, 1, 1, 10))
+        self.assertEqual(parse_whois_date("2023-01-01T10:00:00+02:00"), datetime(2023, 1, 1, 8))
+        self.assertEqual(parse_whois_date("01-Jan-2023"), datetime(2023, 1, 1))
+        self.assertEqual(parse_whois_date("2023.01.01 12:00:00"), datetime(2023, 1, 1, 12))
+        self.assertIsNone(parse_whois_date("---"))
+        self.assertIsNone(parse_whois_date("not a date"))
+
+    def test_parse_whois_date_several_dates(self):
+        dates = [datetime(2024, 1, 1, 12, 0, 0), datetime(2023, 1, 1, 12, 0, 0)]
+        self.assertEqual(parse_whois_date(dates), datetime(2023, 1, 1, 12))
+        self.assertEqual(parse_whois_date(str(dates), pick=max), datetime(2024, 1, 1, 12))
+        self.assertEqual(parse_whois_date(format_whois_date(dates)), datetime(2023, 1, 1, 12))
+
     @patch("builtins.print")
     def test_display_whois_info(self, mock_print):
         whois_data = {
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from wordlists import LISTS_DIR, get_wordlists, load_wordlists
+
+
+class TestWordlists(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        for file_name in os.listdir(LISTS_DIR):
+            shutil.copy(os.path.join(LISTS_DIR, file_name), self.tmp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_load_wordlists(self):
+        bundle = load_wordlists(self.tmp_dir)
+        self.assertIsInstance(bundle.tlds, tuple)
+        self.assertIn("com", bundle.tlds)
+        self.assertEqual(len(bundle.tlds), len(set(bundle.tlds)))
+        self.assertIn("a", bundle.keyboard_map)
+        self.assertIsInstance(bundle.keyboard_map["a"], tuple)
+
+    def test_bundle_is_immutable(self):
+        bundle = get_wordlists(self.tmp_dir)
+        with self.assertRaises(TypeError):
+            bundle.keyboard_map["a"] = ("x",)
+        with self.assertRaises(AttributeError):
+            bundle.tlds = ()
+
+    def test_get_wordlists_is_cached(self):
+        self.assertIs(get_wordlists(self.tmp_dir), get_wordlists(self.tmp_dir))
+
+    def test_get_wordlists_reloads_on_change(self):
+        first = get_wordlists(self.tmp_dir)
+
+        tld_path = os.path.join(self.tmp_dir, "tlds_100.txt")
+        with open(tld_path, "a", encoding="utf-8") as file:
+            file.write(".example\n")
+        stat = os.stat(tld_path)
+        os.utime(tld_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        second = get_wordlists(self.tmp_dir)
+        self.assertIsNot(first, second)
+        self.assertIn("example", second.tlds)
+        self.assertNotEqual(first.version, second.version)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import gzip
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from dns_check import resolve_domains
+from tests.dns_stub_server import StubDNSServer
+from zone_index import ZoneIndex, ZoneIndexSet, build_zone_index, iter_zone_names, main
+
+# CZDS-style dump: absolute owners, no $ORIGIN, glue records below registered names
+CZDS_ZONE = """\
+example.\t86400\tin\tsoa\ta.nic.example. hostmaster.nic.example. 1 900 900 1800 86400
+example.\t172800\tin\tns\ta.nic.example.
+alpha.example.\t172800\tin\tns\tns1.alpha.example.
+alpha.example.\t172800\tin\tns\tns2.alpha.example.
+ns1.alpha.example.\t172800\tin\ta\t192.0.2.1
+Bravo.example.\t172800\tin\tns\tns.hoster.net.
+xn--bcher-kva.example.\t172800\tin\tns\tns.hoster.net.
+charlie.example.\t172800\tin\tds\t12345 8 2 ABCDEF
+"""
+
+# RFC 1035 master file: $ORIGIN, relative and omitted owners, a multi-line SOA and comments
+MASTER_ZONE = """\
+$ORIGIN test.
+$TTL 3600
+@   IN SOA ns.nic.test. admin.nic.test. (
+        2024010101 ; serial
+        7200 900 1209600 3600 )
+    IN NS ns.nic.test.
+shop        IN NS ns1.hoster.net.   ; registered
+            IN NS ns2.hoster.net.
+mail.shop   IN A 192.0.2.7
+bank.test.  IN NS ns1.hoster.net.
+"""
+
+
+class TestZoneIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def write(self, file_name, content, compress=False):
+        path = os.path.join(self.directory, file_name)
+        with (gzip.open(path, "wt") if compress else open(path, "w")) as file:
+            file.write(content)
+        return path
+
+    def test_iter_zone_names(self):
+        self.assertEqual(sorted(set(iter_zone_names(self.write("example.txt", CZDS_ZONE)))),
+                         ["alpha", "bravo", "charlie", "xn--bcher-kva"])
+        self.assertEqual(sorted(set(iter_zone_names(self.write("test.zone", MASTER_ZONE)))), ["bank", "shop"])
+
+    def test_build_and_lookup(self):
+        zone_path = self.write("example.txt.gz", CZDS_ZONE, compress=True)
+        index_path = os.path.join(self.directory, "zones", "example.zidx")
+        # chunk_size 2 forces several sorted runs that are merged on disk
+        self.assertEqual(build_zone_index(zone_path, index_path, chunk_size=2), 4)
+
+        index = ZoneIndex(index_path)
+        try:
+            self.assertEqual(index.origin, "example")
+            self.assertEqual(len(index), 4)
+            self.assertTrue(index.lookup("alpha.example"))
+            self.assertTrue(index.lookup("BRAVO.example."))
+            self.assertTrue(index.lookup("bücher.example"))
+            self.assertFalse(index.lookup("alph.example"))
+            self.assertFalse(index.lookup("zulu.example"))
+            self.assertFalse(index.lookup("aaa.example"))
+            # Subdomains and other zones cannot be answered from the index
+            self.assertIsNone(index.lookup("www.alpha.example"))
+            self.assertIsNone(index.lookup("alpha.com"))
+            self.assertEqual(os.listdir(os.path.dirname(index_path)), ["example.zidx"])
+        finally:
+            index.close()
+
+    def test_main_and_index_set(self):
+        zones_dir = os.path.join(self.directory, "zones")
+        status = main([self.write("example.txt", CZDS_ZONE), self.write("test.zone", MASTER_ZONE),
+                       "--output-dir", zones_dir])
+        self.assertEqual(status, 0)
+
+        zones = ZoneIndexSet(zones_dir)
+        self.assertEqual(sorted(zones.indexes), ["example", "test"])
+        self.assertTrue(zones.lookup("shop.test"))
+        self.assertFalse(zones.lookup("shoop.test"))
+        self.assertIsNone(zones.lookup("shop.com"))
+        self.assertFalse(ZoneIndexSet(os.path.join(self.directory, "missing")))
+
+    def test_resolve_domains_skips_dns_for_unlisted_names(self):
+        zones_dir = os.path.join(self.directory, "zones")
+        main([self.write("example.txt", CZDS_ZONE), "--output-dir", zones_dir])
+        server = StubDNSServer({"alpha.example": {"A": ["192.0.2.10"]}, "other.net": {"A": ["192.0.2.20"]}})
+        port = server.start()
+        try:
+            names = ["alpha.example", "alhpa.example", "alpah.example", "other.net"]
+            records = {r.name: r for r in resolve_domains(names, use_cache=False, zones=ZoneIndexSet(zones_dir),
+                                                           nameservers=["127.0.0.1"], port=port)}
+        finally:
+            server.stop()
+
+        self.assertEqual(sorted(records), sorted(names))
+        self.assertTrue(records["alpha.example"].is_live)
+        self.assertTrue(records["other.net"].is_live)
+        self.assertEqual(records["alhpa.example"].rcode, 3)
+        self.assertFalse(records["alpah.example"].is_live)
+        queried = {name for name, _, _ in server.queries}
+        self.assertNotIn("alhpa.example", queried)
+        self.assertNotIn("alpah.example", queried)
+
+    def test_unlisted_names_wait_for_the_consumer(self):
+        zones_dir = os.path.join(self.directory, "zones")
+        main([self.write("example.txt", CZDS_ZONE), "--output-dir", zones_dir])
+        pulled = []
+
+        def names():
+            for i in range(100000):
+                pulled.append(i)
+                yield f"unlisted{i}.example"
+
+        records = resolve_domains(names(), use_cache=False, zones=ZoneIndexSet(zones_dir),
+                                  nameservers=["127.0.0.1"], buffer_size=16, concurrency=4)
+        self.assertEqual(next(records).rcode, 3)
+        time.sleep(0.2)
+
+        # Answers for unlisted names go through the resolver's bounded buffer instead of piling up
+        self.assertLess(len(pulled), 100)
+        records.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
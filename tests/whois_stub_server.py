@@ -0,0 +1,54 @@
+import socketserver
+import threading
+import time
+from typing import Dict
+
+# Minimal port-43 WHOIS server for tests: answers maps lower-case queries to response text,
+# unknown queries get a registry-style "No match" answer. Every answer is delayed by delay seconds.
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class StubWhoisServer:
+    # queries lists every received query; max_in_flight is the highest number of concurrent connections
+
+    def __init__(self, answers: Dict[str, str], delay: float = 0.0):
+        self.answers = {query.lower(): text for query, text in answers.items()}
+        self.delay = delay
+        self.queries = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        self._server = None
+
+    def respond(self, query: str) -> str:
+        with self._lock:
+            self.queries.append(query)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            time.sleep(self.delay)
+            return self.answers.get(query.lower(), f'No match for "{query.upper()}".\r\n')
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def start(self) -> int:
+        stub = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                query = self.rfile.readline().decode("utf-8").strip()
+                self.wfile.write(stub.respond(query).encode("utf-8"))
+
+        self._server = _TCPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+        self.port = self._server.server_address[1]
+        return self.port
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
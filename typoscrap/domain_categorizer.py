@@ -4,15 +4,9 @@ import csv
 from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 from heuristics_keywords import HEURISTIC_KEYWORDS
-from domain_generator import (
-    generate_typo_domains,
-    load_tlds,
-    load_subdomains,
-    load_keyboard_proximity,
-    load_prefixes_and_suffixes,
-    load_similar_chars
-)
-from dns_check import check_domain_exists
+from domain_generator import iter_typo_candidates
+from dns_check import check_domains_exist
+from wordlists import get_wordlists
 from urllib.parse import quote_plus
 import os
 
@@ -108,25 +102,19 @@ def classify_domain_content(domain):
 # Full scanner using typo generation + classification + export
 
 def scan_and_classify_typo_domains(domain_name, writer):
-    base_dir = os.path.join(os.path.dirname(__file__), "lists")
-    tlds = load_tlds(os.path.join(base_dir, "tlds_100.txt"))
-    subdomains = load_subdomains(os.path.join(base_dir, "subdomains.txt"))
-    keyboard_map = load_keyboard_proximity(os.path.join(base_dir, "keyboard_proximity.txt"))
-    entries = load_prefixes_and_suffixes(os.path.join(base_dir, "prefixes_suffixes.txt"))
-    similar_chars = load_similar_chars(os.path.join(base_dir, "similar_chars.txt"))
-
-    typo_domains = generate_typo_domains(domain_name, tlds, similar_chars, keyboard_map, subdomains, entries)
-
-    for typo in typo_domains:
-        if check_domain_exists(typo):
-            if "-" in typo:
-                squatting_type = "prefix/suffix"
-            elif any(c in typo for c in ["0", "1", "@"]):
-                squatting_type = "visual"
-            elif any(c in typo for c in ["a", "s", "d", "f"]):
-                squatting_type = "keyboard"
-            else:
-                squatting_type = "unknown"
+    lists = get_wordlists()
+    techniques = {}
+
+    def candidates():
+        for candidate in iter_typo_candidates(domain_name, lists.tlds, lists.similar_chars, lists.keyboard_map,
+                                               lists.subdomains, lists.entries):
+            techniques[candidate.domain] = candidate.technique
+            yield candidate.domain
+
+    # Candidates are resolved concurrently while they are generated
+    for typo, exists in check_domains_exist(candidates()):
+        if exists:
+            squatting_type = techniques[typo]
 
             label, content, t_score, s_score, f_score = classify_domain_content(typo)
             writer.writerow([domain_name, typo, squatting_type, label, f"{t_score:.2f}", f"{s_score:.2f}", f"{f_score:.2f}", content])
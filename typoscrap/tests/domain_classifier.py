@@ -6,15 +6,9 @@ import socket
 import ssl
 from urllib.parse import urlparse
 from dotenv import load_dotenv
-from domain_generator import (
-    generate_typo_domains,
-    load_tlds,
-    load_subdomains,
-    load_keyboard_proximity,
-    load_prefixes_and_suffixes,
-    load_similar_chars
-)
-from dns_check import check_domain_exists
+from domain_generator import generate_typo_domains
+from dns_check import check_domains_exist
+from wordlists import get_wordlists
 
 # Ładowanie zmiennych środowiskowych
 load_dotenv()
@@ -85,18 +79,14 @@ def classify_content(content, status_code, cert_valid):
 def process_domain(base_domain, output_file):
     print(f"[INFO] Starting typo-scan for: {base_domain}")
 
-    base_dir = os.path.join(os.path.dirname(__file__), "lists")
-    tlds = load_tlds(os.path.join(base_dir, "tlds_100.txt"))
-    subdomains = load_subdomains(os.path.join(base_dir, "subdomains.txt"))
-    keyboard_map = load_keyboard_proximity(os.path.join(base_dir, "keyboard_proximity.txt"))
-    entries = load_prefixes_and_suffixes(os.path.join(base_dir, "prefixes_suffixes.txt"))
-    similar_chars = load_similar_chars(os.path.join(base_dir, "similar_chars.txt"))
+    lists = get_wordlists()
 
-    generated_domains = generate_typo_domains(base_domain, tlds, similar_chars, keyboard_map, subdomains, entries)
+    generated_domains = generate_typo_domains(base_domain, lists.tlds, lists.similar_chars, lists.keyboard_map,
+                                              lists.subdomains, lists.entries)
 
     print(f"[INFO] Generated {len(generated_domains)} typo domains.")
 
-    existing_domains = [d for d in generated_domains if check_domain_exists(d)]
+    existing_domains = [d for d, exists in check_domains_exist(generated_domains) if exists]
 
     print(f"[INFO] Found {len(existing_domains)} existing domains.")
 
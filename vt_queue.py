@@ -0,0 +1,366 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Mapping, Optional, Tuple
+
+from models import db, ScanDetails
+from reputation import VT_API_KEY, VTError, VirusTotalClient, vt_summary
+from reputation_cache import ReputationCache, get_reputation_cache
+
+# Shared by every scan, the scheduler and the web app; lives next to app.db like the WHOIS cache
+VT_QUEUE_PATH = os.getenv("VT_QUEUE_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", "vt_queue.db")
+
+# Public API plan: 4 lookups a minute and 500 a day, for all scans together
+VT_REQUESTS_PER_MINUTE = float(os.getenv("VT_REQUESTS_PER_MINUTE", 4))
+VT_DAILY_QUOTA = int(os.getenv("VT_DAILY_QUOTA", 500))
+VT_MAX_SCORE = 1  # only candidates within this Damerau-Levenshtein distance are sent to VT
+VT_PENDING = "pending"  # ScanDetails.reputation until the queued lookup is done
+
+LEASE_SECONDS = 120  # a claimed request whose worker died is handed out again after this
+MAX_ATTEMPTS = 3
+
+
+class VTQueue:
+    """ Persistent VirusTotal request queue shared by all processes through one SQLite file.
+    Requests are handed out lowest priority value first (the scanner uses the Damerau-Levenshtein
+    score), oldest first within a priority. Every lookup takes a token from a bucket stored in the
+    same file, refilled at rate_per_minute up to rate_per_minute tokens and capped at daily_quota
+    lookups per UTC day, so parallel scans together stay within the API plan. """
+
+    def __init__(self, path: Optional[str] = VT_QUEUE_PATH, rate_per_minute: float = VT_REQUESTS_PER_MINUTE,
+                 daily_quota: int = VT_DAILY_QUOTA, lease_seconds: float = LEASE_SECONDS):
+        self.path = path
+        self.rate_per_minute = rate_per_minute
+        self.daily_quota = daily_quota
+        self.lease_seconds = lease_seconds
+        self._lock = threading.Lock()
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Autocommit mode, read-modify-write steps run in explicit BEGIN IMMEDIATE transactions
+        self._db = sqlite3.connect(path or ":memory:", timeout=30, isolation_level=None, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS vt_requests "
+                         "(domain TEXT PRIMARY KEY, priority INTEGER NOT NULL, status TEXT NOT NULL, "
+                         "enqueued REAL NOT NULL, lease_until REAL, attempts INTEGER NOT NULL DEFAULT 0, "
+                         "attributes TEXT, error TEXT, completed REAL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_vt_requests_next ON vt_requests (status, priority, enqueued)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS vt_quota "
+                         "(id INTEGER PRIMARY KEY CHECK (id = 1), tokens REAL NOT NULL, updated REAL NOT NULL, "
+                         "day TEXT NOT NULL, used INTEGER NOT NULL)")
+
+    def _transaction(self, statements: Callable[[sqlite3.Connection], object]):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self._db)
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            self._db.execute("COMMIT")
+            return result
+
+    @staticmethod
+    def _key(domain: str) -> str:
+        return domain.lower().rstrip(".")
+
+    def enqueue(self, priorities: Mapping[str, int], now: Optional[float] = None) -> int:
+        # Queues domain -> priority; a domain already waiting keeps its place with the better priority.
+        # Returns how many domains were not waiting yet
+        now = time.time() if now is None else now
+
+        def statements(connection):
+            queued = 0
+            for domain, priority in priorities.items():
+                row = connection.execute("SELECT status, priority FROM vt_requests WHERE domain = ?",
+                                         (self._key(domain),)).fetchone()
+                if row is None:
+                    connection.execute("INSERT INTO vt_requests (domain, priority, status, enqueued) "
+                                       "VALUES (?, ?, 'pending', ?)", (self._key(domain), priority, now))
+                elif row[0] in ("pending", "running"):
+                    connection.execute("UPDATE vt_requests SET priority = ? WHERE domain = ?",
+                                       (min(row[1], priority), self._key(domain)))
+                    continue
+                else:
+                    connection.execute("UPDATE vt_requests SET priority = ?, status = 'pending', enqueued = ?, "
+                                       "attempts = 0, error = NULL WHERE domain = ?",
+                                       (priority, now, self._key(domain)))
+                queued += 1
+            return queued
+
+        return self._transaction(statements)
+
+    def claim(self, now: Optional[float] = None) -> Optional[str]:
+        # Next domain to look up, leased to the caller; None when nothing is waiting
+        now = time.time() if now is None else now
+
+        def statements(connection):
+            row = connection.execute("SELECT domain FROM vt_requests WHERE status = 'pending' "
+                                     "OR (status = 'running' AND lease_until < ?) "
+                                     "ORDER BY priority, enqueued LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            connection.execute("UPDATE vt_requests SET status = 'running', lease_until = ? WHERE domain = ?",
+                               (now + self.lease_seconds, row[0]))
+            return row[0]
+
+        return self._transaction(statements)
+
+    def release(self, domain: str):
+        # Puts a claimed domain back in its place, e.g. while waiting for quota
+        with self._lock:
+            self._db.execute("UPDATE vt_requests SET status = 'pending', lease_until = NULL WHERE domain = ?",
+                             (self._key(domain),))
+
+    def complete(self, domain: str, attributes: dict, now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            self._db.execute("UPDATE vt_requests SET status = 'done', attributes = ?, error = NULL, "
+                             "lease_until = NULL, completed = ?, attempts = attempts + 1 WHERE domain = ?",
+                             (json.dumps(attributes), now, self._key(domain)))
+
+    def fail(self, domain: str, error: str, retry: bool = True) -> bool:
+        # Records a failed lookup; returns True when the domain was queued again
+        def statements(connection):
+            row = connection.execute("SELECT attempts FROM vt_requests WHERE domain = ?",
+                                     (self._key(domain),)).fetchone()
+            attempts = (row[0] if row else 0) + 1
+            requeue = retry and attempts < MAX_ATTEMPTS
+            connection.execute("UPDATE vt_requests SET status = ?, error = ?, attempts = ?, lease_until = NULL "
+                               "WHERE domain = ?",
+                               ("pending" if requeue else "failed", error, attempts, self._key(domain)))
+            return requeue
+
+        return self._transaction(statements)
+
+    def result(self, domain: str) -> Optional[dict]:
+        # Attributes of the last finished lookup of domain
+        with self._lock:
+            row = self._db.execute("SELECT attributes FROM vt_requests WHERE domain = ? AND attributes IS NOT NULL",
+                                   (self._key(domain),)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def take_token(self, now: Optional[float] = None) -> float:
+        # Takes one lookup from the shared quota; 0 when taken, else seconds until one is available
+        now = time.time() if now is None else now
+        rate = self.rate_per_minute / 60
+        capacity = max(1.0, self.rate_per_minute)
+        day = datetime.utcfromtimestamp(now).strftime("%Y-%m-%d")
+
+        def statements(connection):
+            row = connection.execute("SELECT tokens, updated, day, used FROM vt_quota WHERE id = 1").fetchone()
+            tokens, updated, quota_day, used = row if row is not None else (capacity, now, day, 0)
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate)
+            if quota_day != day:
+                quota_day, used = day, 0
+            if used >= self.daily_quota:
+                midnight = datetime.strptime(day, "%Y-%m-%d") + timedelta(days=1)
+                wait = (midnight - datetime(1970, 1, 1)).total_seconds() - now
+            elif tokens >= 1:
+                tokens, used, wait = tokens - 1, used + 1, 0.0
+            else:
+                wait = (1 - tokens) / rate if rate > 0 else float("inf")
+            connection.execute("INSERT OR REPLACE INTO vt_quota (id, tokens, updated, day, used) "
+                               "VALUES (1, ?, ?, ?, ?)", (tokens, now, quota_day, used))
+            return wait
+
+        return self._transaction(statements)
+
+    def drain_tokens(self, now: Optional[float] = None):
+        # The API answered 429: nobody gets a token until the bucket refills
+        now = time.time() if now is None else now
+        with self._lock:
+            self._db.execute("UPDATE vt_quota SET tokens = 0, updated = ? WHERE id = 1", (now,))
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._db.execute("SELECT status, COUNT(*) FROM vt_requests GROUP BY status").fetchall())
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+def _lookup(client: VirusTotalClient, domain: str) -> dict:
+    # Attributes of domain, {} when VT has never seen it (a valid answer worth caching)
+    try:
+        return client.lookup(domain)
+    except VTError as e:
+        if e.status == 404:
+            return {}
+        raise
+
+
+def process_queue(queue: VTQueue, client: VirusTotalClient,
+                  on_result: Optional[Callable[[str, Optional[dict]], None]] = None,
+                  max_requests: Optional[int] = None, block: bool = True,
+                  stop: Optional[threading.Event] = None, poll_interval: float = 5.0,
+                  cache: Optional[ReputationCache] = None) -> int:
+    """ Looks up queued domains within the shared quota and returns how many requests were made.
+    Answers are stored in cache when given, and on_result(domain, attributes) is called for every
+    finished domain, attributes None when it failed for good. Without stop it returns once the queue
+    is empty (or, when block is False, once the quota is used up); with stop it waits for new requests
+    until stop is set. """
+    requests_made = 0
+
+    def wait(seconds):
+        if stop is not None:
+            stop.wait(seconds)
+        else:
+            time.sleep(seconds)
+
+    while max_requests is None or requests_made < max_requests:
+        if stop is not None and stop.is_set():
+            break
+        domain = queue.claim()
+        if domain is None:
+            if stop is None:
+                break
+            wait(poll_interval)
+            continue
+        token_wait = queue.take_token()
+        if token_wait > 0:
+            queue.release(domain)
+            if not block and stop is None:
+                break
+            wait(min(token_wait, poll_interval) if stop is not None else token_wait)
+            continue
+
+        requests_made += 1
+        try:
+            attributes = _lookup(client, domain)
+        except VTError as e:
+            if e.status == 429:
+                print(f"[WARNING] VirusTotal quota exceeded, {domain} stays queued.")
+                queue.release(domain)
+                queue.drain_tokens()
+                continue
+            # Rejected keys and requests are final, network and server errors are retried
+            retry = e.status is None or e.status >= 500
+            print(f"[ERROR] {e}")
+            if queue.fail(domain, str(e), retry):
+                continue
+            attributes = None
+        else:
+            queue.complete(domain, attributes)
+            if cache is not None:
+                cache.put(domain, attributes)
+
+        if on_result is not None:
+            try:
+                on_result(domain, attributes)
+            except Exception as e:
+                print(f"[ERROR] Failed to store VirusTotal result of {domain}: {e}")
+    return requests_made
+
+
+def cached_reputation(domain: str, priority: int, fingerprint: Optional[str] = None,
+                      cache: Optional[ReputationCache] = None, queue: Optional[VTQueue] = None) -> Optional[dict]:
+    # VT summary of domain from the reputation cache, None when it was never fetched.
+    # Stale entries are served as well and a background refresh is queued for them
+    cache = cache or get_reputation_cache()
+    entry = cache.get(domain, fingerprint)
+    if entry is None:
+        return None
+    if entry.stale:
+        (queue or get_vt_queue()).enqueue({domain: priority})
+    return vt_summary(domain, entry.attributes)
+
+
+def fetch_reputation_now(domain: str, priority: int, queue: Optional[VTQueue] = None,
+                         client: Optional[VirusTotalClient] = None,
+                         cache: Optional[ReputationCache] = None, enqueue: bool = True) -> Optional[dict]:
+    # VT summary of domain when the shared quota has a lookup left right now, else queues it (with enqueue)
+    # and returns None
+    queue = queue or get_vt_queue()
+    client = client or get_vt_client()
+    if client is None:
+        return None
+    if queue.take_token() > 0:
+        if enqueue:
+            queue.enqueue({domain: priority})
+        return None
+    try:
+        attributes = _lookup(client, domain)
+    except VTError as e:
+        print(f"[ERROR] {e}")
+        if e.status == 429:
+            queue.drain_tokens()
+            if enqueue:
+                queue.enqueue({domain: priority})
+        return {"error": str(e)}
+    queue.enqueue({domain: priority})
+    queue.complete(domain, attributes)
+    (cache or get_reputation_cache()).put(domain, attributes)
+    return vt_summary(domain, attributes)
+
+
+def store_vt_result(domain: str, attributes: Optional[dict]):
+    # Fills the reputation of scan details still waiting for domain. Needs an app context
+    reputation = vt_summary(domain, attributes).get("reputation") if attributes is not None else None
+    ScanDetails.query.filter_by(domain_name=domain, reputation=VT_PENDING).update(
+        {"reputation": str(reputation) if reputation is not None else "---"}, synchronize_session=False)
+    db.session.commit()
+
+
+def start_vt_worker(app, queue: Optional[VTQueue] = None, client: Optional[VirusTotalClient] = None,
+                    cache: Optional[ReputationCache] = None) -> Optional[Tuple[threading.Thread, threading.Event]]:
+    # Background thread that works through the queue and writes results into the reputation cache
+    # and ScanDetails; None without an API key. One worker per process, a second call returns the first
+    global _vt_worker
+    queue = queue or get_vt_queue()
+    cache = cache or get_reputation_cache()
+    client = client or get_vt_client()
+    if client is None:
+        print("[WARNING] VIRUSTOTAL_API_KEY is not set, queued reputation checks are not processed.")
+        return None
+
+    def on_result(domain, attributes):
+        with app.app_context():
+            store_vt_result(domain, attributes)
+
+    # The check, the start and the assignment form one step, so concurrent callers cannot start two workers
+    with _lock:
+        if vt_worker_running():
+            return _vt_worker
+        stop = threading.Event()
+        thread = threading.Thread(target=process_queue, name="vt-worker", daemon=True,
+                                  kwargs={"queue": queue, "client": client, "on_result": on_result, "stop": stop,
+                                          "cache": cache})
+        thread.start()
+        _vt_worker = (thread, stop)
+    print(f"[INFO] VirusTotal worker started, {queue.counts().get('pending', 0)} requests waiting.")
+    return thread, stop
+
+
+def vt_worker_running() -> bool:
+    # Whether queued lookups are processed by a worker of this process
+    return _vt_worker is not None and _vt_worker[0].is_alive() and not _vt_worker[1].is_set()
+
+
+_vt_queue: Optional[VTQueue] = None
+_vt_client: Optional[VirusTotalClient] = None
+_vt_worker: Optional[Tuple[threading.Thread, threading.Event]] = None
+_lock = threading.Lock()
+
+
+def get_vt_queue() -> VTQueue:
+    # Process-wide queue stored in VT_QUEUE_PATH
+    global _vt_queue
+    if _vt_queue is None:
+        with _lock:
+            if _vt_queue is None:
+                _vt_queue = VTQueue()
+    return _vt_queue
+
+
+def get_vt_client() -> Optional[VirusTotalClient]:
+    # Process-wide client sharing one connection pool, None without VIRUSTOTAL_API_KEY
+    global _vt_client
+    if _vt_client is None and VT_API_KEY:
+        with _lock:
+            if _vt_client is None:
+                _vt_client = VirusTotalClient(VT_API_KEY)
+    return _vt_client
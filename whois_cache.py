@@ -0,0 +1,190 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Shared by every scan and the scheduler; lives next to app.db like the DNS cache
+WHOIS_CACHE_PATH = os.getenv("WHOIS_CACHE_PATH") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", "whois_cache.db")
+
+WHOIS_CACHE_TTL = int(os.getenv("WHOIS_CACHE_TTL", 7 * 86400))  # registration data changes rarely
+WHOIS_FAILURE_TTL = int(os.getenv("WHOIS_FAILURE_TTL", 3600))  # throttled or failed lookups are retried sooner
+LEASE_SECONDS = 60  # how long other callers wait for a lookup in progress before doing it themselves
+
+
+class WhoisCache:
+    """ Persistent WHOIS answers keyed by registrable domain. Successful lookups live for ttl seconds,
+    failures for failure_ttl. get_or_fetch_many lets only one caller per key run the lookup: other threads
+    wait for its in-flight event, other processes on a lease row in the SQLite file, and both read its
+    result. """
+
+    def __init__(self, path: Optional[str] = WHOIS_CACHE_PATH, ttl: int = WHOIS_CACHE_TTL,
+                 failure_ttl: int = WHOIS_FAILURE_TTL, lease_seconds: float = LEASE_SECONDS,
+                 poll_interval: float = 0.2):
+        self.path = path
+        self.ttl = ttl
+        self.failure_ttl = failure_ttl
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._in_flight: Dict[str, threading.Event] = {}
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path or ":memory:", timeout=10, check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS whois_cache "
+                         "(key TEXT PRIMARY KEY, data TEXT NOT NULL, failed INTEGER NOT NULL, expires REAL NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS whois_leases (key TEXT PRIMARY KEY, expires REAL NOT NULL)")
+        self._db.commit()
+
+    @staticmethod
+    def _key(domain: str) -> str:
+        return domain.lower().rstrip(".")
+
+    def get(self, domain: str, now: Optional[float] = None) -> Optional[dict]:
+        now = time.time() if now is None else now
+        with self._lock:
+            row = self._db.execute("SELECT data FROM whois_cache WHERE key = ? AND expires > ?",
+                                   (self._key(domain), now)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def put(self, domain: str, data: dict, failed: bool = False, now: Optional[float] = None):
+        ttl = self.failure_ttl if failed else self.ttl
+        if ttl <= 0:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO whois_cache (key, data, failed, expires) VALUES (?, ?, ?, ?)",
+                             (self._key(domain), json.dumps(data), int(failed), now + ttl))
+            self._db.commit()
+
+    def _acquire_lease(self, key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self._db.execute("DELETE FROM whois_leases WHERE key = ? AND expires <= ?", (key, now))
+            cursor = self._db.execute("INSERT OR IGNORE INTO whois_leases (key, expires) VALUES (?, ?)",
+                                      (key, now + self.lease_seconds))
+            self._db.commit()
+            return cursor.rowcount == 1
+
+    def _release_lease(self, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM whois_leases WHERE key = ?", (key,))
+            self._db.commit()
+
+    def _claim(self, key: str) -> Optional[threading.Event]:
+        # The in-flight event of key when this caller now owns its lookup, None when someone else does
+        with self._lock:
+            if key in self._in_flight:
+                return None
+            event = self._in_flight[key] = threading.Event()
+        if self._acquire_lease(key):
+            return event
+        self._finish(key)
+        return None
+
+    def _finish(self, key: str):
+        with self._lock:
+            event = self._in_flight.pop(key, None)
+        if event is not None:
+            event.set()
+
+    def get_or_fetch_many(self, domains: Iterable[str],
+                          fetch_many: Callable[[List[str]], Dict[str, Tuple[dict, bool]]]) -> Dict[str, dict]:
+        """ Cached data of every domain (keyed as given). The rest is looked up with
+        fetch_many(keys) -> {key: (data, failed)} and stored, but only for the keys this caller owns:
+        keys another thread or process is already looking up are waited for, and taken over when
+        their lease expires without a result. """
+        keys = {domain: self._key(domain) for domain in domains}
+        results: Dict[str, dict] = {}
+        pending = list(dict.fromkeys(keys.values()))
+        while pending:
+            waiting = []
+            owned = []
+            for key in pending:
+                cached = self.get(key)
+                if cached is not None:
+                    self.hits += 1
+                    results[key] = cached
+                elif self._claim(key) is not None:
+                    owned.append(key)
+                else:
+                    waiting.append(key)
+
+            if owned:
+                self.misses += len(owned)
+                try:
+                    fetched = fetch_many(owned)
+                    for key in owned:
+                        data, failed = fetched[key]
+                        self.put(key, data, failed)
+                        results[key] = data
+                finally:
+                    for key in owned:
+                        self._release_lease(key)
+                        self._finish(key)
+
+            pending = self._wait_for(waiting, results)
+        return {domain: results[key] for domain, key in keys.items()}
+
+    def _wait_for(self, keys: List[str], results: Dict[str, dict]) -> List[str]:
+        # Waits for lookups owned by others; returns the keys that need a lookup of their own: no result
+        # was stored (failure_ttl 0) or the other lookup died and its lease expired
+        left = []
+        for key in keys:
+            deadline = time.monotonic() + self.lease_seconds
+            while True:
+                with self._lock:
+                    event = self._in_flight.get(key)
+                if event is not None:
+                    event.wait(max(deadline - time.monotonic(), 0))
+                cached = self.get(key)
+                if cached is not None:
+                    self.hits += 1
+                    results[key] = cached
+                    break
+                if time.monotonic() >= deadline:
+                    print(f"[WARNING] WHOIS lease for {key} expired, looking it up again.")
+                    left.append(key)
+                    break
+                if event is not None or self._lease_free(key):
+                    left.append(key)
+                    break
+                time.sleep(self.poll_interval)
+        return left
+
+    def _lease_free(self, key: str) -> bool:
+        with self._lock:
+            row = self._db.execute("SELECT 1 FROM whois_leases WHERE key = ? AND expires > ?",
+                                   (key, time.time())).fetchone()
+        return row is None
+
+    def clear(self):
+        with self._lock:
+            self._db.execute("DELETE FROM whois_cache")
+            self._db.execute("DELETE FROM whois_leases")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+_whois_cache: Optional[WhoisCache] = None
+_lock = threading.Lock()
+
+
+def get_whois_cache() -> WhoisCache:
+    # Process-wide cache stored in WHOIS_CACHE_PATH
+    global _whois_cache
+    if _whois_cache is None:
+        with _lock:
+            if _whois_cache is None:
+                _whois_cache = WhoisCache()
+    return _whois_cache
@@ -0,0 +1,325 @@
+import asyncio
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import urlparse
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from whois.parser import WhoisEntry
+from whois.whois import NICClient
+
+from dns_resolver import UpstreamRate, parse_nameserver
+from public_suffix import get_public_suffix_list
+from rdap_client import RDAPClient, RDAPError, get_rdap_client, merge_rdap_records, needs_registrar_data
+from whois_cache import get_whois_cache
+from whois_lookup import empty_whois_info, whois_info_from_entry, whois_info_from_rdap
+
+WHOIS_PORT = 43
+MAX_RESPONSE = 1 << 20
+
+# Thin registries (com, net, ...) name the registrar's server that holds the full record
+_REFERRAL = re.compile(r"^\s*(?:Registrar WHOIS Server|Whois Server|ReferralServer|refer):\s*(?:r?whois://)?([^\s/]+)",
+                       re.IGNORECASE | re.MULTILINE)
+_THROTTLED = re.compile(r"limit exceeded|too many (?:requests|queries)|try again later|quota exceeded",
+                        re.IGNORECASE)
+
+
+class WhoisError(Exception):
+    pass
+
+
+@dataclass
+class ServerStats:
+    # Counters of one WHOIS server during a fetch
+    queries: int = 0
+    errors: int = 0
+    referrals: int = 0
+    seconds: float = 0.0
+
+    @property
+    def average_latency_ms(self) -> float:
+        return self.seconds / self.queries * 1000 if self.queries else 0.0
+
+
+class _ServerGroup:
+    # Everything sent to one server shares its concurrency limit and its (AIMD) request rate
+
+    def __init__(self, concurrency: int, rate: float):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.rate = UpstreamRate(rate, min_rate=min(rate, 0.05), max_rate=rate, increase=rate / 10)
+        self.stats = ServerStats()
+
+
+class WhoisFetcher:
+    """ Concurrent registration data client. With an RDAPClient, domains whose TLD has an RDAP service
+    are looked up over RDAP first; everything else, and RDAP failures, go to port-43 WHOIS. An RDAP 404
+    means the domain is not registered. Thin registry records are completed from the registrar's RDAP
+    server, or from the WHOIS referral when the registry names none.
+    Queries are grouped by the server they go to: the RDAP host, the WHOIS server of the TLD, or the
+    registrar server it refers to. Each server gets its own concurrency limit and request rate (halved
+    when it throttles or fails), so a slow registrar only delays its own domains. servers maps TLDs
+    to "host" or "host:port" and overrides the built-in WHOIS server choice. """
+
+    def __init__(self, servers: Optional[Dict[str, str]] = None, per_server_concurrency: int = 2,
+                 per_server_rate: float = 1.0, timeout: float = 10.0, follow_referrals: bool = True,
+                 rdap: Optional[RDAPClient] = None, rdap_concurrency: int = 8, rdap_rate: float = 10.0):
+        self.servers = dict(servers or {})
+        self.per_server_concurrency = per_server_concurrency
+        self.per_server_rate = per_server_rate
+        self.timeout = timeout
+        self.follow_referrals = follow_referrals
+        self.rdap = rdap
+        self.rdap_concurrency = rdap_concurrency
+        self.rdap_rate = rdap_rate
+        self._groups: Dict[str, _ServerGroup] = {}
+        self._tld_servers: Dict[str, asyncio.Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def _group(self, server: str, concurrency: Optional[int] = None, rate: Optional[float] = None) -> _ServerGroup:
+        group = self._groups.get(server)
+        if group is None:
+            group = self._groups[server] = _ServerGroup(concurrency or self.per_server_concurrency,
+                                                        rate or self.per_server_rate)
+        return group
+
+    async def query_rdap(self, domain: str, url: str):
+        # One RDAP request on the pooled session, run in a worker thread; 404 does not slow the server down
+        group = self._group(urlparse(url).netloc, self.rdap_concurrency, self.rdap_rate)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.rdap.pool_size, thread_name_prefix="rdap")
+        async with group.semaphore:
+            await group.rate.acquire()
+            started = time.monotonic()
+            group.stats.queries += 1
+            try:
+                record = await asyncio.get_running_loop().run_in_executor(self._executor, self.rdap.get, domain, url)
+            except RDAPError as e:
+                group.stats.errors += 1
+                if e.status != 404:
+                    group.rate.on_failure()
+                raise
+            finally:
+                group.stats.seconds += time.monotonic() - started
+            group.rate.on_success()
+            return record
+
+    async def registry_server(self, domain: str) -> Optional[str]:
+        # WHOIS server of the domain's TLD; python-whois may ask whois.iana.org, so it runs in a thread once per TLD
+        tld = domain.rsplit(".", 1)[-1]
+        if tld in self.servers:
+            return self.servers[tld]
+        future = self._tld_servers.get(tld)
+        if future is None:
+            future = self._tld_servers[tld] = asyncio.get_running_loop().run_in_executor(
+                None, NICClient().choose_server, domain)
+        try:
+            return await asyncio.shield(future)
+        except OSError as e:
+            raise WhoisError(f"No WHOIS server for .{tld}: {e}")
+
+    async def _exchange(self, server: str, query: str) -> str:
+        host, port = parse_nameserver(server, WHOIS_PORT)
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(host, port), self.timeout)
+        try:
+            writer.write(query.encode("utf-8") + b"\r\n")
+            await writer.drain()
+            response = b""
+            while len(response) < MAX_RESPONSE:
+                data = await asyncio.wait_for(reader.read(65536), self.timeout)
+                if not data:
+                    break
+                response += data
+            return response.decode("utf-8", errors="replace")
+        finally:
+            writer.close()
+
+    async def query(self, server: str, domain: str) -> str:
+        # One request to server, paced and counted in the server's group
+        group = self._group(server)
+        async with group.semaphore:
+            await group.rate.acquire()
+            started = time.monotonic()
+            group.stats.queries += 1
+            try:
+                text = await self._exchange(server, domain)
+                if 'with "=xxx"' in text:
+                    # Verisign lists every name server match unless the query asks for the exact domain
+                    await group.rate.acquire()
+                    text = await self._exchange(server, "=" + domain)
+            except (asyncio.TimeoutError, OSError) as e:
+                group.stats.errors += 1
+                group.rate.on_failure()
+                raise WhoisError(f"{server} failed for {domain}: {str(e) or type(e).__name__}")
+            finally:
+                group.stats.seconds += time.monotonic() - started
+
+            if not text.strip() or _THROTTLED.search(text):
+                group.stats.errors += 1
+                group.rate.on_failure()
+                raise WhoisError(f"{server} refused or throttled the query for {domain}")
+            group.rate.on_success()
+            return text
+
+    async def fetch(self, domain: str) -> Tuple[dict, bool]:
+        # (scan fields, failed) of domain; WHOIS registry and registrar answers are parsed together
+        # Never raises, so one bad domain cannot lose the rest of a batch
+        try:
+            url = self.rdap.domain_url(domain) if self.rdap is not None else None
+            if url:
+                try:
+                    return await self.fetch_rdap(domain, url), False
+                except RDAPError as e:
+                    if e.status == 404:
+                        # The registry does not know the domain, WHOIS would not either
+                        return empty_whois_info(domain), False
+                    print(f"[WARNING] {e}, falling back to WHOIS.")
+            return await self.fetch_whois(domain)
+        except Exception as e:
+            print(f"[ERROR] Registration data lookup failed for {domain}: {e}")
+            return empty_whois_info(domain), True
+
+    async def fetch_rdap(self, domain: str, url: str) -> dict:
+        # Thin registries only hold the registrar: its RDAP server (the "related" link) or, without one,
+        # the WHOIS referral supplies the registrant country and contacts
+        record = await self.query_rdap(domain, url)
+        if not needs_registrar_data(record):
+            return whois_info_from_rdap(record)
+        if record.related:
+            try:
+                return whois_info_from_rdap(merge_rdap_records(record, await self.query_rdap(domain, record.related)))
+            except RDAPError as e:
+                print(f"[WARNING] RDAP registrar lookup failed: {e}")
+        whois_info = whois_info_from_rdap(record)
+        if self.follow_referrals:
+            fallback, failed = await self.fetch_whois(domain)
+            if not failed:
+                for field in ("country", "emails", "registrar"):
+                    if whois_info[field] == "---":
+                        whois_info[field] = fallback[field]
+        return whois_info
+
+    async def fetch_whois(self, domain: str) -> Tuple[dict, bool]:
+        try:
+            server = await self.registry_server(domain)
+            if not server:
+                raise WhoisError(f"No WHOIS server for {domain}")
+            text = await self.query(server, domain)
+            if self.follow_referrals:
+                match = _REFERRAL.search(text)
+                referral = match.group(1).lower() if match else None
+                if referral and referral != server.lower():
+                    self._group(server).stats.referrals += 1
+                    try:
+                        text += "\n" + await self.query(referral, domain)
+                    except WhoisError as e:
+                        # The registry record alone still has the dates and name servers
+                        print(f"[WARNING] WHOIS referral failed: {e}")
+            return whois_info_from_entry(domain, WhoisEntry.load(domain, text)), False
+        except Exception as e:
+            print(f"[ERROR] WHOIS lookup failed for {domain}: {e}")
+            return empty_whois_info(domain), True
+
+    def server_stats(self) -> Dict[str, ServerStats]:
+        return {server: group.stats for server, group in self._groups.items()}
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+
+def report_server_stats(stats: Dict[str, ServerStats]):
+    for server, counters in sorted(stats.items()):
+        print(f"[INFO] WHOIS {server}: {counters.queries} queries, {counters.errors} errors, "
+              f"{counters.referrals} referrals, {counters.average_latency_ms:.0f} ms average")
+
+
+class WhoisSession:
+    """ One WhoisFetcher running on its own event loop thread. Every fetch_whois_many call made with the
+    session, from any thread, goes through the same server groups, so per-server concurrency limits
+    and AIMD rates hold across the batches of a whole scan instead of restarting with each batch. """
+
+    def __init__(self, use_rdap: bool = True, **fetcher_options):
+        if use_rdap:
+            fetcher_options.setdefault("rdap", get_rdap_client())
+        self.fetcher = WhoisFetcher(**fetcher_options)
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="whois-session", daemon=True)
+        self._thread.start()
+
+    def fetch_all(self, domains: Iterable[str]) -> List[Tuple[dict, bool]]:
+        # (scan fields, failed) of every domain, in order
+        async def fetch_all():
+            return await asyncio.gather(*(self.fetcher.fetch(domain) for domain in domains))
+
+        return asyncio.run_coroutine_threadsafe(fetch_all(), self._loop).result()
+
+    def server_stats(self) -> Dict[str, ServerStats]:
+        return self.fetcher.server_stats()
+
+    def close(self):
+        if self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        self.fetcher.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def fetch_whois_many(domains: Iterable[str], cache=None, use_cache: bool = True, use_rdap: bool = True,
+                     stats: Optional[Dict[str, ServerStats]] = None, session: Optional[WhoisSession] = None,
+                     **fetcher_options) -> Dict[str, dict]:
+    """ Registration data of every domain, keyed by domain. Lookups are made once per registrable domain,
+    answers still in the WHOIS cache are reused, and the rest are fetched concurrently by a WhoisFetcher
+    (fetcher_options: servers, per_server_concurrency, per_server_rate, timeout, follow_referrals, rdap, ...)
+    and stored in the cache; a domain another scan or thread is already looking up is waited for instead
+    (WhoisCache.get_or_fetch_many). With use_rdap the shared RDAP client is tried before WHOIS.
+    session, when given, is used instead of a fetcher of this call alone (fetcher_options are then
+    ignored) and the caller reports its server stats. stats, when given, receives the per-server counters. """
+    domains = list(domains)
+    if not domains:
+        return {}
+    cache = cache or (get_whois_cache() if use_cache else None)
+    public_suffixes = get_public_suffix_list()
+    keys = {domain: public_suffixes.get_registrable_domain(domain) or domain.lower().rstrip(".")
+            for domain in domains}
+
+    own_session = session is None
+    fetched_keys: List[str] = []
+
+    def fetch_many(missing: List[str]) -> Dict[str, Tuple[dict, bool]]:
+        nonlocal session
+        if session is None:
+            session = WhoisSession(use_rdap, **fetcher_options)
+        fetched_keys.extend(missing)
+        return dict(zip(missing, session.fetch_all(missing)))
+
+    # Through the cache only keys nobody else is looking up are fetched here, the rest are waited for
+    started = time.monotonic()
+    unique_keys = list(dict.fromkeys(keys.values()))
+    try:
+        if cache is not None:
+            results = cache.get_or_fetch_many(unique_keys, fetch_many)
+        else:
+            results = {key: whois_info for key, (whois_info, _) in fetch_many(unique_keys).items()}
+    finally:
+        if own_session and session is not None:
+            session.close()
+
+    if fetched_keys:
+        print(f"[INFO] Fetched WHOIS for {len(fetched_keys)} domains in {time.monotonic() - started:.1f}s, "
+              f"{len(results) - len(fetched_keys)} from cache.")
+        if own_session:
+            report_server_stats(session.server_stats())
+    if stats is not None and session is not None:
+        stats.update(session.server_stats())
+
+    return {domain: dict(results[key], domain_name=domain) for domain, key in keys.items()}
@@ -1,6 +1,116 @@
 import datetime
+import re
 import whois
-from datetime import datetime
+from datetime import date, datetime, timezone
+
+
+_WHOIS_DATE_FORMATS = (
+    "%Y-%m-%d %H:%M:%S %Z",
+    "%d-%b-%Y",
+    "%d-%b-%Y %H:%M:%S",
+    "%d.%m.%Y",
+    "%d.%m.%Y %H:%M:%S",
+    "%Y.%m.%d",
+    "%Y.%m.%d %H:%M:%S",
+    "%Y/%m/%d",
+    "%Y/%m/%d %H:%M:%S",
+    "%d/%m/%Y",
+    "%Y%m%d",
+)
+# str() of a list of dates as stored by older scans: "[datetime.datetime(2024, 1, 2, 0, 0), ...]"
+_DATETIME_REPR = re.compile(r"datetime\.datetime\(([\d,\s]+)")
+
+
+def parse_whois_date(value, pick=min):
+    """ Normalises a WHOIS or RDAP date to a naive UTC datetime, None when it cannot be parsed.
+    Accepts datetimes, ISO 8601 and common registry formats, and lists of them (python-whois returns
+    one date per source) or their string form; several dates are reduced with pick. """
+    if value is None:
+        return None
+    if isinstance(value, (list, tuple)):
+        dates = [parsed for parsed in (parse_whois_date(item) for item in value) if parsed is not None]
+        return pick(dates) if dates else None
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+
+    text = str(value).strip()
+    if not text or text in ("---", "None"):
+        return None
+    reprs = _DATETIME_REPR.findall(text)
+    if reprs:
+        return pick(datetime(*[int(part) for part in fields.split(",") if part.strip()][:6]) for fields in reprs)
+    if "," in text:
+        # format_whois_date joins several dates with ", "
+        dates = [parse_whois_date(part) for part in text.split(",")]
+        if all(dates):
+            return pick(dates)
+    try:
+        return parse_whois_date(datetime.fromisoformat(text.replace("Z", "+00:00")))
+    except ValueError:
+        pass
+    for date_format in _WHOIS_DATE_FORMATS:
+        try:
+            return parse_whois_date(datetime.strptime(text, date_format))
+        except ValueError:
+            continue
+    return None
+
+
+def _fetch_whois_info(domain_name):
+    # One python-whois lookup, errors are raised to the caller
+    return whois_info_from_entry(domain_name, whois.whois(domain_name))
+
+
+def whois_info_from_entry(domain_name, domain_info):
+    # Scan fields of a parsed python-whois entry
+    name_servers = domain_info.name_servers
+    if isinstance(name_servers, list):
+        name_servers = ", ".join(name_servers)
+    elif isinstance(name_servers, str):
+        pass
+    else:
+        name_servers = "---"
+    return {
+        "domain_name": domain_name,
+        "creation_date": str(domain_info.creation_date) if domain_info.creation_date else "---",
+        "expiration_date": str(domain_info.expiration_date) if domain_info.expiration_date else "---",
+        "updated_date": str(domain_info.updated_date) if domain_info.updated_date else "---",
+        "name_servers": name_servers,
+        "registrar": str(domain_info.registrar) if domain_info.registrar else "---",
+        "emails": str(domain_info.emails) if domain_info.emails else "---",
+        "country": str(domain_info.country) if domain_info.country else "---"
+    }
+
+
+def whois_info_from_rdap(record):
+    # Scan fields of an rdap_client.RDAPRecord, dates in the same "YYYY-MM-DD HH:MM:SS" form as WHOIS ones
+    return {
+        "domain_name": record.domain,
+        "creation_date": str(record.creation_date) if record.creation_date else "---",
+        "expiration_date": str(record.expiration_date) if record.expiration_date else "---",
+        "updated_date": str(record.updated_date) if record.updated_date else "---",
+        "name_servers": ", ".join(record.name_servers) if record.name_servers else "---",
+        "registrar": record.registrar or "---",
+        "emails": ", ".join(record.emails) if record.emails else "---",
+        "country": record.country or "---"
+    }
+
+
+def empty_whois_info(domain_name):
+    return {
+        "domain_name": domain_name,
+        "creation_date": "---",
+        "expiration_date": "---",
+        "updated_date": "---",
+        "name_servers": "---",
+        "registrar": "---",
+        "emails": "---",
+        "country": "---"
+    }
 
 
 def get_whois_info(domain_name):
@@ -9,34 +119,10 @@ def get_whois_info(domain_name):
         raise ValueError(f"Expected string for domain_name, got {type(domain_name)}")
 
     try:
-        domain_info = whois.whois(domain_name)
-        name_servers = domain_info.name_servers
-        if isinstance(name_servers, list):
-            name_servers = ", ".join(name_servers)
-        elif isinstance(name_servers, str):
-            pass
-        else:
-            name_servers = "---"
-        return {
-            "domain_name": domain_name,
-            "creation_date": str(domain_info.creation_date) if domain_info.creation_date else "---",
-            "expiration_date": str(domain_info.expiration_date) if domain_info.expiration_date else "---",
-            "name_servers": name_servers,
-            "registrar": str(domain_info.registrar) if domain_info.registrar else "---",
-            "emails": str(domain_info.emails) if domain_info.emails else "---",
-            "country": str(domain_info.country) if domain_info.country else "---"
-        }
+        return _fetch_whois_info(domain_name)
     except Exception as e:
         print(f"[ERROR] WHOIS lookup failed for {domain_name}: {e}")
-        return {
-            "domain_name": domain_name,
-            "creation_date": "---",
-            "expiration_date": "---",
-            "name_servers": "---",
-            "registrar": "---",
-            "emails": "---",
-            "country": "---"
-        }
+        return empty_whois_info(domain_name)
         print(f"[INFO] WHOIS data collected for {domain_name}.")
         return whois_data
 
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import threading
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+
+from domain_generator import (
+    load_tlds,
+    load_subdomains,
+    load_keyboard_proximity,
+    load_prefixes_and_suffixes,
+    load_similar_chars
+)
+
+LISTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "lists")
+
+LIST_FILES = {
+    "tlds": "tlds_100.txt",
+    "subdomains": "subdomains.txt",
+    "keyboard_map": "keyboard_proximity.txt",
+    "entries": "prefixes_suffixes.txt",
+    "similar_chars": "similar_chars.txt",
+}
+
+
+@dataclass(frozen=True)
+class WordlistBundle:
+    # Immutable set of parsed word lists shared by every scan in the process
+    tlds: Tuple[str, ...]
+    subdomains: Tuple[str, ...]
+    keyboard_map: Mapping[str, Tuple[str, ...]]
+    entries: Tuple[str, ...]
+    similar_chars: Mapping[str, Tuple[str, ...]]
+    version: str  # content hash of all list files, changes whenever any list is edited
+
+
+_bundles: Dict[str, Tuple[Tuple[Optional[float], ...], WordlistBundle]] = {}
+_lock = threading.Lock()
+
+
+def _file_mtimes(base_dir: str) -> Tuple[Optional[float], ...]:
+    mtimes = []
+    for file_name in LIST_FILES.values():
+        try:
+            mtimes.append(os.stat(os.path.join(base_dir, file_name)).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+def _freeze_map(mapping: Dict[str, list]) -> Mapping[str, Tuple[str, ...]]:
+    return MappingProxyType({key: tuple(values) for key, values in mapping.items()})
+
+
+def _content_version(base_dir: str) -> str:
+    digest = hashlib.sha1()
+    for file_name in LIST_FILES.values():
+        digest.update(file_name.encode("utf-8"))
+        try:
+            with open(os.path.join(base_dir, file_name), "rb") as file:
+                digest.update(file.read())
+        except OSError:
+            digest.update(b"<missing>")
+    return digest.hexdigest()
+
+
+def load_wordlists(base_dir: str = LISTS_DIR) -> WordlistBundle:
+    # Reads and parses all list files into a fresh bundle (bypasses the process cache)
+    def path(key: str) -> str:
+        return os.path.join(base_dir, LIST_FILES[key])
+
+    return WordlistBundle(
+        tlds=tuple(dict.fromkeys(load_tlds(path("tlds")))),
+        subdomains=tuple(dict.fromkeys(load_subdomains(path("subdomains")))),
+        keyboard_map=_freeze_map(load_keyboard_proximity(path("keyboard_map"))),
+        entries=tuple(sorted(load_prefixes_and_suffixes(path("entries")))),
+        similar_chars=_freeze_map(load_similar_chars(path("similar_chars"))),
+        version=_content_version(base_dir),
+    )
+
+
+def get_wordlists(base_dir: str = LISTS_DIR) -> WordlistBundle:
+    # Returns the process-wide bundle for base_dir, reloading it only when a list file's mtime changed
+    base_dir = os.path.abspath(base_dir)
+    mtimes = _file_mtimes(base_dir)
+
+    cached = _bundles.get(base_dir)
+    if cached is not None and cached[0] == mtimes:
+        return cached[1]
+
+    with _lock:
+        cached = _bundles.get(base_dir)
+        if cached is not None and cached[0] == mtimes:
+            return cached[1]
+        if cached is not None:
+            print(f"[INFO] Word lists in {base_dir} changed, reloading.")
+        bundle = load_wordlists(base_dir)
+        _bundles[base_dir] = (mtimes, bundle)
+        return bundle
@@ -0,0 +1,285 @@
+import argparse
+import gzip
+import heapq
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from dns_resolver import DNSError, to_ascii
+
+# Compiled zone indexes (<origin>.zidx) consulted before DNS; ZONE_INDEX_DIR overrides the location
+ZONE_INDEX_DIR = os.getenv("ZONE_INDEX_DIR") or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "instance", "zones")
+INDEX_SUFFIX = ".zidx"
+
+# File layout: header, origin, count offsets (uint32) into the name blob, blob of sorted names.
+# Names are stored relative to the origin ("example" for example.com), one label each
+_MAGIC = b"TZIX"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHQ")  # magic, version, origin length, name count
+_OFFSET = struct.Struct("<I")
+
+_SORT_CHUNK = 1_000_000  # names sorted in memory at once, larger zones are merged from temporary runs
+
+
+def _open_zone(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="ascii", errors="replace")
+    return open(path, "r", encoding="ascii", errors="replace")
+
+
+def iter_zone_names(path: str, origin: Optional[str] = None) -> Iterator[str]:
+    """ Yields the lower-case names directly below origin that own records in a master zone file,
+    i.e. the registered domains of a TLD zone (CZDS dumps and RFC 1035 files with $ORIGIN, relative
+    and "@" owners, omitted owners and multi-line records). Glue and other deeper names are skipped.
+    The same name can be yielded more than once. """
+    origin = to_ascii(origin) if origin else None
+    owner = None
+    depth = 0
+    with _open_zone(path) as file:
+        for line in file:
+            line = line.split(";", 1)[0]
+            continued = depth > 0
+            depth = max(0, depth + line.count("(") - line.count(")"))
+            if continued or not line.strip():
+                continue
+
+            fields = line.split()
+            if fields[0].upper() == "$ORIGIN":
+                origin = fields[1].rstrip(".").lower()
+                continue
+            if fields[0].startswith("$"):
+                continue
+            if line[0] in " \t":
+                continue  # owner omitted, same as the previous record
+
+            name = fields[0].lower()
+            if name == "@":
+                owner = origin
+            elif name.endswith("."):
+                owner = name.rstrip(".")
+            elif origin:
+                owner = f"{name}.{origin}"
+            else:
+                continue
+
+            if origin is None:
+                # No $ORIGIN and no origin given: the first absolute owner (the SOA) is the zone apex
+                origin = owner
+                continue
+            if owner != origin and owner.endswith("." + origin):
+                label = owner[:-len(origin) - 1]
+                if "." not in label:
+                    yield label
+
+
+def _detect_origin(path: str) -> Optional[str]:
+    # $ORIGIN of the file, else the owner of its first absolute record (the SOA in CZDS dumps)
+    with _open_zone(path) as file:
+        for line in file:
+            fields = line.split(";", 1)[0].split()
+            if not fields or line[0] in " \t":
+                continue
+            if fields[0].upper() == "$ORIGIN" and len(fields) > 1:
+                return fields[1].rstrip(".").lower()
+            if not fields[0].startswith("$") and fields[0].endswith("."):
+                return fields[0].rstrip(".").lower()
+    return None
+
+
+def _sorted_runs(names: Iterable[str], directory: str, chunk_size: int) -> List[str]:
+    # Writes sorted, de-duplicated chunks of names to temporary files and returns their paths
+    runs = []
+    chunk = set()
+
+    def flush():
+        handle, path = tempfile.mkstemp(suffix=".run", dir=directory)
+        with os.fdopen(handle, "w", encoding="ascii") as run:
+            run.writelines(name + "\n" for name in sorted(chunk))
+        runs.append(path)
+        chunk.clear()
+
+    for name in names:
+        chunk.add(name)
+        if len(chunk) >= chunk_size:
+            flush()
+    if chunk or not runs:
+        flush()
+    return runs
+
+
+def build_zone_index(zone_path: str, index_path: str, origin: Optional[str] = None,
+                     chunk_size: int = _SORT_CHUNK) -> int:
+    """ Compiles a zone file into a sorted index file for ZoneIndex and returns the number of names.
+    Memory use is bounded by chunk_size: larger zones are sorted in runs that are merged on disk. """
+    started = time.perf_counter()
+    origin = origin or _detect_origin(zone_path)
+    if not origin:
+        raise ValueError(f"Cannot determine the origin of {zone_path}")
+    origin = to_ascii(origin)
+
+    directory = os.path.dirname(os.path.abspath(index_path))
+    os.makedirs(directory, exist_ok=True)
+    runs = _sorted_runs(iter_zone_names(zone_path, origin), directory, chunk_size)
+    blob_path, offsets_path = index_path + ".blob", index_path + ".offsets"
+    try:
+        count = 0
+        position = 0
+        previous = None
+        run_files = [open(path, "r", encoding="ascii") for path in runs]
+        try:
+            with open(blob_path, "wb") as blob, open(offsets_path, "wb") as offsets:
+                for line in heapq.merge(*run_files):
+                    if line == previous:
+                        continue
+                    previous = line
+                    offsets.write(_OFFSET.pack(position))
+                    encoded = line.encode("ascii")
+                    blob.write(encoded)
+                    position += len(encoded)
+                    count += 1
+                    if position >= 2 ** 32:
+                        raise ValueError(f"Zone {origin} is too large for the index format")
+        finally:
+            for run in run_files:
+                run.close()
+
+        origin_bytes = origin.encode("ascii")
+        with open(index_path + ".tmp", "wb") as index:
+            index.write(_HEADER.pack(_MAGIC, _VERSION, len(origin_bytes), count))
+            index.write(origin_bytes)
+            for part in (offsets_path, blob_path):
+                with open(part, "rb") as data:
+                    shutil.copyfileobj(data, index, 1 << 20)
+        os.replace(index_path + ".tmp", index_path)
+    finally:
+        for path in runs + [blob_path, offsets_path]:
+            if os.path.exists(path):
+                os.remove(path)
+
+    print(f"[SUCCESS] Indexed {count} names of {origin} in {time.perf_counter() - started:.1f}s -> {index_path}")
+    return count
+
+
+class ZoneIndex:
+    # Read-only view of a compiled index; the file is memory-mapped, lookups are a binary search
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as file:
+            self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, origin_length, self.count = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC or version != _VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a zone index")
+        self.origin = self._map[_HEADER.size:_HEADER.size + origin_length].decode("ascii")
+        self._offsets = _HEADER.size + origin_length
+        self._blob = self._offsets + self.count * _OFFSET.size
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _name(self, i: int) -> bytes:
+        start = _OFFSET.unpack_from(self._map, self._offsets + i * _OFFSET.size)[0]
+        end = self._map.find(b"\n", self._blob + start)
+        return self._map[self._blob + start:end]
+
+    def __contains__(self, label: str) -> bool:
+        key = label.encode("ascii")
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._name(middle) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low < self.count and self._name(low) == key
+
+    def lookup(self, domain: str) -> Optional[bool]:
+        # True/False for names directly below the origin, None for names the zone cannot answer
+        try:
+            name = to_ascii(domain)
+        except DNSError:
+            return None
+        if not name.endswith("." + self.origin):
+            return None
+        label = name[:-len(self.origin) - 1]
+        if not label or "." in label:
+            return None
+        return label in self
+
+    def close(self):
+        self._map.close()
+
+
+class ZoneIndexSet:
+    # All indexes of a directory; a domain is answered by the index of its closest origin
+
+    def __init__(self, directory: str = ZONE_INDEX_DIR):
+        self.indexes: Dict[str, ZoneIndex] = {}
+        if os.path.isdir(directory):
+            for file_name in sorted(os.listdir(directory)):
+                if file_name.endswith(INDEX_SUFFIX):
+                    try:
+                        index = ZoneIndex(os.path.join(directory, file_name))
+                    except (OSError, ValueError, struct.error) as e:
+                        print(f"[ERROR] Skipping zone index {file_name}: {e}")
+                        continue
+                    self.indexes[index.origin] = index
+        if self.indexes:
+            print(f"[INFO] Loaded zone indexes: {', '.join(sorted(self.indexes))}")
+
+    def __bool__(self) -> bool:
+        return bool(self.indexes)
+
+    def lookup(self, domain: str) -> Optional[bool]:
+        # True when registered, False when the zone does not have it, None when no index covers it
+        labels = domain.lower().rstrip(".").split(".")
+        for i in range(1, len(labels)):
+            index = self.indexes.get(".".join(labels[i:]))
+            if index is not None:
+                return index.lookup(domain)
+        return None
+
+
+_zone_indexes: Optional[ZoneIndexSet] = None
+_lock = threading.Lock()
+
+
+def get_zone_indexes() -> ZoneIndexSet:
+    # Process-wide set of the indexes in ZONE_INDEX_DIR
+    global _zone_indexes
+    if _zone_indexes is None:
+        with _lock:
+            if _zone_indexes is None:
+                _zone_indexes = ZoneIndexSet()
+    return _zone_indexes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile zone files into indexes for offline existence checks")
+    parser.add_argument("zone_files", nargs="+", help="zone files (.txt or .gz), e.g. CZDS dumps")
+    parser.add_argument("--origin", help="zone origin, by default $ORIGIN or the owner of the first record")
+    parser.add_argument("--output-dir", default=ZONE_INDEX_DIR, help="directory of the .zidx files")
+    args = parser.parse_args(argv)
+
+    for zone_path in args.zone_files:
+        origin = args.origin or _detect_origin(zone_path)
+        if not origin:
+            print(f"[ERROR] Cannot determine the origin of {zone_path}, use --origin.")
+            return 1
+        try:
+            build_zone_index(zone_path, os.path.join(args.output_dir, to_ascii(origin) + INDEX_SUFFIX), origin)
+        except (OSError, ValueError, DNSError) as e:
+            print(f"[ERROR] Failed to index {zone_path}: {e}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())